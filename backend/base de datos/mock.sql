@@ -17,38 +17,38 @@ INSERT INTO empleado (dni, email, id_rol, nombre, apellido, telefono, activo) VA
 -- ----------------------------------------------------------------------------
 -- PRODUCTOS CONGELADOS
 -- ----------------------------------------------------------------------------
-INSERT INTO producto (nombre, descripcion, unidad_medida, stock_actual, precio_venta, activo) VALUES
-('Empanadas de Carne x12', 'Empanadas congeladas de carne cortada a cuchillo, masa casera', 'unidad', 150, 2800.00, true),
-('Hamburguesas Premium x4', 'Hamburguesas de carne premium 150g c/u, congeladas', 'pack', 80, 3500.00, true),
-('Pizza Muzzarella Grande', 'Pizza congelada de muzzarella, masa madre, 30cm', 'unidad', 45, 1950.00, true),
-('Milanesas de Pollo x6', 'Milanesas de pollo rebozadas, congeladas listas para freír', 'pack', 60, 2400.00, true),
-('Tarta de Verdura', 'Tarta congelada de acelga y ricota, masa casera', 'unidad', 35, 1800.00, true);
+INSERT INTO producto (nombre, descripcion, peso_unitario_kg, precio_venta, activo) VALUES
+('Empanadas de Carne x12', 'Empanadas congeladas de carne cortada a cuchillo, masa casera', 1.200, 2800.00, true),
+('Hamburguesas Premium x4', 'Hamburguesas de carne premium 150g c/u, congeladas', 0.600, 3500.00, true),
+('Pizza Muzzarella Grande', 'Pizza congelada de muzzarella, masa madre, 30cm', 0.550, 1950.00, true),
+('Milanesas de Pollo x6', 'Milanesas de pollo rebozadas, congeladas listas para freír', 0.900, 2400.00, true),
+('Tarta de Verdura', 'Tarta congelada de acelga y ricota, masa casera', 0.650, 1800.00, true);
 
 -- ----------------------------------------------------------------------------
 -- MATERIAS PRIMAS (Ingredientes + Envoltorios)
 -- ----------------------------------------------------------------------------
-INSERT INTO materia_prima (nombre, expirabile) VALUES
+INSERT INTO materia_prima (nombre, unidad_medida, expirabile) VALUES
 -- Ingredientes
-('Carne picada especial', true),
-('Harina 000', false),
-('Huevos frescos', true),
-('Cebolla', true),
-('Muzzarella', true),
-('Pollo trozado', true),
-('Pan rallado', false),
-('Acelga', true),
-('Ricota', true),
-('Manteca', true),
-('Sal fina', false),
-('Condimentos varios', false),
+('Carne picada especial', 'kilogramos', true),
+('Harina 000', 'kilogramos', false),
+('Huevos frescos', 'unidad', true),
+('Cebolla', 'kilogramos', true),
+('Muzzarella', 'kilogramos', true),
+('Pollo trozado', 'kilogramos', true),
+('Pan rallado', 'kilogramos', false),
+('Acelga', 'kilogramos', true),
+('Ricota', 'kilogramos', true),
+('Manteca', 'kilogramos', true),
+('Sal fina', 'kilogramos', false),
+('Condimentos varios', 'kilogramos', false),
 -- Envoltorios y packaging
-('Film plástico para congelados', false),
-('Bandejas de telgopor', false),
-('Bolsas de polietileno x12', false),
-('Cajas de cartón p/pizza', false),
-('Film stretch industrial', false),
-('Etiquetas adhesivas', false),
-('Bolsas ziplock grandes', false);
+('Film plástico para congelados', 'unidad', false),
+('Bandejas de telgopor', 'unidad', false),
+('Bolsas de polietileno x12', 'unidad', false),
+('Cajas de cartón p/pizza', 'unidad', false),
+('Film stretch industrial', 'unidad', false),
+('Etiquetas adhesivas', 'unidad', false),
+('Bolsas ziplock grandes', 'unidad', false);
 
 -- ----------------------------------------------------------------------------
 -- PROVEEDORES
@@ -67,103 +67,103 @@ INSERT INTO proveedor (razon_social, cuil, nombre_contacto, direccion, telefono,
 -- ----------------------------------------------------------------------------
 
 -- Empanadas de Carne x12
-INSERT INTO materia_prima_por_producto (id_producto, id_materia_prima, cantidad, kilogramos) VALUES
-(1, 1, 1, 0.60),  -- Carne picada especial
-(1, 2, 1, 0.30),  -- Harina 000
-(1, 4, 1, 0.15),  -- Cebolla
-(1, 10, 1, 0.05), -- Manteca
-(1, 11, 1, 0.01), -- Sal fina
-(1, 12, 1, 0.05), -- Condimentos varios
-(1, 15, 1, 0.02), -- Bolsas de polietileno x12
-(1, 18, 2, 0.05); -- Etiquetas adhesivas
+INSERT INTO materia_prima_por_producto (id_producto, id_materia_prima, cantidad_unitaria) VALUES
+(1, 1, 0.60),  -- Carne picada especial
+(1, 2, 0.30),  -- Harina 000
+(1, 4, 0.15),  -- Cebolla
+(1, 10, 0.05), -- Manteca
+(1, 11, 0.01), -- Sal fina
+(1, 12, 0.05), -- Condimentos varios
+(1, 15, 1), -- Bolsas de polietileno x12
+(1, 18, 2); -- Etiquetas adhesivas
 
 -- Hamburguesas Premium x4
-INSERT INTO materia_prima_por_producto (id_producto, id_materia_prima, cantidad, kilogramos) VALUES
-(2, 1, 1, 0.60),  -- Carne picada especial
-(2, 3, 2, 0.10),  -- Huevos frescos
-(2, 7, 1, 0.05),  -- Pan rallado
-(2, 11, 1, 0.05), -- Sal fina
-(2, 12, 1, 0.05), -- Condimentos varios
-(2, 14, 1, 0.15), -- Bandejas de telgopor
-(2, 13, 1, 0.01), -- Film plástico para congelados
-(2, 18, 1, 0.02); -- Etiquetas adhesivas
+INSERT INTO materia_prima_por_producto (id_producto, id_materia_prima, cantidad_unitaria) VALUES
+(2, 1, 0.60),  -- Carne picada especial
+(2, 3, 2),  -- Huevos frescos
+(2, 7, 0.05),  -- Pan rallado
+(2, 11, 0.05), -- Sal fina
+(2, 12, 0.05), -- Condimentos varios
+(2, 14, 1), -- Bandejas de telgopor
+(2, 13, 1), -- Film plástico para congelados
+(2, 18, 1); -- Etiquetas adhesivas
 
 -- Pizza Muzzarella Grande
-INSERT INTO materia_prima_por_producto (id_producto, id_materia_prima, cantidad, kilogramos) VALUES
-(3, 2, 1, 0.25),  -- Harina 000
-(3, 5, 1, 0.20),  -- Muzzarella
-(3, 11, 1, 0.05), -- Sal fina
-(3, 12, 1, 0.03), -- Condimentos varios
-(3, 16, 1, 0.08), -- Cajas de cartón p/pizza
-(3, 13, 1, 0.08), -- Film plástico para congelados
-(3, 18, 1, 0.02); -- Etiquetas adhesivas
+INSERT INTO materia_prima_por_producto (id_producto, id_materia_prima, cantidad_unitaria) VALUES
+(3, 2, 0.25),  -- Harina 000
+(3, 5, 0.20),  -- Muzzarella
+(3, 11, 0.05), -- Sal fina
+(3, 12, 0.03), -- Condimentos varios
+(3, 16, 1), -- Cajas de cartón p/pizza
+(3, 13, 1), -- Film plástico para congelados
+(3, 18, 1); -- Etiquetas adhesivas
 
 -- Milanesas de Pollo x6
-INSERT INTO materia_prima_por_producto (id_producto, id_materia_prima, cantidad, kilogramos) VALUES
-(4, 6, 1, 0.90),  -- Pollo trozado
-(4, 3, 3, 0.15),  -- Huevos frescos
-(4, 7, 1, 0.10),  -- Pan rallado
-(4, 11, 1, 0.05), -- Sal fina
-(4, 14, 1, 0.18), -- Bandejas de telgopor
-(4, 17, 1, 0.12), -- Film stretch industrial
-(4, 18, 1, 0.02); -- Etiquetas adhesivas
+INSERT INTO materia_prima_por_producto (id_producto, id_materia_prima, cantidad_unitaria) VALUES
+(4, 6, 0.90),  -- Pollo trozado
+(4, 3, 3),  -- Huevos frescos
+(4, 7, 0.10),  -- Pan rallado
+(4, 11, 0.05), -- Sal fina
+(4, 14, 1), -- Bandejas de telgopor
+(4, 17, 1), -- Film stretch industrial
+(4, 18, 1); -- Etiquetas adhesivas
 
 -- Tarta de Verdura
-INSERT INTO materia_prima_por_producto (id_producto, id_materia_prima, cantidad, kilogramos) VALUES
-(5, 2, 1, 0.20),  -- Harina 000
-(5, 8, 1, 0.40),  -- Acelga
-(5, 9, 1, 0.25),  -- Ricota
-(5, 3, 2, 0.10),  -- Huevos frescos
-(5, 10, 1, 0.05), -- Manteca
-(5, 11, 1, 0.05), -- Sal fina
-(5, 19, 1, 0.025), -- Bolsas ziplock grandes
-(5, 13, 1, 0.08), -- Film plástico para congelados
-(5, 18, 1, 0.02); -- Etiquetas adhesivas
+INSERT INTO materia_prima_por_producto (id_producto, id_materia_prima, cantidad_unitaria) VALUES
+(5, 2, 0.20),  -- Harina 000
+(5, 8, 0.40),  -- Acelga
+(5, 9, 0.25),  -- Ricota
+(5, 3, 2),  -- Huevos frescos
+(5, 10, 0.05), -- Manteca
+(5, 11, 0.05), -- Sal fina
+(5, 19, 1), -- Bolsas ziplock grandes
+(5, 13, 1), -- Film plástico para congelados
+(5, 18, 1); -- Etiquetas adhesivas
 
 -- ----------------------------------------------------------------------------
 -- RELACIÓN PROVEEDORES - MATERIAS PRIMAS (con precios y competencia)
 -- ----------------------------------------------------------------------------
-INSERT INTO proveedor_por_materia_prima (id_proveedor, id_materia_prima, precio, tiempo_entrega_promedio, activo) VALUES
+INSERT INTO proveedor_por_materia_prima (id_proveedor, id_materia_prima, precio, activo) VALUES
 -- Frigorífico San Miguel SA
-(1, 1, 850.00, 2, true),  -- Carne picada especial
-(1, 6, 950.00, 2, true),  -- Pollo trozado
+(1, 1, 850.00, true),  -- Carne picada especial
+(1, 6, 950.00, true),  -- Pollo trozado
 
 -- Lácteos La Pampa SRL
-(2, 3, 45.00, 1, true),   -- Huevos frescos
-(2, 5, 1200.00, 3, true), -- Muzzarella
-(2, 9, 680.00, 2, true),  -- Ricota
-(2, 10, 750.00, 2, true), -- Manteca
+(2, 3, 45.00, true),   -- Huevos frescos
+(2, 5, 1200.00, true), -- Muzzarella
+(2, 9, 680.00, true),  -- Ricota
+(2, 10, 750.00, true), -- Manteca
 
 -- Distribuidora El Trigal
-(3, 2, 320.00, 7, true),  -- Harina 000
-(3, 7, 180.00, 5, true),  -- Pan rallado
-(3, 11, 95.00, 7, true),  -- Sal fina
-(3, 12, 450.00, 7, true), -- Condimentos varios
+(3, 2, 320.00, true),  -- Harina 000
+(3, 7, 180.00, true),  -- Pan rallado
+(3, 11, 95.00, true),  -- Sal fina
+(3, 12, 450.00, true), -- Condimentos varios
 
 -- Verduras Frescas Norte
-(4, 4, 150.00, 1, true),  -- Cebolla
-(4, 8, 280.00, 1, true),  -- Acelga
+(4, 4, 150.00, true),  -- Cebolla
+(4, 8, 280.00, true),  -- Acelga
 
 -- Packaging Solutions SA (especialista en envases)
-(5, 13, 180.00, 3, true), -- Film plástico para congelados
-(5, 14, 85.00, 2, true),  -- Bandejas de telgopor
-(5, 15, 120.00, 3, true), -- Bolsas de polietileno x12
-(5, 16, 45.00, 2, true),  -- Cajas de cartón p/pizza
-(5, 17, 220.00, 3, true), -- Film stretch industrial
-(5, 18, 65.00, 5, true),  -- Etiquetas adhesivas
-(5, 19, 150.00, 3, true), -- Bolsas ziplock grandes
+(5, 13, 180.00, true), -- Film plástico para congelados
+(5, 14, 85.00, true),  -- Bandejas de telgopor
+(5, 15, 120.00, true), -- Bolsas de polietileno x12
+(5, 16, 45.00, true),  -- Cajas de cartón p/pizza
+(5, 17, 220.00, true), -- Film stretch industrial
+(5, 18, 65.00, true),  -- Etiquetas adhesivas
+(5, 19, 150.00, true), -- Bolsas ziplock grandes
 
 -- Carnicería Premium SRL (competencia en carnes - más caro pero más rápido)
-(6, 1, 870.00, 1, true),  -- Carne picada especial (+$20, 1 día)
-(6, 6, 980.00, 1, true),  -- Pollo trozado (+$30, 1 día)
+(6, 1, 870.00, true),  -- Carne picada especial (+$20, 1 día)
+(6, 6, 980.00, true),  -- Pollo trozado (+$30, 1 día)
 
 -- Insumos Gastronómicos Del Sur (competencia - más barato pero más lento)
-(7, 2, 310.00, 5, true),  -- Harina 000 (-$10)
-(7, 7, 175.00, 4, true),  -- Pan rallado (-$5)
-(7, 11, 90.00, 5, true),  -- Sal fina (-$5)
-(7, 12, 430.00, 5, true), -- Condimentos varios (-$20)
-(7, 13, 185.00, 4, true), -- Film plástico para congelados (+$5)
-(7, 18, 60.00, 7, true);  -- Etiquetas adhesivas (-$5, más lento)
+(7, 2, 310.00, true),  -- Harina 000 (-$10)
+(7, 7, 175.00, true),  -- Pan rallado (-$5)
+(7, 11, 90.00, true),  -- Sal fina (-$5)
+(7, 12, 430.00, true), -- Condimentos varios (-$20)
+(7, 13, 185.00, true), -- Film plástico para congelados (+$5)
+(7, 18, 60.00, true);  -- Etiquetas adhesivas (-$5, más lento)
 
 -- ----------------------------------------------------------------------------
 -- CLIENTES
@@ -223,3 +223,42 @@ INSERT INTO orden_produccion (id_orden_venta, id_producto, fecha_creacion, fecha
 (5, 1, '2025-09-26', '2025-09-28 16:30:00-03', 'en_proceso', 2, 'Empanadas urgentes - listas'),
 (5, 4, '2025-09-26', '2025-09-28 17:15:00-03', 'en_proceso', 1, 'Milanesas urgentes - listas');
 
+-- ----------------------------------------------------------------------------
+-- LÍNEAS DE PRODUCCIÓN Y COMPATIBILIDADES
+-- ----------------------------------------------------------------------------
+INSERT INTO linea_produccion (nombre, descripcion, capacidad_maxima_kg, activa) VALUES
+('Línea Masas', 'Empanadas, pizzas y tartas', 400.00, true),
+('Línea Carnes', 'Hamburguesas y milanesas', 300.00, true);
+
+INSERT INTO producto_por_linea_produccion (id_linea_produccion, id_producto) VALUES
+(1, 1), (1, 3), (1, 5),
+(2, 2), (2, 4), (2, 1);
+
+-- ----------------------------------------------------------------------------
+-- LOTES DE MATERIA PRIMA
+-- ----------------------------------------------------------------------------
+INSERT INTO lote_materia_prima (id_materia_prima, id_proveedor, codigo_lote, fecha_vencimiento, cantidad_total, cantidad_unitaria_disponible, estado) VALUES
+(1, 1, 'LT-CAR0001', CURRENT_DATE + 20, 200.00, 200.00, 'disponible'),
+(2, 3, 'LT-HAR0001', NULL, 500.00, 500.00, 'disponible'),
+(3, 2, 'LT-HUE0001', CURRENT_DATE + 15, 600.00, 600.00, 'disponible'),
+(5, 2, 'LT-MUZ0001', CURRENT_DATE + 30, 120.00, 120.00, 'disponible'),
+(6, 1, 'LT-POL0001', CURRENT_DATE + 10, 150.00, 150.00, 'disponible'),
+(8, 4, 'LT-ACE0001', CURRENT_DATE + 5, 60.00, 60.00, 'en_cuarentena'),
+(13, 5, 'LT-FIL0001', NULL, 1000.00, 1000.00, 'disponible'),
+(18, 5, 'LT-ETI0001', NULL, 2000.00, 2000.00, 'disponible');
+
+-- ----------------------------------------------------------------------------
+-- DIRECCIONES Y VEHÍCULOS
+-- ----------------------------------------------------------------------------
+INSERT INTO direccion (id_cliente, direccion_text, latitud, longitud, es_principal) VALUES
+(1, 'Av. Mitre 1200, Avellaneda', -34.662000, -58.365000, true),
+(2, 'Av. Santa Fe 3100, CABA', -34.588000, -58.410000, true),
+(3, 'Av. del Libertador 15000, San Isidro', -34.470000, -58.512000, true);
+
+UPDATE cliente c SET id_direccion_principal = d.id
+FROM direccion d
+WHERE d.id_cliente = c.id AND d.es_principal;
+
+INSERT INTO vehiculo (empresa, nombre_conductor, apellido_conductor, dni_conductor, tipo_unidad, patente, modelo, capacidad_kg, color, disponible) VALUES
+('Logística Frío Sur', 'Jorge', 'Paz', '30111222', 'camioneta', 'AB123CD', 'Renault Kangoo', 600, 'blanco', true),
+('Logística Frío Sur', 'Mariana', 'Quiroga', '32444555', 'camion', 'AE456FG', 'Iveco Daily', 2500, 'gris', true);
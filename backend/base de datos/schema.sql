@@ -8,8 +8,8 @@ CREATE TYPE estado_orden_venta AS ENUM (
     'en_produccion',
     'lista',
     'asignada_para_Envio', -- NO SE USA
-    'asignada_para_envio_temp' -- NO SE USA, 
-    'asignada_para_envio',  
+    'asignada_para_envio_temp', -- NO SE USA
+    'asignada_para_envio',
     'despachado',
     'entregada'
 );
@@ -25,6 +25,15 @@ CREATE TYPE estado_lote_materia_prima AS ENUM (
     'cancelado'
 );
 
+DROP TYPE IF EXISTS tipo_movimiento_stock;
+CREATE TYPE tipo_movimiento_stock AS ENUM (
+    'ingreso',      -- el lote pasa a 'disponible' (recepción / aceptación)
+    'asignacion',   -- baja de un lote disponible (consumo de una OP)
+    'liberacion',   -- sube el saldo de un lote disponible (asignación devuelta)
+    'vencimiento',  -- el lote pasa a 'vencido'
+    'ajuste'        -- cualquier otro cambio (rechazo, cancelación, borrado, corrección)
+);
+
 DROP TYPE IF EXISTS estado_orden_produccion;
 CREATE TYPE estado_orden_produccion AS ENUM (
     'pendiente',
@@ -94,7 +103,7 @@ CREATE TABLE IF NOT EXISTS empleado (
     nombre VARCHAR(20) NOT NULL,
     apellido VARCHAR(20) NOT NULL,
     telefono VARCHAR(20),
-    activo BOOLEAN NOT NULL DEFAULT TRUE,
+    activo BOOLEAN NOT NULL DEFAULT TRUE
 );
 
 CREATE TABLE IF NOT EXISTS cliente (
@@ -105,7 +114,7 @@ CREATE TABLE IF NOT EXISTS cliente (
     nombre_contacto VARCHAR(20),
     apellido_contacto VARCHAR(20),
     telefono VARCHAR(20),
-    id_direccion_principal INT REFERENCES direccion(id),
+    id_direccion_principal INT, -- FK a direccion(id), se agrega al crear direccion
     activo BOOLEAN NOT NULL DEFAULT TRUE,
     created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
 );
@@ -125,7 +134,7 @@ CREATE TABLE IF NOT EXISTS linea_produccion (
     nombre VARCHAR(50) NOT NULL UNIQUE,
     descripcion TEXT,
     capacidad_maxima_kg NUMERIC(10,2) NOT NULL CHECK (capacidad_maxima_kg > 0),
-    activa BOOLEAN NOT NULL DEFAULT TRUE,
+    activa BOOLEAN NOT NULL DEFAULT TRUE
 );
 
 -- Tabla para matchear que productos son compatibles con que linea de produccion
@@ -164,8 +173,8 @@ CREATE TABLE IF NOT EXISTS lote_materia_prima (
     codigo_lote VARCHAR(50) NOT NULL,
     fecha_ingreso TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
     fecha_vencimiento DATE,
-    cantidad_total NUMERIC(10,2) NOT NULL CHECK (cantidad_unitaria_total >= 0),
-    cantidad_unitaria_disponible NUMERIC(10,2) NOT NULL CHECK (cantidad_unitaria_disponible >= 0 AND cantidad_unitaria_disponible <= cantidad_unitaria_total),
+    cantidad_total NUMERIC(10,2) NOT NULL CHECK (cantidad_total >= 0),
+    cantidad_unitaria_disponible NUMERIC(10,2) NOT NULL CHECK (cantidad_unitaria_disponible >= 0),
     estado estado_lote_materia_prima NOT NULL DEFAULT 'en_cuarentena',
     observaciones TEXT,
     fecha_generacion_pedido TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),    -- cuando el sistema automaticamente lo pide
@@ -182,7 +191,7 @@ CREATE TABLE IF NOT EXISTS orden_venta (
     estado estado_orden_venta NOT NULL DEFAULT 'pendiente',
     valor_total_pedido NUMERIC(10,2) NOT NULL DEFAULT 0,
     con_envio BOOLEAN DEFAULT FALSE,
-    id_direccion_entrega INT REFERENCES direccion(id);
+    id_direccion_entrega INT, -- FK a direccion(id), se agrega al crear direccion
     observaciones TEXT,
     prioritario BOOLEAN NOT NULL DEFAULT FALSE,
     created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
@@ -191,7 +200,33 @@ CREATE TABLE IF NOT EXISTS orden_venta (
 CREATE TABLE planificacion_diaria (
     id SERIAL PRIMARY KEY,
     fecha DATE NOT NULL,
-    id_orden_produccion INTEGER NOT NULL
+    id_orden_produccion INTEGER NOT NULL,
+    posicion INTEGER NOT NULL DEFAULT 0, -- orden de la OP dentro del día
+    UNIQUE (fecha, id_orden_produccion)
+);
+
+-- Última agenda calculada por el planificador diario (JSON de la respuesta) y la huella de sus entradas.
+CREATE TABLE planificacion_diaria_cache (
+    id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    huella TEXT NOT NULL,
+    agenda TEXT NOT NULL,
+    generada_en TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+-- Una sola fila: versión de la agenda diaria. La sube el planificador una vez, al final de cada
+-- plan (alimentapp.agenda.subir_version_agenda); es la huella de la cache.
+CREATE TABLE planificacion_diaria_version (
+    id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+-- Una sola fila: disparos recibidos por el planificador y hasta cuál cubre el último plan confirmado.
+CREATE TABLE planificador_estado (
+    id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    solicitudes BIGINT NOT NULL DEFAULT 0,
+    atendidas BIGINT NOT NULL DEFAULT 0,
+    solicitado_en TIMESTAMP WITH TIME ZONE,
+    atendido_en TIMESTAMP WITH TIME ZONE
 );
 
 CREATE TABLE IF NOT EXISTS orden_produccion (
@@ -250,7 +285,7 @@ CREATE TABLE IF NOT EXISTS proveedor_por_materia_prima (
 );
 
 
-CREATE TABLE codigo_verification (
+CREATE TABLE codigo_verificacion (
     id SERIAL PRIMARY KEY,
     email VARCHAR(255) NOT NULL,
     codigo VARCHAR(6) NOT NULL,
@@ -268,7 +303,7 @@ CREATE TABLE direccion (
   id SERIAL PRIMARY KEY,
   id_cliente INT NOT NULL REFERENCES cliente(id) ON DELETE CASCADE,
   direccion_text TEXT NOT NULL,
-  --zona zona, Ya no se usa
+  zona TEXT, -- Ya no se carga, pero get-clientes y get-ordenes-venta-supervision-urgente la siguen leyendo
   latitud DECIMAL(10,6),
   longitud DECIMAL(10,6),
   es_principal BOOLEAN DEFAULT FALSE,
@@ -279,6 +314,14 @@ CREATE UNIQUE INDEX unique_direccion_principal
 ON direccion (id_cliente) 
 WHERE es_principal = true;
 
+ALTER TABLE cliente
+    ADD CONSTRAINT cliente_id_direccion_principal_fkey
+    FOREIGN KEY (id_direccion_principal) REFERENCES direccion(id);
+
+ALTER TABLE orden_venta
+    ADD CONSTRAINT orden_venta_id_direccion_entrega_fkey
+    FOREIGN KEY (id_direccion_entrega) REFERENCES direccion(id);
+
 CREATE TABLE vehiculo (
     id SERIAL PRIMARY KEY,
     empresa TEXT,
@@ -307,6 +350,326 @@ CREATE TABLE envio (
 );
 
 
+--------------------------------------------------------------------------------------
+------------------------------- LIBRO DE STOCK ---------------------------------------
+--------------------------------------------------------------------------------------
+-- Cada cambio del saldo disponible de un lote (cantidad_unitaria_disponible de los lotes en
+-- estado 'disponible') queda como un movimiento; lo que piden las OP 'pendiente'/'planificada'
+-- según su receta, también. Los triggers corren en la misma transacción que el cambio y sólo
+-- insertan: una fila de diferencia por materia y sentencia en delta_materia_prima, sin tocar
+-- ninguna fila compartida, así que dos escritores sobre la misma materia no se esperan.
+-- plegar_totales_materia_prima() (barrido periódico) suma las diferencias confirmadas a
+-- stock_materia_prima / requerimiento_materia_prima y las borra; totales_materia_prima lee
+-- totales + diferencias sin plegar, que siempre coinciden con los lotes y las OP confirmados.
+
+CREATE TABLE IF NOT EXISTS movimiento_stock (
+    id BIGSERIAL PRIMARY KEY,
+    id_materia_prima INTEGER NOT NULL REFERENCES materia_prima(id),
+    id_lote_materia_prima INTEGER NOT NULL, -- sin FK: el movimiento queda aunque se borre el lote
+    tipo tipo_movimiento_stock NOT NULL,
+    cantidad NUMERIC(12,2) NOT NULL, -- variación del disponible: positiva entra, negativa sale
+    creado_en TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_movimiento_stock_materia
+    ON movimiento_stock (id_materia_prima, id);
+
+CREATE TABLE IF NOT EXISTS stock_materia_prima (
+    id_materia_prima INTEGER PRIMARY KEY REFERENCES materia_prima(id) ON DELETE CASCADE,
+    cantidad_disponible NUMERIC(14,2) NOT NULL DEFAULT 0,
+    actualizado_en TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS requerimiento_materia_prima (
+    id_materia_prima INTEGER PRIMARY KEY REFERENCES materia_prima(id) ON DELETE CASCADE,
+    cantidad_requerida NUMERIC(16,2) NOT NULL DEFAULT 0,
+    actualizado_en TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+-- Diferencias todavía no plegadas en stock_materia_prima / requerimiento_materia_prima.
+CREATE TABLE IF NOT EXISTS delta_materia_prima (
+    id BIGSERIAL PRIMARY KEY,
+    id_materia_prima INTEGER NOT NULL REFERENCES materia_prima(id) ON DELETE CASCADE,
+    cantidad_disponible NUMERIC(14,2) NOT NULL DEFAULT 0,
+    cantidad_requerida NUMERIC(16,2) NOT NULL DEFAULT 0,
+    creado_en TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_delta_materia_prima_materia
+    ON delta_materia_prima (id_materia_prima);
+
+-- Lotes disponibles por vencimiento: las vistas descuentan los vencidos que siguen 'disponible'.
+CREATE INDEX IF NOT EXISTS idx_lote_materia_prima_disponible_vencimiento
+    ON lote_materia_prima (fecha_vencimiento) WHERE estado = 'disponible';
+
+CREATE OR REPLACE FUNCTION clasificar_movimiento_stock(
+    anterior estado_lote_materia_prima, nuevo estado_lote_materia_prima, cantidad NUMERIC
+) RETURNS tipo_movimiento_stock
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT CASE
+        WHEN nuevo = 'vencido' THEN 'vencimiento'
+        WHEN nuevo = 'disponible' AND anterior IS DISTINCT FROM 'disponible' THEN 'ingreso'
+        WHEN anterior = 'disponible' AND nuevo IN ('disponible', 'agotado') THEN
+            CASE WHEN cantidad < 0 THEN 'asignacion' ELSE 'liberacion' END
+        ELSE 'ajuste'
+    END::tipo_movimiento_stock
+$$;
+
+-- Movimientos de un INSERT/UPDATE/DELETE sobre lote_materia_prima (trigger por sentencia).
+CREATE OR REPLACE FUNCTION registrar_movimientos_lote() RETURNS trigger
+LANGUAGE plpgsql SET search_path FROM CURRENT AS $$
+DECLARE
+    materias INTEGER[];
+    cantidades NUMERIC[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        WITH mov AS (
+            INSERT INTO movimiento_stock (id_materia_prima, id_lote_materia_prima, tipo, cantidad)
+            SELECT n.id_materia_prima, n.id, clasificar_movimiento_stock(NULL, n.estado, n.cantidad_unitaria_disponible),
+                   n.cantidad_unitaria_disponible
+            FROM nuevos n
+            WHERE n.estado = 'disponible' AND n.cantidad_unitaria_disponible <> 0
+            RETURNING id_materia_prima, cantidad
+        )
+        SELECT array_agg(id_materia_prima), array_agg(cantidad) INTO materias, cantidades FROM mov;
+    ELSIF TG_OP = 'UPDATE' THEN
+        WITH mov AS (
+            INSERT INTO movimiento_stock (id_materia_prima, id_lote_materia_prima, tipo, cantidad)
+            SELECT x.id_materia_prima, n.id, clasificar_movimiento_stock(v.estado, n.estado, SUM(x.cantidad)), SUM(x.cantidad)
+            FROM nuevos n
+            JOIN viejos v ON v.id = n.id
+            CROSS JOIN LATERAL (VALUES
+                (v.id_materia_prima, CASE WHEN v.estado = 'disponible' THEN -v.cantidad_unitaria_disponible ELSE 0 END),
+                (n.id_materia_prima, CASE WHEN n.estado = 'disponible' THEN n.cantidad_unitaria_disponible ELSE 0 END)
+            ) AS x(id_materia_prima, cantidad)
+            GROUP BY x.id_materia_prima, n.id, v.estado, n.estado
+            HAVING SUM(x.cantidad) <> 0
+            RETURNING id_materia_prima, cantidad
+        )
+        SELECT array_agg(id_materia_prima), array_agg(cantidad) INTO materias, cantidades FROM mov;
+    ELSE
+        WITH mov AS (
+            INSERT INTO movimiento_stock (id_materia_prima, id_lote_materia_prima, tipo, cantidad)
+            SELECT v.id_materia_prima, v.id, 'ajuste', -v.cantidad_unitaria_disponible
+            FROM viejos v
+            WHERE v.estado = 'disponible' AND v.cantidad_unitaria_disponible <> 0
+            RETURNING id_materia_prima, cantidad
+        )
+        SELECT array_agg(id_materia_prima), array_agg(cantidad) INTO materias, cantidades FROM mov;
+    END IF;
+
+    IF materias IS NOT NULL THEN
+        INSERT INTO delta_materia_prima (id_materia_prima, cantidad_disponible)
+        SELECT m.id_materia_prima, SUM(m.cantidad)
+        FROM unnest(materias, cantidades) AS m(id_materia_prima, cantidad)
+        GROUP BY m.id_materia_prima
+        HAVING SUM(m.cantidad) <> 0;
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS trg_lote_materia_prima_movimientos_ins ON lote_materia_prima;
+CREATE TRIGGER trg_lote_materia_prima_movimientos_ins
+    AFTER INSERT ON lote_materia_prima REFERENCING NEW TABLE AS nuevos
+    FOR EACH STATEMENT EXECUTE FUNCTION registrar_movimientos_lote();
+DROP TRIGGER IF EXISTS trg_lote_materia_prima_movimientos_upd ON lote_materia_prima;
+CREATE TRIGGER trg_lote_materia_prima_movimientos_upd
+    AFTER UPDATE ON lote_materia_prima REFERENCING OLD TABLE AS viejos NEW TABLE AS nuevos
+    FOR EACH STATEMENT EXECUTE FUNCTION registrar_movimientos_lote();
+DROP TRIGGER IF EXISTS trg_lote_materia_prima_movimientos_del ON lote_materia_prima;
+CREATE TRIGGER trg_lote_materia_prima_movimientos_del
+    AFTER DELETE ON lote_materia_prima REFERENCING OLD TABLE AS viejos
+    FOR EACH STATEMENT EXECUTE FUNCTION registrar_movimientos_lote();
+
+-- Suma (signo +1) o resta (-1) al requerimiento lo que piden las OP (id_producto, cantidad), como diferencia.
+CREATE OR REPLACE FUNCTION acumular_requerimientos(productos INTEGER[], cantidades NUMERIC[], signos INTEGER[])
+RETURNS void
+LANGUAGE sql SET search_path FROM CURRENT AS $$
+    INSERT INTO delta_materia_prima (id_materia_prima, cantidad_requerida)
+    SELECT mpp.id_materia_prima, SUM(o.signo * o.cantidad * COALESCE(mpp.cantidad_unitaria, 0))
+    FROM unnest(productos, cantidades, signos) AS o(id_producto, cantidad, signo)
+    JOIN materia_prima_por_producto mpp ON mpp.id_producto = o.id_producto
+    GROUP BY mpp.id_materia_prima
+    HAVING SUM(o.signo * o.cantidad * COALESCE(mpp.cantidad_unitaria, 0)) <> 0;
+$$;
+
+CREATE OR REPLACE FUNCTION registrar_requerimientos_orden() RETURNS trigger
+LANGUAGE plpgsql SET search_path FROM CURRENT AS $$
+DECLARE
+    productos INTEGER[];
+    cantidades NUMERIC[];
+    signos INTEGER[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(id_producto), array_agg(cantidad), array_agg(1) INTO productos, cantidades, signos
+        FROM nuevos WHERE estado IN ('pendiente', 'planificada');
+    ELSIF TG_OP = 'UPDATE' THEN
+        SELECT array_agg(c.id_producto), array_agg(c.cantidad), array_agg(c.signo) INTO productos, cantidades, signos
+        FROM nuevos n
+        JOIN viejos v ON v.id = n.id
+        CROSS JOIN LATERAL (VALUES (v.id_producto, v.cantidad, -1, v.estado), (n.id_producto, n.cantidad, 1, n.estado))
+            AS c(id_producto, cantidad, signo, estado)
+        WHERE c.estado IN ('pendiente', 'planificada')
+          AND (n.id_producto, n.cantidad, n.estado) IS DISTINCT FROM (v.id_producto, v.cantidad, v.estado);
+    ELSE
+        SELECT array_agg(id_producto), array_agg(cantidad), array_agg(-1) INTO productos, cantidades, signos
+        FROM viejos WHERE estado IN ('pendiente', 'planificada');
+    END IF;
+    IF productos IS NOT NULL THEN
+        PERFORM acumular_requerimientos(productos, cantidades, signos);
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS trg_orden_produccion_requerimientos_ins ON orden_produccion;
+CREATE TRIGGER trg_orden_produccion_requerimientos_ins
+    AFTER INSERT ON orden_produccion REFERENCING NEW TABLE AS nuevos
+    FOR EACH STATEMENT EXECUTE FUNCTION registrar_requerimientos_orden();
+DROP TRIGGER IF EXISTS trg_orden_produccion_requerimientos_upd ON orden_produccion;
+CREATE TRIGGER trg_orden_produccion_requerimientos_upd
+    AFTER UPDATE ON orden_produccion REFERENCING OLD TABLE AS viejos NEW TABLE AS nuevos
+    FOR EACH STATEMENT EXECUTE FUNCTION registrar_requerimientos_orden();
+DROP TRIGGER IF EXISTS trg_orden_produccion_requerimientos_del ON orden_produccion;
+CREATE TRIGGER trg_orden_produccion_requerimientos_del
+    AFTER DELETE ON orden_produccion REFERENCING OLD TABLE AS viejos
+    FOR EACH STATEMENT EXECUTE FUNCTION registrar_requerimientos_orden();
+
+-- Un cambio de receta mueve el requerimiento de todas las OP activas del producto.
+CREATE OR REPLACE FUNCTION registrar_requerimientos_receta() RETURNS trigger
+LANGUAGE plpgsql SET search_path FROM CURRENT AS $$
+DECLARE
+    productos INTEGER[];
+    materias INTEGER[];
+    unitarias NUMERIC[];
+    signos INTEGER[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(id_producto), array_agg(id_materia_prima), array_agg(cantidad_unitaria), array_agg(1)
+        INTO productos, materias, unitarias, signos
+        FROM nuevos;
+    ELSIF TG_OP = 'UPDATE' THEN
+        SELECT array_agg(c.id_producto), array_agg(c.id_materia_prima), array_agg(c.cantidad_unitaria), array_agg(c.signo)
+        INTO productos, materias, unitarias, signos
+        FROM (
+            SELECT id_producto, id_materia_prima, cantidad_unitaria, -1 AS signo FROM viejos
+            UNION ALL
+            SELECT id_producto, id_materia_prima, cantidad_unitaria, 1 FROM nuevos
+        ) c;
+    ELSE
+        SELECT array_agg(id_producto), array_agg(id_materia_prima), array_agg(cantidad_unitaria), array_agg(-1)
+        INTO productos, materias, unitarias, signos
+        FROM viejos;
+    END IF;
+
+    INSERT INTO delta_materia_prima (id_materia_prima, cantidad_requerida)
+    SELECT c.id_materia_prima, SUM(c.signo * op.cantidad * COALESCE(c.cantidad_unitaria, 0))
+    FROM unnest(productos, materias, unitarias, signos) AS c(id_producto, id_materia_prima, cantidad_unitaria, signo)
+    JOIN orden_produccion op ON op.id_producto = c.id_producto AND op.estado IN ('pendiente', 'planificada')
+    GROUP BY c.id_materia_prima
+    HAVING SUM(c.signo * op.cantidad * COALESCE(c.cantidad_unitaria, 0)) <> 0;
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS trg_materia_prima_por_producto_requerimientos_ins ON materia_prima_por_producto;
+CREATE TRIGGER trg_materia_prima_por_producto_requerimientos_ins
+    AFTER INSERT ON materia_prima_por_producto REFERENCING NEW TABLE AS nuevos
+    FOR EACH STATEMENT EXECUTE FUNCTION registrar_requerimientos_receta();
+DROP TRIGGER IF EXISTS trg_materia_prima_por_producto_requerimientos_upd ON materia_prima_por_producto;
+CREATE TRIGGER trg_materia_prima_por_producto_requerimientos_upd
+    AFTER UPDATE ON materia_prima_por_producto REFERENCING OLD TABLE AS viejos NEW TABLE AS nuevos
+    FOR EACH STATEMENT EXECUTE FUNCTION registrar_requerimientos_receta();
+DROP TRIGGER IF EXISTS trg_materia_prima_por_producto_requerimientos_del ON materia_prima_por_producto;
+CREATE TRIGGER trg_materia_prima_por_producto_requerimientos_del
+    AFTER DELETE ON materia_prima_por_producto REFERENCING OLD TABLE AS viejos
+    FOR EACH STATEMENT EXECUTE FUNCTION registrar_requerimientos_receta();
+
+-- Pasa a 'vencido' los lotes disponibles ya vencidos (el trigger registra el 'vencimiento'); lo corre gestion-materia-prima.
+-- Saltea los lotes bloqueados por otra transacción (quedan para el próximo barrido; mientras
+-- tanto las vistas ya los descuentan). Devuelve cuántos lotes venció.
+CREATE OR REPLACE FUNCTION vencer_lotes_materia_prima() RETURNS INTEGER
+LANGUAGE plpgsql SET search_path FROM CURRENT AS $$
+DECLARE
+    vencidos INTEGER;
+BEGIN
+    UPDATE lote_materia_prima
+    SET estado = 'vencido'
+    WHERE id IN (
+        SELECT id FROM lote_materia_prima
+        WHERE estado = 'disponible' AND fecha_vencimiento < CURRENT_DATE
+        ORDER BY id
+        FOR UPDATE SKIP LOCKED
+    );
+    GET DIAGNOSTICS vencidos = ROW_COUNT;
+    RETURN vencidos;
+END
+$$;
+
+-- Suma a los totales las diferencias confirmadas y las borra, en una sentencia; devuelve cuántas
+-- plegó. Las de transacciones abiertas no se ven y quedan para el próximo barrido. Los totales
+-- se bloquean en orden de id_materia_prima (dos barridos simultáneos no se bloquean en cruz).
+CREATE OR REPLACE FUNCTION plegar_totales_materia_prima() RETURNS INTEGER
+LANGUAGE plpgsql SET search_path FROM CURRENT AS $$
+DECLARE
+    plegadas INTEGER;
+BEGIN
+    WITH d AS (
+        DELETE FROM delta_materia_prima
+        RETURNING id_materia_prima, cantidad_disponible, cantidad_requerida
+    ),
+    suma AS (
+        SELECT id_materia_prima, SUM(cantidad_disponible) AS disponible, SUM(cantidad_requerida) AS requerida, COUNT(*) AS filas
+        FROM d
+        GROUP BY id_materia_prima
+    ),
+    stock AS (
+        INSERT INTO stock_materia_prima AS s (id_materia_prima, cantidad_disponible)
+        SELECT id_materia_prima, disponible FROM suma WHERE disponible <> 0
+        ORDER BY id_materia_prima
+        ON CONFLICT (id_materia_prima) DO UPDATE
+        SET cantidad_disponible = s.cantidad_disponible + EXCLUDED.cantidad_disponible, actualizado_en = NOW()
+    ),
+    requerimiento AS (
+        INSERT INTO requerimiento_materia_prima AS r (id_materia_prima, cantidad_requerida)
+        SELECT id_materia_prima, requerida FROM suma WHERE requerida <> 0
+        ORDER BY id_materia_prima
+        ON CONFLICT (id_materia_prima) DO UPDATE
+        SET cantidad_requerida = r.cantidad_requerida + EXCLUDED.cantidad_requerida, actualizado_en = NOW()
+    )
+    SELECT COALESCE(SUM(filas), 0) INTO plegadas FROM suma;
+    RETURN plegadas;
+END
+$$;
+
+-- Recalcula los totales desde los lotes y las OP (carga inicial o corrección manual, sin
+-- escritores en curso: descarta las diferencias sin plegar).
+CREATE OR REPLACE FUNCTION recalcular_stock_materia_prima() RETURNS void
+LANGUAGE sql SET search_path FROM CURRENT AS $$
+    DELETE FROM delta_materia_prima;
+
+    INSERT INTO stock_materia_prima AS s (id_materia_prima, cantidad_disponible)
+    SELECT mp.id, COALESCE(SUM(lmp.cantidad_unitaria_disponible), 0)
+    FROM materia_prima mp
+    LEFT JOIN lote_materia_prima lmp ON lmp.id_materia_prima = mp.id AND lmp.estado = 'disponible'
+    GROUP BY mp.id
+    ORDER BY mp.id
+    ON CONFLICT (id_materia_prima) DO UPDATE
+    SET cantidad_disponible = EXCLUDED.cantidad_disponible, actualizado_en = NOW();
+
+    INSERT INTO requerimiento_materia_prima AS r (id_materia_prima, cantidad_requerida)
+    SELECT mp.id, COALESCE(SUM(op.cantidad * mpp.cantidad_unitaria), 0)
+    FROM materia_prima mp
+    LEFT JOIN materia_prima_por_producto mpp ON mpp.id_materia_prima = mp.id
+    LEFT JOIN orden_produccion op ON op.id_producto = mpp.id_producto AND op.estado IN ('pendiente', 'planificada')
+    GROUP BY mp.id
+    ORDER BY mp.id
+    ON CONFLICT (id_materia_prima) DO UPDATE
+    SET cantidad_requerida = EXCLUDED.cantidad_requerida, actualizado_en = NOW();
+$$;
+
+
 --------------------------------------------------------------------------------------
 ---------------------------------- VISTAS -------------------------------------------
 --------------------------------------------------------------------------------------
@@ -333,9 +696,14 @@ Asignaciones AS (
         lmp.id_materia_prima,
         SUM(mpop.cantidad_utilizada) AS cantidad_asignada
     FROM
-        materia_prima_por_orden_produccion mpop
+        orden_produccion op
+    JOIN
+        materia_prima_por_orden_produccion mpop ON mpop.id_orden_produccion = op.id
     JOIN
         lote_materia_prima lmp ON mpop.id_lote_materia_prima = lmp.id
+    WHERE
+        -- Sólo las asignaciones de las órdenes que entran en Requerimientos.
+        op.estado IN ('pendiente', 'planificada', 'lista_para_produccion', 'en_proceso')
     GROUP BY
         mpop.id_orden_produccion, lmp.id_materia_prima
 ),
@@ -371,48 +739,63 @@ GROUP BY
 
 
 
------------------- Vista para ver cuanto nos falta por materia prima ------------------
-CREATE OR REPLACE VIEW vista_faltantes_globales_mp AS
+------------------ Vista de totales del libro de stock por materia prima ------------------
+-- Totales plegados más las diferencias que todavía no plegó plegar_totales_materia_prima().
+CREATE OR REPLACE VIEW totales_materia_prima AS
+SELECT
+    t.id_materia_prima,
+    SUM(t.cantidad_disponible) AS cantidad_disponible,
+    SUM(t.cantidad_requerida) AS cantidad_requerida
+FROM (
+    SELECT id_materia_prima, cantidad_disponible, 0 AS cantidad_requerida FROM stock_materia_prima
+    UNION ALL
+    SELECT id_materia_prima, 0, cantidad_requerida FROM requerimiento_materia_prima
+    UNION ALL
+    SELECT id_materia_prima, cantidad_disponible, cantidad_requerida FROM delta_materia_prima
+) t
+GROUP BY t.id_materia_prima;
+
+
+
+------------------ Vista de stock disponible por materia prima ------------------
+-- Lee el total de totales_materia_prima y descuenta los lotes vencidos que todavía no pasó
+-- a 'vencido' vencer_lotes_materia_prima() (índice parcial: sólo recorre esos lotes).
+CREATE OR REPLACE VIEW cantidad_disponible_materia_prima AS
+SELECT
+    mp.id AS id_materia_prima,
+    mp.nombre,
+    mp.unidad_medida,
+    COALESCE(s.cantidad_disponible, 0) - COALESCE(v.cantidad_vencida, 0) AS cantidad_disponible
+FROM
+    materia_prima mp
+LEFT JOIN
+    totales_materia_prima s ON s.id_materia_prima = mp.id
+LEFT JOIN (
+    SELECT id_materia_prima, SUM(cantidad_unitaria_disponible) AS cantidad_vencida
+    FROM lote_materia_prima
+    WHERE estado = 'disponible' AND fecha_vencimiento < CURRENT_DATE
+    GROUP BY id_materia_prima
+) v ON v.id_materia_prima = mp.id;
 
--- Paso 1: Calculamos el requerimiento total de cada materia prima para todas las órdenes activas.
-WITH RequerimientosTotales AS (
-    SELECT
-        mpp.id_materia_prima,
-        SUM(op.cantidad * mpp.cantidad_unitaria) AS cantidad_total_requerida
-    FROM
-        orden_produccion op
-    JOIN
-        materia_prima_por_producto mpp ON op.id_producto = mpp.id_producto
-    WHERE
-        -- Consideramos solo órdenes que consumirán stock en el futuro.
-        op.estado IN ('pendiente', 'planificada')
-    GROUP BY
-        mpp.id_materia_prima
-),
 
--- Paso 2: Obtenemos el stock disponible actual de la vista que ya tenés.
-StockActual AS (
-    SELECT
-        id_materia_prima,
-        cantidad_disponible
-    FROM
-        cantidad_disponible_materia_prima
-)
 
--- Paso 3: Comparamos lo requerido vs. lo disponible y mostramos solo lo que falta.
+------------------ Vista para ver cuanto nos falta por materia prima ------------------
+-- El requerimiento de las órdenes 'pendiente'/'planificada' ya está acumulado en
+-- totales_materia_prima (ver LIBRO DE STOCK).
+CREATE OR REPLACE VIEW vista_faltantes_globales_mp AS
 SELECT
     r.id_materia_prima,
     mp.nombre AS nombre_materia_prima,
-    r.cantidad_total_requerida,
+    r.cantidad_requerida AS cantidad_total_requerida,
     COALESCE(s.cantidad_disponible, 0) AS cantidad_disponible,
     -- La resta nos da exactamente cuánto nos falta para cubrir toda la demanda.
-    (r.cantidad_total_requerida - COALESCE(s.cantidad_disponible, 0)) AS cantidad_faltante
+    (r.cantidad_requerida - COALESCE(s.cantidad_disponible, 0)) AS cantidad_faltante
 FROM
-    RequerimientosTotales r
+    totales_materia_prima r
 JOIN
     materia_prima mp ON r.id_materia_prima = mp.id
 LEFT JOIN
-    StockActual s ON r.id_materia_prima = s.id_materia_prima
+    cantidad_disponible_materia_prima s ON r.id_materia_prima = s.id_materia_prima
 WHERE
     -- Mostramos únicamente las materias primas donde la demanda supera al stock.
-    r.cantidad_total_requerida > COALESCE(s.cantidad_disponible, 0);
+    r.cantidad_requerida > COALESCE(s.cantidad_disponible, 0);
@@ -0,0 +1,187 @@
+"""Prueba de estrés: asignaciones de lotes de materia prima concurrentes.
+
+Corre `--workers` clientes en paralelo, cada uno con su conexión (como N
+Lambdas simultáneas), invocando `--rondas` veces el handler de
+`asignacion-lote-materia-prima-orden-produccion`. La mitad de las
+invocaciones usa la selección por defecto (las `--limite` OP `planificada`
+más urgentes, lo que manda `get-aceptar-materia-prima-automatico`) y la otra
+mitad listas explícitas de OP (como `gestion-materia-prima`) sorteadas de un
+mismo grupo chico, para que se pisen entre sí y con las anteriores.
+
+Al terminar verifica sobre la base:
+
+- ninguna invocación falló (deadlock, error de serialización, unique);
+- cada lote bajó exactamente lo que se le asignó en la corrida y los que
+  quedaron en 0 están `agotado`;
+- ninguna OP tiene asignado de una materia más de lo que pide su receta;
+- las OP que pasaron a `lista_para_produccion` tienen asignada toda su receta.
+
+Sale con código 1 si alguna verificación falla. Escribe en la base: por
+defecto recrea su propio schema (`asignacion`) con `generar_dataset.py`.
+
+Uso:
+
+    PGHOST=/tmp/pgdata python backend/benchmarks/bench_asignacion_concurrente.py --workers 8 --rondas 5
+    python backend/benchmarks/bench_asignacion_concurrente.py --reusar-base --schema asignacion --workers 16
+"""
+
+import argparse
+import importlib.util
+import json
+import logging
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+from bench_e2e import ESCALAS, PRD, instalar_entorno_local, percentil, preparar_base
+from conexion_local import conectar
+
+HANDLER = PRD / "asignacion-lote-materia-prima-orden-produccion" / "asignacion-lote-materia-prima-orden-produccion.py"
+
+
+def cargar_handler(ruta: str):
+    spec = importlib.util.spec_from_file_location("asignacion_handler", ruta)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+def foto(cur, schema: str) -> Dict[str, Any]:
+    """Saldos de lotes, consumos por lote y estados de OP."""
+    cur.execute(f"SELECT id, cantidad_unitaria_disponible, estado FROM {schema}.lote_materia_prima")
+    lotes = {r[0]: (r[1], r[2]) for r in cur.fetchall()}
+    cur.execute(
+        f"SELECT id_lote_materia_prima, SUM(cantidad_utilizada) FROM {schema}.materia_prima_por_orden_produccion GROUP BY 1"
+    )
+    consumos = {r[0]: r[1] for r in cur.fetchall()}
+    cur.execute(f"SELECT id, estado FROM {schema}.orden_produccion")
+    estados = {r[0]: r[1] for r in cur.fetchall()}
+    return {"lotes": lotes, "consumos": consumos, "estados": estados}
+
+
+def verificar(cur, schema: str, antes: Dict[str, Any], despues: Dict[str, Any]) -> List[str]:
+    errores = []
+    for lote_id, (disponible, estado) in despues["lotes"].items():
+        bajo = antes["lotes"][lote_id][0] - disponible
+        asignado = despues["consumos"].get(lote_id, 0) - antes["consumos"].get(lote_id, 0)
+        if bajo != asignado:
+            errores.append(f"lote {lote_id}: bajó {bajo} y se asignaron {asignado}")
+        if asignado and disponible == 0 and estado != "agotado":
+            errores.append(f"lote {lote_id}: sin saldo y en estado {estado}")
+
+    cur.execute(f"""
+        SELECT mpop.id_orden_produccion, lmp.id_materia_prima, SUM(mpop.cantidad_utilizada), MAX(op.cantidad * r.cantidad_unitaria)
+        FROM {schema}.materia_prima_por_orden_produccion mpop
+        JOIN {schema}.lote_materia_prima lmp ON lmp.id = mpop.id_lote_materia_prima
+        JOIN {schema}.orden_produccion op ON op.id = mpop.id_orden_produccion
+        JOIN {schema}.materia_prima_por_producto r ON r.id_producto = op.id_producto AND r.id_materia_prima = lmp.id_materia_prima
+        GROUP BY 1, 2
+        HAVING SUM(mpop.cantidad_utilizada) > MAX(op.cantidad * r.cantidad_unitaria)
+    """)
+    for op_id, materia_id, asignado, requerido in cur.fetchall():
+        errores.append(f"OP {op_id} materia {materia_id}: asignado {asignado} > requerido {requerido}")
+
+    listas = [
+        op_id for op_id, estado in despues["estados"].items()
+        if estado == "lista_para_produccion" and antes["estados"].get(op_id) != estado
+    ]
+    if listas:
+        cur.execute(f"""
+            SELECT op.id, r.id_materia_prima
+            FROM {schema}.orden_produccion op
+            JOIN {schema}.materia_prima_por_producto r ON r.id_producto = op.id_producto
+            LEFT JOIN (
+                SELECT mpop.id_orden_produccion, lmp.id_materia_prima, SUM(mpop.cantidad_utilizada) AS total
+                FROM {schema}.materia_prima_por_orden_produccion mpop
+                JOIN {schema}.lote_materia_prima lmp ON lmp.id = mpop.id_lote_materia_prima
+                GROUP BY 1, 2
+            ) a ON a.id_orden_produccion = op.id AND a.id_materia_prima = r.id_materia_prima
+            WHERE op.id = ANY(%s) AND COALESCE(a.total, 0) < op.cantidad * r.cantidad_unitaria
+        """, (listas,))
+        for op_id, materia_id in cur.fetchall():
+            errores.append(f"OP {op_id} lista_para_produccion sin toda la materia {materia_id}")
+    return errores
+
+
+def correr(handler, workers: int, rondas: int, limite: int, grupo: List[int], semilla: int) -> Tuple[List[Tuple[int, float, str]], float]:
+    def cliente(indice: int) -> List[Tuple[int, float, str]]:
+        rnd = random.Random(semilla + indice)
+        hechas = []
+        for _ in range(rondas):
+            if rnd.random() < 0.5:
+                payload: Dict[str, Any] = {"limite": limite}
+            else:
+                payload = {"ordenes_produccion": rnd.sample(grupo, min(limite, len(grupo)))}
+            t0 = time.perf_counter()
+            resp = handler.lambda_handler({"body": json.dumps(payload)}, None)
+            ms = (time.perf_counter() - t0) * 1000
+            detalle = "" if resp["statusCode"] == 200 else json.loads(resp["body"]).get("detail") or json.loads(resp["body"]).get("error", "")
+            hechas.append((resp["statusCode"], ms, detalle))
+        return hechas
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        resultados = [r for hechas in pool.map(cliente, range(workers)) for r in hechas]
+    return resultados, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--schema", default="asignacion")
+    parser.add_argument("--escala", choices=sorted(ESCALAS), default="10k")
+    parser.add_argument("--semilla", type=int, default=42, help="semilla de generar_dataset y de los clientes")
+    parser.add_argument("--reusar-base", action="store_true", help="no recrear el schema")
+    parser.add_argument("--workers", type=int, default=8, help="asignaciones en paralelo")
+    parser.add_argument("--rondas", type=int, default=5, help="invocaciones por worker")
+    parser.add_argument("--limite", type=int, default=50, help="OP por invocación")
+    parser.add_argument("--handler", default=str(HANDLER), help="archivo del handler a probar (p.ej. una versión anterior)")
+    args = parser.parse_args()
+
+    if not args.reusar_base:
+        preparar_base(args.schema, ESCALAS[args.escala], args.semilla)
+    instalar_entorno_local(args.schema, args.workers)
+    logging.disable(logging.WARNING)
+    handler = cargar_handler(args.handler)
+
+    conn = conectar()
+    cur = conn.cursor()
+    cur.execute(f"SELECT id FROM {args.schema}.orden_produccion WHERE estado = 'planificada' ORDER BY id")
+    planificadas = [r[0] for r in cur.fetchall()]
+    # Grupo chico compartido por las listas explícitas: fuerza el solapamiento.
+    grupo = random.Random(args.semilla).sample(planificadas, min(len(planificadas), args.limite * 3))
+    antes = foto(cur, args.schema)
+    conn.rollback()
+
+    resultados, segundos = correr(handler, args.workers, args.rondas, args.limite, grupo, args.semilla)
+
+    despues = foto(cur, args.schema)
+    errores = verificar(cur, args.schema, antes, despues)
+    conn.rollback()
+    conn.close()
+
+    fallidas = [(status, detalle) for status, _, detalle in resultados if status != 200 and "No se encontraron" not in detalle]
+    sin_ordenes = sum(1 for status, _, detalle in resultados if status != 200 and "No se encontraron" in detalle)
+    tiempos = [ms for _, ms, _ in resultados]
+    listas = sum(
+        1 for op_id, estado in despues["estados"].items()
+        if estado == "lista_para_produccion" and antes["estados"].get(op_id) != estado
+    )
+    print(
+        f"schema={args.schema} workers={args.workers} rondas={args.rondas} limite={args.limite}: "
+        f"{len(resultados)} invocaciones en {segundos:.2f}s, p50 {percentil(tiempos, 50):.0f} ms, "
+        f"p95 {percentil(tiempos, 95):.0f} ms; {sin_ordenes} sin OP libres; {listas} OP pasaron a lista_para_produccion"
+    )
+    for status, detalle in fallidas[:10]:
+        print(f"  FALLÓ {status}: {detalle}")
+    for error in errores[:20]:
+        print(f"  INCONSISTENCIA {error}")
+    if fallidas or errores:
+        print(f"ERROR: {len(fallidas)} invocaciones fallidas, {len(errores)} inconsistencias")
+        sys.exit(1)
+    print("OK: sin fallas ni inconsistencias")
+
+
+if __name__ == "__main__":
+    main()
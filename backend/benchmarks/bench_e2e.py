@@ -0,0 +1,305 @@
+"""Harness end-to-end: reproduce eventos de API Gateway contra un PostgreSQL local.
+
+Pasos:
+1. Crea el schema de trabajo (`--schema`, default `bench`) y aplica
+   `backend/base de datos/schema.sql` y `mock.sql`.
+2. Escala los datos (`--escala 10k|100k|1M` órdenes de venta) con
+   `generar_dataset.py`: catálogo, líneas, lotes, clientes geocodificados,
+   órdenes de producción, vehículos y envíos, por COPY y de forma
+   determinística (misma `--semilla`, mismos datos; fechas relativas al día de
+   ejecución).
+3. Invoca en el mismo proceso, vía `api-router`, el `lambda_handler` de cada
+   evento grabado en `backend/benchmarks/eventos/*.json`.
+4. Reporta por endpoint latencia p50/p95/p99, la primera invocación (import
+   del handler), consultas y filas leídas por request, la mayor cantidad de
+   repeticiones de una misma forma de SQL (N+1) y el presupuesto declarado
+   (ver alimentapp.instrumentacion). Con `--estricto` los requests que
+   exceden su presupuesto cuentan como error.
+
+SSM y boto3 se reemplazan por stubs locales (no se llama a AWS) y la
+conexión de `alimentapp.db` apunta a la base local sin SSL. Con
+`--concurrencia N` se simulan N clientes en paralelo (N conexiones en el
+pool, como N contenedores calientes).
+
+Uso:
+
+    PGHOST=localhost PGUSER=postgres PGPASSWORD=postgres \\
+        python backend/benchmarks/bench_e2e.py --escala 10k --iteraciones 50
+    python backend/benchmarks/bench_e2e.py --reusar-base --concurrencia 8 --json base.json
+
+Los eventos son de lectura (o idempotentes), así que se pueden repetir sin
+alterar los datos entre iteraciones.
+"""
+
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+BACKEND = Path(__file__).resolve().parents[1]
+PRD = BACKEND / "lambda" / "prd"
+BASE_DATOS = BACKEND / "base de datos"
+EVENTOS_DIR = Path(__file__).resolve().parent / "eventos"
+sys.path.insert(0, str(BACKEND / "lambda" / "layer" / "python"))
+
+from alimentapp import instrumentacion  # noqa: E402
+from alimentapp.instrumentacion import Registro, medir  # noqa: E402
+from conexion_local import conectar  # noqa: E402
+from generar_dataset import generar  # noqa: E402
+
+ESCALAS = {"mock": 0, "10k": 10_000, "100k": 100_000, "1M": 1_000_000}
+
+
+# --------------------------
+# PREPARACIÓN DE LA BASE
+# --------------------------
+def preparar_base(schema: str, ordenes: int, semilla: int) -> None:
+    """Recrea el schema, aplica schema.sql + mock.sql y escala los datos."""
+    conn = conectar()
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+    cur.execute(f"CREATE SCHEMA {schema}")
+    cur.execute(f"SET search_path TO {schema}")
+    for archivo in ("schema.sql", "mock.sql"):
+        t0 = time.perf_counter()
+        cur.execute((BASE_DATOS / archivo).read_text(encoding="utf-8"))
+        print(f"{archivo} aplicado en {time.perf_counter() - t0:.1f}s")
+    if ordenes:
+        t0 = time.perf_counter()
+        generar(cur, ordenes, semilla)
+        print(f"escala {ordenes} órdenes de venta en {time.perf_counter() - t0:.1f}s")
+    cur.execute("ANALYZE")
+    conn.close()
+
+
+# --------------------------
+# STUBS DE AWS
+# --------------------------
+class ClienteAWSLocal:
+    """Cliente boto3 falso: registra las llamadas y devuelve respuestas mínimas."""
+
+    def __init__(self, servicio: str):
+        self.servicio = servicio
+        self.llamadas: List[Tuple[str, Dict[str, Any]]] = []
+
+    def __getattr__(self, operacion: str):
+        def llamar(**kwargs):
+            self.llamadas.append((operacion, kwargs))
+            if operacion == "invoke":
+                return {"StatusCode": 202, "Payload": types.SimpleNamespace(read=lambda: b"{}")}
+            return {}
+
+        return llamar
+
+
+def instalar_boto3_local() -> types.ModuleType:
+    """Reemplaza boto3 en sys.modules para que get_client() nunca llegue a AWS."""
+    modulo = types.ModuleType("boto3")
+    modulo.clientes = {}
+    modulo.client = lambda servicio, **kwargs: modulo.clientes.setdefault(servicio, ClienteAWSLocal(servicio))
+    sys.modules["boto3"] = modulo
+    return modulo
+
+
+def instalar_entorno_local(schema: str, pool_size: int):
+    """Configura alimentapp para la base local y devuelve el módulo del router."""
+    os.environ["DB_SCHEMA"] = schema
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    instalar_boto3_local()
+
+    from alimentapp import db
+
+    db.DB_CONFIG = {"local": True}  # nunca se consulta SSM
+    db.POOL_SIZE = pool_size
+    db._connect = conectar  # get_connection() la envuelve con la instrumentación de consultas
+
+    spec = importlib.util.spec_from_file_location("api_router", PRD / "api-router" / "api-router.py")
+    router = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(router)
+    return router
+
+
+# --------------------------
+# EJECUCIÓN
+# --------------------------
+def cargar_eventos(filtro: Optional[str]) -> List[Tuple[str, Dict[str, Any]]]:
+    eventos = []
+    for archivo in sorted(EVENTOS_DIR.glob("*.json")):
+        if filtro and filtro not in archivo.stem:
+            continue
+        eventos.append((archivo.stem, json.loads(archivo.read_text(encoding="utf-8"))))
+    return eventos
+
+
+def invocar(router, evento: Dict[str, Any]) -> Tuple[float, Registro, int]:
+    """Invoca el router midiendo latencia y consultas; status -1 si el handler levantó excepción."""
+    t0 = time.perf_counter()
+    try:
+        nombre = router.resolver(evento.get("httpMethod", ""), evento.get("path", "")) or evento.get("path", "")
+        with medir(nombre) as registro:
+            resp = router.lambda_handler(json.loads(json.dumps(evento)), None)
+        status = int(resp.get("statusCode", 0))
+    except Exception:
+        status = -1
+    ms = (time.perf_counter() - t0) * 1000
+    return ms, registro, status
+
+
+class Resultado:
+    def __init__(self, nombre: str, handler: Optional[str]):
+        self.nombre = nombre
+        self.handler = handler
+        self.frio_ms: Optional[float] = None
+        self.tiempos: List[float] = []
+        self.consultas: List[int] = []
+        self.filas: List[int] = []
+        self.repeticiones = 0
+        self.presupuesto: Optional[int] = None
+        self.errores = 0
+        self._lock = threading.Lock()
+
+    def agregar(self, ms: float, registro: Registro, status: int) -> None:
+        with self._lock:
+            self.tiempos.append(ms)
+            self.consultas.append(registro.consultas)
+            self.filas.append(registro.filas)
+            self.repeticiones = max([self.repeticiones] + [f.veces for f in registro.repetidas()])
+            self.presupuesto = registro.presupuesto
+            if not 200 <= status < 300:
+                self.errores += 1
+
+
+def percentil(valores: List[float], p: float) -> float:
+    """Percentil por rango más cercano."""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    k = max(0, min(len(ordenados) - 1, int(round(p / 100 * len(ordenados) + 0.5)) - 1))
+    return ordenados[k]
+
+
+def correr(router, eventos, iteraciones: int, concurrencia: int, semilla: int) -> Tuple[Dict[str, Resultado], float]:
+    resultados: Dict[str, Resultado] = {}
+    for nombre, evento in eventos:
+        r = Resultado(nombre, router.resolver(evento.get("httpMethod", ""), evento.get("path", "")))
+        # Primera invocación por separado: incluye el import del handler y la preparación de sentencias.
+        ms, _, status = invocar(router, evento)
+        r.frio_ms = ms
+        if not 200 <= status < 300:
+            r.errores += 1
+        resultados[nombre] = r
+
+    def cliente(indice: int) -> int:
+        rnd = random.Random(semilla + indice)
+        orden = list(eventos)
+        hechos = 0
+        for _ in range(iteraciones):
+            rnd.shuffle(orden)
+            for nombre, evento in orden:
+                resultados[nombre].agregar(*invocar(router, evento))
+                hechos += 1
+        return hechos
+
+    t0 = time.perf_counter()
+    if concurrencia <= 1:
+        total = cliente(0)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+            total = sum(pool.map(cliente, range(concurrencia)))
+    duracion = time.perf_counter() - t0
+    return resultados, (total / duracion if duracion else 0.0)
+
+
+def reportar(resultados: Dict[str, Resultado], throughput: float, args, salida: Optional[str]) -> None:
+    print(
+        f"\nschema={args.schema} escala={args.escala} iteraciones={args.iteraciones} "
+        f"concurrencia={args.concurrencia} throughput={throughput:.1f} req/s"
+    )
+    ancho = max([len("endpoint")] + [len(n) for n in resultados])
+    print(
+        f"{'endpoint':<{ancho}} {'n':>5} {'err':>4} {'frío':>8} {'p50':>8} {'p95':>8} {'p99':>8} "
+        f"{'consultas':>9} {'filas':>8} {'N+1':>6} {'presup':>6}"
+    )
+    filas_json = []
+    for r in resultados.values():
+        fila = {
+            "endpoint": r.nombre,
+            "handler": r.handler,
+            "n": len(r.tiempos),
+            "errores": r.errores,
+            "frio_ms": r.frio_ms,
+            "p50_ms": percentil(r.tiempos, 50),
+            "p95_ms": percentil(r.tiempos, 95),
+            "p99_ms": percentil(r.tiempos, 99),
+            "consultas_por_request": statistics.mean(r.consultas) if r.consultas else 0,
+            "filas_por_request": statistics.mean(r.filas) if r.filas else 0,
+            "max_repeticiones": r.repeticiones,
+            "presupuesto": r.presupuesto,
+        }
+        filas_json.append(fila)
+        print(
+            f"{r.nombre:<{ancho}} {fila['n']:>5} {fila['errores']:>4} {fila['frio_ms']:>6.1f}ms "
+            f"{fila['p50_ms']:>6.2f}ms {fila['p95_ms']:>6.2f}ms {fila['p99_ms']:>6.2f}ms "
+            f"{fila['consultas_por_request']:>9.1f} {fila['filas_por_request']:>8.0f} "
+            f"{r.repeticiones or '-':>6} {'-' if r.presupuesto is None else r.presupuesto:>6}"
+        )
+    if salida:
+        with open(salida, "w", encoding="utf-8") as fh:
+            json.dump(
+                {
+                    "escala": args.escala,
+                    "iteraciones": args.iteraciones,
+                    "concurrencia": args.concurrencia,
+                    "throughput_rps": throughput,
+                    "endpoints": filas_json,
+                },
+                fh,
+                indent=2,
+            )
+        print(f"\nresultados guardados en {salida}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--schema", default="bench")
+    parser.add_argument("--escala", choices=sorted(ESCALAS), default="mock")
+    parser.add_argument("--semilla", type=int, default=42, help="semilla de generar_dataset para escalar")
+    parser.add_argument("--reusar-base", action="store_true", help="no recrear el schema")
+    parser.add_argument("--iteraciones", type=int, default=20, help="pasadas por evento y por cliente")
+    parser.add_argument("--concurrencia", type=int, default=1, help="clientes en paralelo")
+    parser.add_argument("--filtro", help="sólo eventos cuyo archivo contenga este texto")
+    parser.add_argument("--json", help="archivo donde guardar los resultados")
+    parser.add_argument(
+        "--estricto", action="store_true", help="contar como error los requests que exceden su presupuesto de consultas"
+    )
+    parser.add_argument("--log-consultas", action="store_true", help="mostrar la línea de resumen de cada request")
+    args = parser.parse_args()
+
+    instrumentacion.ESTRICTO = args.estricto
+    if args.log_consultas:
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+    else:
+        logging.getLogger(instrumentacion.__name__).disabled = True
+
+    if not args.reusar_base:
+        preparar_base(args.schema, ESCALAS[args.escala], args.semilla)
+
+    router = instalar_entorno_local(args.schema, max(1, args.concurrencia))
+    eventos = cargar_eventos(args.filtro)
+    resultados, throughput = correr(router, eventos, args.iteraciones, args.concurrencia, 1234)
+    reportar(resultados, throughput, args, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Benchmark: tiempo de import (cold start) de cada handler de backend/lambda/prd.
+
+Cada handler se importa en un intérprete nuevo (como en un contenedor frío) y
+se mide el tiempo de `exec_module`, indicando además si el import arrastró
+boto3/botocore. Con `--ref` se mide también el mismo árbol en otra revisión de
+git (p.ej. la anterior a la carga perezosa de clientes AWS) para comparar.
+
+Requiere pg8000 y boto3 instalados localmente. No abre conexiones ni llama a
+AWS: sólo importa los módulos.
+
+Uso:
+
+    python backend/benchmarks/bench_import_handlers.py --repeticiones 5
+    python backend/benchmarks/bench_import_handlers.py --ref HEAD~1 get-clientes get-producto
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, List, Optional
+
+REPO = Path(__file__).resolve().parents[2]
+LAMBDA_DIR = Path("backend") / "lambda"
+
+# Se ejecuta en un proceso hijo: importa un handler y reporta tiempo y módulos cargados.
+MEDICION = """
+import importlib.util, json, sys, time
+sys.path.insert(0, sys.argv[2])
+t0 = time.perf_counter()
+spec = importlib.util.spec_from_file_location("handler", sys.argv[1])
+mod = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(mod)
+ms = (time.perf_counter() - t0) * 1000
+print(json.dumps({"ms": ms, "boto3": "boto3" in sys.modules, "botocore": "botocore" in sys.modules}))
+"""
+
+
+def handlers(raiz: Path, nombres: List[str]) -> Dict[str, Path]:
+    """{handler: archivo principal} (el .py con el mismo nombre que la carpeta)."""
+    prd = raiz / LAMBDA_DIR / "prd"
+    encontrados = {}
+    for carpeta in sorted(prd.iterdir()):
+        archivo = carpeta / f"{carpeta.name}.py"
+        if archivo.is_file() and (not nombres or carpeta.name in nombres):
+            encontrados[carpeta.name] = archivo
+    return encontrados
+
+
+def medir(archivo: Path, layer: Path, repeticiones: int) -> Optional[Dict[str, object]]:
+    tiempos = []
+    resultado = None
+    env = dict(os.environ, AWS_DEFAULT_REGION=os.getenv("AWS_DEFAULT_REGION", "us-east-1"))
+    for _ in range(repeticiones):
+        proc = subprocess.run(
+            [sys.executable, "-c", MEDICION, str(archivo), str(layer)],
+            capture_output=True,
+            text=True,
+            cwd=archivo.parent,
+            env=env,
+        )
+        if proc.returncode != 0:
+            return None
+        resultado = json.loads(proc.stdout.strip().splitlines()[-1])
+        tiempos.append(resultado["ms"])
+    resultado["ms"] = statistics.median(tiempos)
+    return resultado
+
+
+def extraer_ref(ref: str, destino: Path) -> None:
+    """Extrae backend/lambda de la revisión `ref` en `destino`."""
+    data = subprocess.run(
+        ["git", "archive", ref, str(LAMBDA_DIR)], cwd=REPO, capture_output=True, check=True
+    ).stdout
+    with tarfile.open(fileobj=BytesIO(data)) as tar:
+        tar.extractall(destino)
+
+
+def formato(r: Optional[Dict[str, object]]) -> str:
+    if r is None:
+        return f"{'error':>19}"
+    aws = "boto3" if r["boto3"] else ("botocore" if r["botocore"] else "-")
+    return f"{r['ms']:>8.1f}ms {aws:>8}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("handlers", nargs="*", help="handlers a medir (default: todos)")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--ref", help="revisión de git contra la cual comparar")
+    args = parser.parse_args()
+
+    actuales = handlers(REPO, args.handlers)
+    layer = REPO / LAMBDA_DIR / "layer" / "python"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        anteriores: Dict[str, Path] = {}
+        if args.ref:
+            extraer_ref(args.ref, Path(tmp))
+            anteriores = handlers(Path(tmp), args.handlers)
+        layer_ref = Path(tmp) / LAMBDA_DIR / "layer" / "python"
+
+        encabezado = f"{'handler':<52} {'actual':>19}"
+        if args.ref:
+            encabezado += f" {args.ref:>19}"
+        print(encabezado)
+        for nombre, archivo in actuales.items():
+            linea = f"{nombre:<52} {formato(medir(archivo, layer, args.repeticiones))}"
+            if args.ref:
+                previo = anteriores.get(nombre)
+                linea += f" {formato(medir(previo, layer_ref, args.repeticiones)) if previo else 'n/a':>19}"
+            print(linea)
+
+
+if __name__ == "__main__":
+    main()
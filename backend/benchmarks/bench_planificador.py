@@ -0,0 +1,90 @@
+"""Benchmark: selección de línea del planificador greedy (recorrido lineal vs heap).
+
+Genera entradas sintéticas (líneas, compatibilidades y órdenes pendientes) y
+corre `alimentapp.planificacion.calcular_plan` con `SelectorLineal` (la regla
+de referencia, O(L) por tanda) y con `SelectorLineas` (heap por conjunto de
+compatibilidad, O(log L)). Verifica que ambos planes sean idénticos y reporta
+el tiempo de cada uno para distintas cantidades de líneas.
+
+No usa base de datos: importa la layer directamente.
+
+Uso:
+
+    python backend/benchmarks/bench_planificador.py
+    python backend/benchmarks/bench_planificador.py --lineas 10 100 1000 --ordenes 5000 --limitar
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+REPO = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO / "backend" / "lambda" / "layer" / "python"))
+
+from alimentapp.planificacion import SelectorLineal, SelectorLineas, calcular_plan  # noqa: E402
+
+
+def generar_entradas(
+    lineas: int, ordenes: int, productos: int, compatibilidad: float, factor: int, semilla: int
+) -> Tuple[Dict[int, int], Dict[int, List[int]], Dict[int, int], List[Dict[str, Any]], Dict[int, int]]:
+    """Entradas de `calcular_plan` (en gramos) deterministas para una semilla."""
+    rnd = random.Random(semilla)
+    capacidades = {lid: rnd.choice((200, 300, 500, 800, 1000)) * 1000 for lid in range(1, lineas + 1)}
+    por_producto = max(1, round(lineas * compatibilidad))
+    compat = {pid: rnd.sample(range(1, lineas + 1), por_producto) for pid in range(1, productos + 1)}
+    secuencias = {lid: rnd.randint(0, 20) for lid in range(1, lineas + 1) if rnd.random() < 0.5}
+    pendientes = [
+        {
+            "id": oid,
+            "id_producto": rnd.randint(1, productos),
+            "gramos_pendientes": rnd.randint(50, 5000) * 1000 + rnd.randint(0, 99) * 10,
+        }
+        for oid in range(1, ordenes + 1)
+    ]
+    diarias = {lid: cap * factor for lid, cap in capacidades.items()}
+    return capacidades, compat, secuencias, pendientes, diarias
+
+
+def medir(entradas, limitar: bool, selector, repeticiones: int):
+    capacidades, compat, secuencias, pendientes, diarias = entradas
+    tiempos = []
+    plan = None
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        plan = calcular_plan(capacidades, compat, secuencias, pendientes, diarias if limitar else None, selector=selector)
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(tiempos), plan
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lineas", type=int, nargs="+", default=[5, 20, 100, 500, 2000])
+    parser.add_argument("--ordenes", type=int, default=3000)
+    parser.add_argument("--productos", type=int, default=40)
+    parser.add_argument("--compatibilidad", type=float, default=0.5, help="fracción de líneas compatible con cada producto")
+    parser.add_argument("--limitar", action="store_true", help="acotar la carga por línea (planificador principal)")
+    parser.add_argument("--factor", type=int, default=20, help="capacidad del período = capacidad de tanda * factor")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'lineas':>7} {'tandas':>8} {'lineal ms':>10} {'heap ms':>9} {'x':>6}  plan")
+    for lineas in args.lineas:
+        entradas = generar_entradas(lineas, args.ordenes, args.productos, args.compatibilidad, args.factor, args.semilla)
+        ms_lineal, plan_lineal = medir(entradas, args.limitar, SelectorLineal, args.repeticiones)
+        ms_heap, plan_heap = medir(entradas, args.limitar, SelectorLineas, args.repeticiones)
+        igual = (plan_lineal.tandas, plan_lineal.alertas) == (plan_heap.tandas, plan_heap.alertas)
+        print(
+            f"{lineas:>7} {len(plan_heap.tandas):>8} {ms_lineal:>10.1f} {ms_heap:>9.1f} "
+            f"{ms_lineal / ms_heap:>6.1f}  {'idéntico' if igual else 'DISTINTO'}"
+        )
+        if not igual:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Benchmark: requerimientos de materia prima de todo el backlog con `alimentapp.recetas`.
+
+Sobre un schema con `generar_dataset.py` calcula lo que piden todas las OP
+`pendiente`/`planificada`:
+
+- fila por fila con `Decimal` (OP × ítem de receta, como se hacía en cada módulo);
+- con `Recetas.requerimiento` (matriz producto × materia por el vector de
+  unidades por producto, en centésimos enteros).
+
+Verifica que ambos den lo mismo que el requerido de `totales_materia_prima`
+(lo que mantienen los triggers del libro de stock) y que los faltantes contra el
+stock disponible (`faltantes`) coincidan con `vista_faltantes_globales_mp`.
+Sale con código 1 si algo difiere.
+
+Uso:
+
+    PGHOST=/tmp/pgdata python backend/benchmarks/bench_recetas.py --escala 100k
+    python backend/benchmarks/bench_recetas.py --reusar-base --schema recetas --repeticiones 20
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from decimal import Decimal
+from typing import Any, Dict, List, Mapping
+
+from bench_e2e import ESCALAS, instalar_entorno_local, preparar_base
+from conexion_local import conectar
+
+
+def por_filas(ordenes: List[Mapping[str, Any]], recetas: Dict[int, List[Mapping[str, Any]]]) -> Dict[int, Decimal]:
+    """La cuenta de referencia: cada OP recorre su receta con Decimal."""
+    total: Dict[int, Decimal] = {}
+    for op in ordenes:
+        for item in recetas.get(op["id_producto"], []):
+            requerido = Decimal(str(op["cantidad"])) * Decimal(str(item["cantidad_unitaria"] or 0))
+            total[item["id_materia_prima"]] = total.get(item["id_materia_prima"], Decimal("0")) + requerido
+    return total
+
+
+def cronometrar(funcion, repeticiones: int):
+    tiempos = []
+    resultado = None
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        resultado = funcion()
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(tiempos), resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--schema", default="recetas")
+    parser.add_argument("--escala", choices=sorted(ESCALAS), default="10k")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--reusar-base", action="store_true", help="no recrear el schema")
+    parser.add_argument("--repeticiones", type=int, default=10)
+    args = parser.parse_args()
+
+    if not args.reusar_base:
+        preparar_base(args.schema, ESCALAS[args.escala], args.semilla)
+    instalar_entorno_local(args.schema, 1)
+
+    from alimentapp.cantidades import a_centesimos
+    from alimentapp.db import fetch_all
+    from alimentapp.recetas import cargar_recetas, faltantes
+
+    conn = conectar()
+    cur = conn.cursor()
+    s = args.schema
+    ordenes = fetch_all(cur, f"SELECT id, id_producto, cantidad FROM {s}.orden_produccion WHERE estado IN ('pendiente', 'planificada')")
+    filas_receta = fetch_all(cur, f"SELECT id_producto, id_materia_prima, cantidad_unitaria FROM {s}.materia_prima_por_producto ORDER BY id_producto, id")
+    por_producto: Dict[int, List[Mapping[str, Any]]] = {}
+    for r in filas_receta:
+        por_producto.setdefault(r["id_producto"], []).append(r)
+    t0 = time.perf_counter()
+    recetas = cargar_recetas(cur)
+    ms_carga = (time.perf_counter() - t0) * 1000
+
+    ms_filas, referencia = cronometrar(lambda: por_filas(ordenes, por_producto), args.repeticiones)
+    ms_matriz, requerido = cronometrar(lambda: recetas.requerimiento(ordenes), args.repeticiones)
+
+    libro = {r["id_materia_prima"]: a_centesimos(r["cantidad_requerida"]) for r in fetch_all(cur, f"SELECT * FROM {s}.totales_materia_prima")}
+    stock = {r["id_materia_prima"]: a_centesimos(r["cantidad_disponible"]) for r in fetch_all(cur, f"SELECT * FROM {s}.cantidad_disponible_materia_prima")}
+    vista = {r["id_materia_prima"]: a_centesimos(r["cantidad_faltante"]) for r in fetch_all(cur, f"SELECT * FROM {s}.vista_faltantes_globales_mp")}
+    ms_faltantes, calculados = cronometrar(lambda: faltantes(recetas.requerimiento(ordenes), stock), args.repeticiones)
+    conn.rollback()
+    conn.close()
+
+    def sin_ceros(d: Mapping[int, int]) -> Dict[int, int]:
+        return {k: v for k, v in d.items() if v}
+
+    errores = []
+    if sin_ceros({m: a_centesimos(v) for m, v in referencia.items()}) != sin_ceros(requerido):
+        errores.append("Recetas.requerimiento difiere de la cuenta fila por fila")
+    if sin_ceros(libro) != sin_ceros(requerido):
+        errores.append("Recetas.requerimiento difiere de totales_materia_prima")
+    if calculados != vista:
+        errores.append("faltantes difiere de vista_faltantes_globales_mp")
+
+    print(
+        f"schema={s}: {len(ordenes)} OP, {len(recetas)} productos con receta, {len(requerido)} materias; "
+        f"carga de recetas {ms_carga:.1f} ms"
+    )
+    print(f"  fila por fila (Decimal)   {ms_filas:8.2f} ms")
+    print(f"  Recetas.requerimiento     {ms_matriz:8.2f} ms  (x{ms_filas / max(ms_matriz, 1e-9):.0f})")
+    print(f"  faltantes del backlog     {ms_faltantes:8.2f} ms  ({len(calculados)} materias faltantes)")
+    for error in errores:
+        print(f"  ERROR {error}")
+    if errores:
+        sys.exit(1)
+    print("OK: mismos números que el libro de stock y la vista de faltantes")
+
+
+if __name__ == "__main__":
+    main()
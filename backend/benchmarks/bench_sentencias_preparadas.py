@@ -0,0 +1,187 @@
+"""Benchmark: SQL interpolado (f-string) vs sentencias preparadas del registro.
+
+Para cada consulta caliente registrada en los handlers mide:
+- latencia por ejecución con el SQL armado por interpolación (como antes),
+- latencia por ejecución vía RegistroSentencias (PARSE una vez, BIND/EXECUTE después),
+- "Planning Time" de Postgres (EXPLAIN ANALYZE) para la versión interpolada y
+  para la preparada una vez que el servidor pasa al plan genérico.
+
+Sólo ejecuta SELECTs; no modifica datos.
+
+Uso (contra una base local con schema.sql + mock.sql aplicados):
+
+    PGHOST=localhost PGUSER=postgres PGPASSWORD=postgres DB_SCHEMA=dev \\
+        python backend/benchmarks/bench_sentencias_preparadas.py --iteraciones 500
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+BACKEND = Path(__file__).resolve().parents[1]
+PRD = BACKEND / "lambda" / "prd"
+sys.path.insert(0, str(BACKEND / "lambda" / "layer" / "python"))
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+import pg8000  # noqa: E402
+
+from alimentapp.db import ENV  # noqa: E402
+
+# (handler, sentencia, SQL que devuelve una fila con los parámetros de muestra)
+CASOS = [
+    ("post-login-empleado", "rol_por_nombre", "SELECT nombre AS rol FROM {ENV}.rol LIMIT 1"),
+    (
+        "post-login-empleado",
+        "empleado_por_email_y_rol",
+        "SELECT email, id_rol FROM {ENV}.empleado LIMIT 1",
+    ),
+    (
+        "post-login-empleado",
+        "sesion_valida",
+        "SELECT id_empleado, password FROM {ENV}.sesion LIMIT 1",
+    ),
+    (
+        "post-entregar-envio-por-dni",
+        "envio_entregable_por_cuil",
+        """
+            SELECT e.id AS id_envio, regexp_replace(c.cuil, '[^0-9]', '', 'g') AS dni_cliente
+            FROM {ENV}.envio e
+            JOIN {ENV}.orden_venta ov ON ov.id = e.id_orden_venta
+            JOIN {ENV}.cliente c ON c.id = ov.id_cliente
+            LIMIT 1
+        """,
+    ),
+    (
+        "post-entregar-envio-por-dni",
+        "envios_activos_de_vehiculo",
+        "SELECT id AS id_vehiculo FROM {ENV}.vehiculo LIMIT 1",
+    ),
+    (
+        "get-aceptar-materia-prima-automatico",
+        "existe_codigo_lote",
+        "SELECT 'LT-ZZ00000Z' AS codigo_lote",
+    ),
+]
+
+
+def cargar_registro(handler: str):
+    """Importa el módulo del handler (nombre con guiones) y devuelve su registro SQL."""
+    path = PRD / handler / f"{handler}.py"
+    spec = importlib.util.spec_from_file_location(handler.replace("-", "_"), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.SQL
+
+
+def literal(value: Any) -> str:
+    """Renderiza un valor como literal SQL, igual que lo hacían los f-strings."""
+    if value is None:
+        return "NULL"
+    if isinstance(value, (int, float)):
+        return str(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def interpolar(sql: str, params: Dict[str, Any]) -> str:
+    """Reemplaza `:nombre` por literales (sin tocar casts `::tipo`)."""
+    return re.sub(r"(?<!:):(\w+)", lambda m: literal(params[m.group(1)]), sql)
+
+
+def a_posicional(sql: str, params: Dict[str, Any]):
+    """Convierte `:nombre` a `$n` para PREPARE/EXECUTE a nivel SQL (sólo para EXPLAIN)."""
+    orden: List[str] = []
+
+    def repl(m):
+        nombre = m.group(1)
+        if nombre not in orden:
+            orden.append(nombre)
+        return f"${orden.index(nombre) + 1}"
+
+    return re.sub(r"(?<!:):(\w+)", repl, sql), [params[n] for n in orden]
+
+
+def planning_ms(cur, sql: str) -> float:
+    cur.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}")
+    plan = cur.fetchall()[0][0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return float(plan[0]["Planning Time"])
+
+
+def medir(fn, iteraciones: int) -> Dict[str, float]:
+    tiempos = []
+    for _ in range(iteraciones):
+        t0 = time.perf_counter()
+        fn()
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    tiempos.sort()
+    return {
+        "p50_ms": statistics.median(tiempos),
+        "p95_ms": tiempos[int(len(tiempos) * 0.95) - 1],
+        "total_ms": sum(tiempos),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iteraciones", type=int, default=300)
+    args = parser.parse_args()
+
+    conn = pg8000.connect(
+        host=os.getenv("PGHOST", "localhost"),
+        port=int(os.getenv("PGPORT", "5432")),
+        database=os.getenv("PGDATABASE", "postgres"),
+        user=os.getenv("PGUSER", "postgres"),
+        password=os.getenv("PGPASSWORD", "postgres"),
+    )
+    conn.autocommit = True
+    cur = conn.cursor()
+
+    registros: Dict[str, Any] = {}
+    print(f"schema={ENV} iteraciones={args.iteraciones}")
+    print(f"{'sentencia':<32} {'interp p50':>11} {'prep p50':>9} {'plan interp':>12} {'plan prep':>10}")
+    for handler, nombre, muestra_sql in CASOS:
+        registro = registros.get(handler) or registros.setdefault(handler, cargar_registro(handler))
+        cur.execute(muestra_sql.replace("{ENV}", ENV))
+        fila = cur.fetchone()
+        if fila is None:
+            print(f"{nombre:<32} sin datos de muestra, se omite")
+            continue
+        params = dict(zip([d[0] for d in cur.description], fila))
+        sql = registro.sql(nombre)
+        sql_interp = interpolar(sql, params)
+
+        def interpolado():
+            cur.execute(sql_interp)
+            cur.fetchall()
+
+        def preparado():
+            registro.fetch_all(conn, nombre, **params)
+
+        r_interp = medir(interpolado, args.iteraciones)
+        r_prep = medir(preparado, args.iteraciones)
+
+        plan_interp = statistics.median(planning_ms(cur, sql_interp) for _ in range(10))
+        sql_pos, valores = a_posicional(sql, params)
+        cur.execute(f"PREPARE bench_{nombre} AS {sql_pos}")
+        execute = f"EXECUTE bench_{nombre}({', '.join(literal(v) for v in valores)})"
+        # A partir de la 6ta ejecución Postgres evalúa el plan genérico y deja de planificar.
+        plan_prep = [planning_ms(cur, execute) for _ in range(10)][-1]
+        cur.execute(f"DEALLOCATE bench_{nombre}")
+
+        print(
+            f"{nombre:<32} {r_interp['p50_ms']:>9.3f}ms {r_prep['p50_ms']:>7.3f}ms "
+            f"{plan_interp:>10.3f}ms {plan_prep:>8.3f}ms"
+        )
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
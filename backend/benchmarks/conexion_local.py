@@ -0,0 +1,31 @@
+"""Conexión pg8000 a un PostgreSQL local para los scripts de benchmarks.
+
+Se configura con las variables estándar `PGHOST`, `PGPORT`, `PGDATABASE`,
+`PGUSER` y `PGPASSWORD`; si `PGHOST` empieza con `/` se usa como directorio
+del socket unix.
+"""
+
+import os
+from typing import Any, Dict
+
+import pg8000
+
+
+def parametros_conexion() -> Dict[str, Any]:
+    """Parámetros pg8000 a partir de las variables PG* (PGHOST puede ser un directorio de socket)."""
+    host = os.getenv("PGHOST", "localhost")
+    port = int(os.getenv("PGPORT", "5432"))
+    params = {
+        "database": os.getenv("PGDATABASE", "postgres"),
+        "user": os.getenv("PGUSER", "postgres"),
+        "password": os.getenv("PGPASSWORD") or None,
+    }
+    if host.startswith("/"):
+        params["unix_sock"] = os.path.join(host, f".s.PGSQL.{port}")
+    else:
+        params.update(host=host, port=port)
+    return params
+
+
+def conectar():
+    return pg8000.connect(**parametros_conexion())
@@ -0,0 +1,454 @@
+"""Generador de datos sintéticos a escala de producción (COPY, determinístico por semilla).
+
+Carga en un schema volúmenes realistas para dimensionar el planificador y la
+asignación de envíos (k-medoids) antes de que les llegue carga real:
+
+- catálogo: productos, materias primas, recetas, proveedores y precios;
+- líneas de producción con sus productos compatibles;
+- lotes de materia prima con vencimientos alrededor de la fecha base;
+- clientes con direcciones geocodificadas en localidades cercanas a la base
+  (UNGS, el mismo punto que usa get-asignacion-automatica-envios);
+- órdenes de venta con fecha de entrega solicitada entre `--dias-historia`
+  atrás y `--dias-horizonte` adelante, con el estado que correspondería a esa
+  fecha, sus órdenes de producción y los envíos de las ya despachadas;
+- vehículos.
+
+Todo se escribe con `COPY ... FROM STDIN` (sin un INSERT por fila) y con ids
+explícitos a continuación de los existentes, así que se puede correr sobre
+`mock.sql` o sobre un schema vacío. La misma `--semilla`, los mismos volúmenes
+y la misma `--fecha-base` generan exactamente los mismos datos. Las órdenes
+llevan `observaciones = 'dataset'` para poder identificarlas.
+
+Uso:
+
+    PGHOST=localhost PGUSER=postgres PGPASSWORD=postgres \\
+        python backend/benchmarks/generar_dataset.py --schema dataset --crear-schema --ordenes 100000
+    python backend/benchmarks/generar_dataset.py --schema bench --ordenes 1000000 --fecha-base 2025-10-01
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+BASE_DATOS = Path(__file__).resolve().parents[1] / "base de datos"
+
+MARCA = "dataset"
+TZ = timezone(timedelta(hours=-3))
+
+# Punto base (UNGS) y localidades de reparto: (nombre, latitud, longitud).
+BASE_LAT = -34.521679
+BASE_LON = -58.701164
+LOCALIDADES = (
+    ("Los Polvorines", -34.507, -58.700),
+    ("San Miguel", -34.543, -58.712),
+    ("Jose C. Paz", -34.516, -58.768),
+    ("Bella Vista", -34.560, -58.690),
+    ("Pilar", -34.458, -58.914),
+    ("Moreno", -34.650, -58.790),
+    ("Hurlingham", -34.588, -58.639),
+    ("Tigre", -34.426, -58.580),
+    ("San Isidro", -34.471, -58.512),
+    ("Caseros", -34.605, -58.563),
+    ("Moron", -34.653, -58.619),
+    ("Palermo", -34.588, -58.430),
+)
+CALLES = ("Av. Presidente Peron", "Gutierrez", "Belgrano", "San Martin", "Rivadavia", "Mitre",
+          "Sarmiento", "Moreno", "Italia", "Av. Libertador", "Paunero", "Tribulato")
+
+TIPOS_PRODUCTO = ("Empanadas", "Hamburguesas", "Pizza", "Milanesas", "Tarta", "Medallones",
+                  "Ravioles", "Sorrentinos", "Croquetas", "Nuggets", "Canelones", "Lasagna")
+VARIANTES = ("Carne", "Pollo", "Verdura", "Jamon y Queso", "Muzzarella", "Calabaza",
+             "Espinaca", "Cuatro Quesos", "Soja", "Pescado")
+INSUMOS_KG = ("Carne picada", "Harina 000", "Cebolla", "Muzzarella", "Pollo trozado", "Pan rallado",
+              "Acelga", "Ricota", "Manteca", "Sal fina", "Condimentos", "Calabaza", "Espinaca",
+              "Jamon cocido", "Queso cremoso", "Aceite")
+INSUMOS_UNIDAD = ("Huevos", "Bandejas", "Bolsas", "Cajas", "Etiquetas", "Film")
+
+# Estados de OV según la fecha de entrega solicitada respecto de la fecha base: (estado, peso).
+ESTADOS_OV_PASADAS = (("entregada", 85), ("cancelada", 5), ("despachado", 10))
+ESTADOS_OV_INMEDIATAS = (("lista", 30), ("asignada_para_envio", 30), ("despachado", 25), ("entregada", 15))
+ESTADOS_OV_FUTURAS = (("pendiente", 15), ("pendiente_supervision", 5), ("confirmada", 40),
+                      ("en_produccion", 20), ("lista", 10), ("asignada_para_envio", 10))
+ESTADOS_LOTE = (("disponible", 70), ("agotado", 10), ("en_cuarentena", 10), ("pedido_generado", 5),
+                ("rechazado", 5))
+TIPOS_VEHICULO = (("camioneta", 50, 800, 1500), ("auto", 30, 300, 500), ("camion", 20, 3000, 8000))
+
+# Tablas con id SERIAL que carga el generador (para reajustar las secuencias).
+TABLAS = ("producto", "materia_prima", "materia_prima_por_producto", "proveedor",
+          "proveedor_por_materia_prima", "linea_produccion", "producto_por_linea_produccion",
+          "lote_materia_prima", "cliente", "direccion", "vehiculo", "orden_venta",
+          "orden_produccion", "envio")
+
+FILAS_POR_MENSAJE = 1000
+
+
+# --------------------------
+# COPY
+# --------------------------
+def _linea(valores: Sequence[Any]) -> str:
+    """Fila CSV para COPY; None es NULL. Los textos generados no llevan comas ni comillas."""
+    return ",".join("" if v is None else str(v) for v in valores) + "\n"
+
+
+def _agrupar(lineas: Iterable[str]) -> Iterator[str]:
+    """Agrupa filas en mensajes CopyData de FILAS_POR_MENSAJE filas."""
+    lote: List[str] = []
+    for linea in lineas:
+        lote.append(linea)
+        if len(lote) >= FILAS_POR_MENSAJE:
+            yield "".join(lote)
+            lote = []
+    if lote:
+        yield "".join(lote)
+
+
+def copiar(cur, tabla: str, columnas: Sequence[str], filas: Iterable[Sequence[Any]]) -> int:
+    """COPY de `filas` (iterable, se consume en streaming) a `tabla`; devuelve la cantidad de filas."""
+    contador = [0]
+
+    def lineas() -> Iterator[str]:
+        for fila in filas:
+            contador[0] += 1
+            yield _linea(fila)
+
+    t0 = time.perf_counter()
+    cur.execute(f"COPY {tabla} ({', '.join(columnas)}) FROM STDIN (FORMAT csv)", stream=_agrupar(lineas()))
+    print(f"  {tabla:<32} {contador[0]:>10} filas en {time.perf_counter() - t0:6.1f}s")
+    return contador[0]
+
+
+class Diferido:
+    """Filas de una tabla hija escritas a un archivo temporal mientras se genera la tabla padre."""
+
+    def __init__(self):
+        self.archivo = tempfile.TemporaryFile("w+", encoding="utf-8", newline="")
+        self.filas = 0
+
+    def agregar(self, valores: Sequence[Any]) -> None:
+        self.archivo.write(_linea(valores))
+        self.filas += 1
+
+    def copiar(self, cur, tabla: str, columnas: Sequence[str]) -> int:
+        self.archivo.seek(0)
+        t0 = time.perf_counter()
+        cur.execute(f"COPY {tabla} ({', '.join(columnas)}) FROM STDIN (FORMAT csv)", stream=self.archivo)
+        print(f"  {tabla:<32} {self.filas:>10} filas en {time.perf_counter() - t0:6.1f}s")
+        self.archivo.close()
+        return self.filas
+
+
+def _siguiente_id(cur, tabla: str) -> int:
+    cur.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {tabla}")
+    return int(cur.fetchone()[0])
+
+
+def _elegir(rnd: random.Random, opciones: Sequence[Tuple]) -> Tuple:
+    """Elige una tupla (valor, peso, ...) según su peso."""
+    return rnd.choices(opciones, weights=[o[1] for o in opciones])[0]
+
+
+def _momento(dia: date, rnd: random.Random) -> str:
+    """Timestamp con zona horaria en horario laboral del día dado."""
+    return datetime.combine(dia, dtime(8 + rnd.randrange(10), rnd.randrange(60)), TZ).isoformat()
+
+
+# --------------------------
+# GENERADORES POR ENTIDAD
+# --------------------------
+def generar_catalogo(cur, rnd: random.Random, productos: int, materias_primas: int) -> Dict[str, Any]:
+    """Productos, materias primas, recetas, proveedores y precios por proveedor."""
+    id_prod = _siguiente_id(cur, "producto")
+    pesos = {id_prod + i: round(rnd.uniform(0.3, 2.0), 3) for i in range(productos)}
+    precios = {pid: round(peso * rnd.uniform(2500, 5000), 2) for pid, peso in pesos.items()}
+    copiar(cur, "producto", ("id", "nombre", "descripcion", "peso_unitario_kg", "precio_venta"), (
+        (pid, f"{rnd.choice(TIPOS_PRODUCTO)} de {rnd.choice(VARIANTES)} #{pid}", "Producto congelado",
+         peso, precios[pid])
+        for pid, peso in pesos.items()
+    ))
+
+    id_mp = _siguiente_id(cur, "materia_prima")
+    unidades: Dict[int, str] = {}
+    expirables: Dict[int, bool] = {}
+    por_compra: Dict[int, int] = {}
+    filas_mp = []
+    for mid in range(id_mp, id_mp + materias_primas):
+        if rnd.random() < 0.75:
+            unidades[mid], nombre = "kilogramos", rnd.choice(INSUMOS_KG)
+            expirables[mid] = rnd.random() < 0.6
+            por_compra[mid] = rnd.choice((1, 5, 10, 25))
+        else:
+            unidades[mid], nombre = "unidad", rnd.choice(INSUMOS_UNIDAD)
+            expirables[mid] = nombre == "Huevos"
+            por_compra[mid] = rnd.choice((12, 50, 100))
+        filas_mp.append((mid, f"{nombre} #{mid}", unidades[mid], por_compra[mid], expirables[mid]))
+    copiar(cur, "materia_prima", ("id", "nombre", "unidad_medida", "cantidad_por_unidad_compra", "expirabile"), filas_mp)
+
+    ids_mp = list(unidades)
+    receta = []
+    for pid, peso in pesos.items():
+        for mid in rnd.sample(ids_mp, min(len(ids_mp), rnd.randint(3, 8))):
+            cantidad = max(0.01, round(peso * rnd.uniform(0.05, 0.5), 2)) if unidades[mid] == "kilogramos" else rnd.randint(1, 3)
+            receta.append((pid, mid, cantidad))
+    copiar(cur, "materia_prima_por_producto", ("id_producto", "id_materia_prima", "cantidad_unitaria"), receta)
+
+    id_prov = _siguiente_id(cur, "proveedor")
+    ids_prov = list(range(id_prov, id_prov + max(5, materias_primas // 10)))
+    copiar(cur, "proveedor", ("id", "razon_social", "cuil", "nombre_contacto", "telefono", "email"), (
+        (pv, f"Proveedor {pv} SA", f"30-{pv:08d}-{pv % 10}", "Contacto", f"11-4{pv % 1000:03d}-{pv % 10000:04d}",
+         f"ventas{pv}@proveedor.{MARCA}")
+        for pv in ids_prov
+    ))
+    proveedores_mp: Dict[int, List[int]] = {}
+    precios_proveedor = []
+    for mid in ids_mp:
+        proveedores_mp[mid] = rnd.sample(ids_prov, rnd.randint(1, 3))
+        for pv in proveedores_mp[mid]:
+            # Precio por unidad de compra (bolsa, caja, maple...), no por kilo o unidad suelta.
+            unitario = rnd.uniform(200, 3000) if unidades[mid] == "kilogramos" else rnd.uniform(20, 300)
+            precios_proveedor.append((pv, mid, round(unitario * por_compra[mid], 2)))
+    copiar(cur, "proveedor_por_materia_prima", ("id_proveedor", "id_materia_prima", "precio"), precios_proveedor)
+
+    return {
+        "pesos": pesos,
+        "precios": precios,
+        "unidades": unidades,
+        "expirables": expirables,
+        "proveedores_mp": proveedores_mp,
+    }
+
+
+def generar_lineas(cur, rnd: random.Random, lineas: int, productos: Sequence[int]) -> None:
+    """Líneas con capacidad diaria y compatibilidades (cada producto en 1 a 3 líneas, ninguna línea vacía)."""
+    id_linea = _siguiente_id(cur, "linea_produccion")
+    ids = list(range(id_linea, id_linea + lineas))
+    copiar(cur, "linea_produccion", ("id", "nombre", "descripcion", "capacidad_maxima_kg"), (
+        (lid, f"Linea {lid}", "Linea generada", rnd.randrange(200, 1600, 50)) for lid in ids
+    ))
+    compatibles = set()
+    for pid in productos:
+        for lid in rnd.sample(ids, min(len(ids), rnd.randint(1, 3))):
+            compatibles.add((lid, pid))
+    for lid in ids:
+        if not any(c[0] == lid for c in compatibles):
+            compatibles.add((lid, rnd.choice(productos)))
+    copiar(cur, "producto_por_linea_produccion", ("id_linea_produccion", "id_producto"), sorted(compatibles))
+
+
+def generar_lotes(cur, rnd: random.Random, catalogo: Dict[str, Any], lotes_por_mp: int, fecha_base: date) -> None:
+    """Lotes por materia prima; los expirables vencen entre dos semanas atrás y seis meses adelante."""
+    def filas():
+        for mid, unidad in catalogo["unidades"].items():
+            for k in range(1, lotes_por_mp + 1):
+                ingreso = fecha_base - timedelta(days=rnd.randrange(90))
+                vencimiento = ingreso + timedelta(days=rnd.randint(15, 180)) if catalogo["expirables"][mid] else None
+                total = round(rnd.uniform(50, 2000), 2) if unidad == "kilogramos" else rnd.randint(100, 5000)
+                if vencimiento is not None and vencimiento < fecha_base:
+                    estado = "vencido"
+                else:
+                    estado = _elegir(rnd, ESTADOS_LOTE)[0]
+                disponible = {"disponible": round(total * rnd.uniform(0.1, 1), 2), "agotado": 0}.get(estado, total)
+                yield (mid, rnd.choice(catalogo["proveedores_mp"][mid]), f"L{mid}-{k:04d}", _momento(ingreso, rnd),
+                       vencimiento, total, disponible, estado, _momento(ingreso - timedelta(days=rnd.randint(2, 10)), rnd))
+
+    copiar(cur, "lote_materia_prima", ("id_materia_prima", "id_proveedor", "codigo_lote", "fecha_ingreso",
+                                      "fecha_vencimiento", "cantidad_total", "cantidad_unitaria_disponible",
+                                      "estado", "fecha_generacion_pedido"), filas())
+
+
+def generar_clientes(cur, rnd: random.Random, clientes: int) -> Dict[int, int]:
+    """Clientes con dirección principal (y a veces una secundaria); devuelve {id_cliente: id_direccion_principal}."""
+    id_cli = _siguiente_id(cur, "cliente")
+    id_dir = _siguiente_id(cur, "direccion")
+    ids = range(id_cli, id_cli + clientes)
+    copiar(cur, "cliente", ("id", "razon_social", "email", "cuil", "nombre_contacto", "apellido_contacto", "telefono"), (
+        (cid, f"Cliente {cid} SRL", f"compras{cid}@cliente.{MARCA}", f"30-{cid:08d}-{cid % 10}",
+         "Nombre", "Apellido", f"11-5{cid % 1000:03d}-{cid % 10000:04d}")
+        for cid in ids
+    ))
+
+    principales: Dict[int, int] = {}
+    direcciones = []
+    for cid in ids:
+        for principal in (True, False) if rnd.random() < 0.2 else (True,):
+            localidad, lat, lon = rnd.choice(LOCALIDADES)
+            direcciones.append((id_dir, cid, f"{rnd.choice(CALLES)} {rnd.randint(100, 5000)} - {localidad}",
+                                round(rnd.gauss(lat, 0.015), 6), round(rnd.gauss(lon, 0.015), 6), principal))
+            if principal:
+                principales[cid] = id_dir
+            id_dir += 1
+    copiar(cur, "direccion", ("id", "id_cliente", "direccion_text", "latitud", "longitud", "es_principal"), direcciones)
+
+    cur.execute(
+        """
+        UPDATE cliente c SET id_direccion_principal = d.id
+        FROM direccion d
+        WHERE d.id_cliente = c.id AND d.es_principal AND c.id >= %s
+        """,
+        (id_cli,),
+    )
+    return principales
+
+
+def generar_vehiculos(cur, rnd: random.Random, vehiculos: int) -> List[int]:
+    id_veh = _siguiente_id(cur, "vehiculo")
+    ids = list(range(id_veh, id_veh + vehiculos))
+    filas = []
+    for vid in ids:
+        tipo, _, cap_min, cap_max = _elegir(rnd, TIPOS_VEHICULO)
+        filas.append((vid, "Transportes Norte", "Chofer", f"Apellido{vid}", str(20_000_000 + vid), tipo,
+                      f"GN{vid:05d}", f"Modelo {tipo}", rnd.randrange(cap_min, cap_max + 1, 50),
+                      rnd.choice(("blanco", "gris", "azul")), rnd.random() < 0.85))
+    copiar(cur, "vehiculo", ("id", "empresa", "nombre_conductor", "apellido_conductor", "dni_conductor",
+                             "tipo_unidad", "patente", "modelo", "capacidad_kg", "color", "disponible"), filas)
+    return ids
+
+
+def _estado_op(estado_ov: str, rnd: random.Random) -> str:
+    if estado_ov in ("pendiente", "pendiente_supervision"):
+        return "pendiente"
+    if estado_ov == "confirmada":
+        return "lista_para_produccion" if rnd.random() < 0.7 else "planificada"
+    if estado_ov == "en_produccion":
+        return rnd.choice(("en_proceso", "finalizada", "lista_para_produccion"))
+    if estado_ov == "cancelada":
+        return "cancelada"
+    return "finalizada"
+
+
+def generar_ordenes(cur, rnd: random.Random, ordenes: int, principales: Dict[int, int], precios: Dict[int, float],
+                    vehiculos: List[int], fecha_base: date, dias_historia: int, dias_horizonte: int) -> None:
+    """Órdenes de venta con sus órdenes de producción y envíos (estado coherente con la fecha de entrega)."""
+    cur.execute("SELECT id FROM empleado ORDER BY id")
+    empleados = [r[0] for r in cur.fetchall()] or [None]
+    ids_prod = list(precios)
+    ids_cli = list(principales)
+
+    id_ov = _siguiente_id(cur, "orden_venta")
+    ops = Diferido()
+    envios = Diferido()
+
+    def filas():
+        for ov in range(id_ov, id_ov + ordenes):
+            entrega = fecha_base + timedelta(days=rnd.randint(-dias_historia, dias_horizonte))
+            pedido = entrega - timedelta(days=rnd.randint(2, 15))
+            atraso = (entrega - fecha_base).days
+            if atraso < -3:
+                estado = _elegir(rnd, ESTADOS_OV_PASADAS)[0]
+            elif atraso < 0:
+                estado = _elegir(rnd, ESTADOS_OV_INMEDIATAS)[0]
+            else:
+                estado = _elegir(rnd, ESTADOS_OV_FUTURAS)[0]
+
+            valor = 0.0
+            fin = _momento(entrega - timedelta(days=1), rnd) if estado in (
+                "lista", "asignada_para_envio", "despachado", "entregada") else None
+            for pid in rnd.sample(ids_prod, min(len(ids_prod), rnd.randint(1, 4))):
+                cantidad = rnd.randint(1, 60)
+                valor += cantidad * precios[pid]
+                ops.agregar((ov, pid, pedido, fin, _estado_op(estado, rnd), cantidad, MARCA))
+
+            cliente = rnd.choice(ids_cli)
+            con_envio = rnd.random() < 0.85
+            entrega_real = None
+            if estado == "entregada":
+                entrega_real = _momento(entrega + timedelta(days=rnd.choice((-1, 0, 0, 0, 1, 2))), rnd)
+            if con_envio and estado in ("asignada_para_envio", "despachado", "entregada"):
+                envios.agregar((
+                    ov, rnd.choice(vehiculos),
+                    {"asignada_para_envio": "pendiente", "despachado": "despachado"}.get(estado, "entregado"),
+                    _momento(entrega - timedelta(days=1), rnd) if estado != "asignada_para_envio" else None,
+                    entrega_real,
+                ))
+            yield (ov, cliente, rnd.choice(empleados), _momento(pedido, rnd), _momento(entrega, rnd), entrega_real,
+                   estado, round(valor, 2), con_envio, principales[cliente] if con_envio else None, MARCA,
+                   rnd.random() < 0.05)
+
+    copiar(cur, "orden_venta", ("id", "id_cliente", "id_empleado", "fecha_pedido", "fecha_entrega_solicitada",
+                                "fecha_entrega_real", "estado", "valor_total_pedido", "con_envio",
+                                "id_direccion_entrega", "observaciones", "prioritario"), filas())
+    ops.copiar(cur, "orden_produccion", ("id_orden_venta", "id_producto", "fecha_creacion", "fecha_fin", "estado",
+                                         "cantidad", "observaciones"))
+    envios.copiar(cur, "envio", ("id_orden_venta", "id_vehiculo", "estado", "fecha_despacho", "fecha_entrega"))
+
+
+# --------------------------
+# ENTRADA
+# --------------------------
+def generar(
+    cur,
+    ordenes: int,
+    semilla: int = 42,
+    fecha_base: Optional[date] = None,
+    clientes: Optional[int] = None,
+    productos: int = 40,
+    materias_primas: int = 120,
+    lineas: int = 8,
+    lotes_por_mp: int = 6,
+    vehiculos: Optional[int] = None,
+    dias_historia: int = 180,
+    dias_horizonte: int = 30,
+) -> None:
+    """Genera el dataset completo en el schema del search_path actual (dentro de la transacción del cursor)."""
+    rnd = random.Random(semilla)
+    fecha_base = fecha_base or date.today()
+    clientes = clientes or max(50, ordenes // 20)
+    vehiculos = vehiculos or max(5, ordenes // 400)
+
+    catalogo = generar_catalogo(cur, rnd, productos, materias_primas)
+    generar_lineas(cur, rnd, lineas, list(catalogo["pesos"]))
+    generar_lotes(cur, rnd, catalogo, lotes_por_mp, fecha_base)
+    principales = generar_clientes(cur, rnd, clientes)
+    ids_vehiculos = generar_vehiculos(cur, rnd, vehiculos)
+    generar_ordenes(cur, rnd, ordenes, principales, catalogo["precios"], ids_vehiculos,
+                    fecha_base, dias_historia, dias_horizonte)
+
+    # Los ids se cargaron explícitos: las secuencias tienen que seguir desde el máximo.
+    for tabla in TABLAS:
+        cur.execute(f"SELECT setval(pg_get_serial_sequence('{tabla}', 'id'), (SELECT MAX(id) FROM {tabla}))")
+
+
+def main():
+    from conexion_local import conectar
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--schema", default=MARCA)
+    parser.add_argument("--crear-schema", action="store_true", help="recrear el schema y aplicar schema.sql")
+    parser.add_argument("--ordenes", type=int, default=10_000, help="órdenes de venta")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--fecha-base", type=date.fromisoformat, help="día de referencia (default: hoy)")
+    parser.add_argument("--clientes", type=int, help="default: ordenes / 20")
+    parser.add_argument("--productos", type=int, default=40)
+    parser.add_argument("--materias-primas", type=int, default=120)
+    parser.add_argument("--lineas", type=int, default=8)
+    parser.add_argument("--lotes-por-mp", type=int, default=6)
+    parser.add_argument("--vehiculos", type=int, help="default: ordenes / 400")
+    parser.add_argument("--dias-historia", type=int, default=180)
+    parser.add_argument("--dias-horizonte", type=int, default=30)
+    args = parser.parse_args()
+
+    conn = conectar()
+    cur = conn.cursor()
+    if args.crear_schema:
+        cur.execute(f"DROP SCHEMA IF EXISTS {args.schema} CASCADE")
+        cur.execute(f"CREATE SCHEMA {args.schema}")
+    cur.execute(f"SET search_path TO {args.schema}")
+    if args.crear_schema:
+        cur.execute((BASE_DATOS / "schema.sql").read_text(encoding="utf-8"))
+
+    t0 = time.perf_counter()
+    generar(cur, args.ordenes, args.semilla, args.fecha_base, args.clientes, args.productos,
+            args.materias_primas, args.lineas, args.lotes_por_mp, args.vehiculos,
+            args.dias_historia, args.dias_horizonte)
+    conn.commit()
+    conn.autocommit = True
+    cur.execute("ANALYZE")
+    conn.close()
+    print(f"dataset generado en {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Capa compartida de AlimentApp para las Lambdas de backend/lambda/prd."""
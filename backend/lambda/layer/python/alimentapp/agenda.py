@@ -0,0 +1,390 @@
+"""Agenda diaria de OP: entradas del planificador, plan por día hábil y agenda guardada.
+
+El planificador principal calcula con `calcular_plan_diario` el plan de todo
+el backlog, con cada tanda ubicada en un día hábil, y guarda las tandas con
+su horario. La agenda por día (`planificacion_diaria`) se arma después con
+una consulta sobre esas tandas (`agenda_desde_tandas`): no hay un segundo
+plan, así que el día de una tanda es el mismo en `tanda_produccion` y en la
+agenda.
+
+La simulación de OV y el MRP usan las mismas entradas, el mismo orden de
+prioridad y el mismo `CAPACIDAD_DIARIA_FACTOR` para planes que no se guardan:
+la simulación carga las entradas una sola vez, incluyendo las OP de las OV
+simuladas aunque todavía no estén `lista_para_produccion`, y calcula el plan
+base y el plan con cada OV sin escribir nada.
+
+Uso:
+
+    entradas = cargar_entradas(cur)
+    plan = calcular_plan_diario(entradas)
+    agenda = armar_agenda(plan, {o["id"]: o for o in entradas.ordenes}, fecha_base())   # en memoria
+    agenda = agenda_desde_tandas(cur, fecha_base())                                     # lo guardado
+    guardar_planificacion(cur, agenda)
+"""
+
+import logging
+import os
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+try:
+    from zoneinfo import ZoneInfo  # Python 3.9+
+except ImportError:  # pragma: no cover
+    ZoneInfo = None  # Fallback a offset fijo si no está disponible
+
+from alimentapp.cantidades import a_gramos
+from alimentapp.db import ENV, fetch_all
+from alimentapp.planificacion import Calendario, Plan, calcular_plan_por_componentes, dias_habiles
+
+logger = logging.getLogger(__name__)
+
+ESTADOS_TANDA_FIRMES = ("en_progreso", "completada")
+ZONA_HORARIA = "America/Argentina/Buenos_Aires"
+# Capacidad diaria de una línea = capacidad_maxima_kg * factor (tandas por día). Única definición.
+CAPACIDAD_DIARIA_FACTOR = int(os.getenv("CAPACIDAD_DIARIA_FACTOR", "2"))
+
+Agenda = List[Dict[str, List[Dict[str, Any]]]]
+
+
+class PlanningError(Exception):
+    """Errores funcionales durante la planificación/preview."""
+
+
+class EntradasPlan(NamedTuple):
+    """Entradas de `calcular_plan` leídas de la base (cantidades en gramos)."""
+
+    capacidades: Dict[int, int]
+    compatibilidades: Dict[int, List[int]]
+    secuencias: Dict[int, int]
+    ordenes: List[Dict[str, Any]]
+
+
+def decimal_value(value: Any, contexto: Optional[str] = None, default: Optional[str] = None) -> Decimal:
+    """normaliza a Decimal con mensajes claros para cálculos monetarios/medidas."""
+    if value is None or (isinstance(value, str) and not value.strip()):
+        if default is not None:
+            return Decimal(default)
+        raise PlanningError(f"{contexto or 'Valor numérico'} ausente")
+    try:
+        return Decimal(str(value))
+    except (InvalidOperation, ValueError, TypeError):
+        raise PlanningError(f"{contexto or 'Valor numérico'} inválido: {value}")
+
+
+def obtener_lineas_activas(cur) -> Dict[int, Dict[str, Any]]:
+    """retorna líneas activas con su capacidad máxima en gramos."""
+    sql = f"""
+        SELECT id, nombre, capacidad_maxima_kg
+        FROM {ENV}.linea_produccion
+        WHERE activa = TRUE
+    """
+    rows = fetch_all(cur, sql)
+    if not rows:
+        raise PlanningError("No hay líneas de producción activas.")
+    return {
+        int(r["id"]): {
+            "nombre": r["nombre"],
+            "capacidad": a_gramos(decimal_value(r["capacidad_maxima_kg"], contexto=f"capacidad línea {r['nombre']}"))
+        }
+        for r in rows
+    }
+
+
+def obtener_secuencias_existentes(cur) -> Dict[int, int]:
+    """obtiene última secuencia usada por línea (para continuidad)."""
+    sql = f"""
+        SELECT linea_produccion_id, COALESCE(MAX(secuencia_en_linea), 0) AS max_sec
+        FROM {ENV}.tanda_produccion
+        WHERE estado = ANY(%s)
+        GROUP BY linea_produccion_id
+    """
+    rows = fetch_all(cur, sql, (list(ESTADOS_TANDA_FIRMES),))
+    return {int(r["linea_produccion_id"]): int(r["max_sec"]) for r in rows}
+
+
+def obtener_compatibilidades(cur) -> Dict[int, List[int]]:
+    """mapa producto → líneas compatibles."""
+    sql = f"SELECT id_producto, id_linea_produccion FROM {ENV}.producto_por_linea_produccion"
+    rows = fetch_all(cur, sql)
+    compat: Dict[int, List[int]] = {}
+    for r in rows:
+        compat.setdefault(int(r["id_producto"]), []).append(int(r["id_linea_produccion"]))
+    return compat
+
+
+def obtener_ordenes_pendientes(cur, ids_orden_venta: Sequence[int] = ()) -> List[Dict[str, Any]]:
+    """calcula gramos pendientes por OP (kg_totales − kg firmes).
+
+    Con `ids_orden_venta` también trae las OP de esas OV en cualquier estado
+    (cada orden lleva su `estado` para separarlas después).
+    """
+    filtro = "op.estado = 'lista_para_produccion'"
+    params: Tuple[Any, ...] = (list(ESTADOS_TANDA_FIRMES),)
+    if ids_orden_venta:
+        filtro += " OR op.id_orden_venta = ANY(%s::int[])"
+        params += ([int(i) for i in ids_orden_venta],)
+    sql = f"""
+        SELECT
+            op.id,
+            op.id_producto,
+            op.id_orden_venta,
+            op.estado,
+            p.nombre AS producto,
+            op.cantidad,
+            op.fecha_creacion,
+            ov.fecha_entrega_solicitada,
+            ov.prioritario,
+            p.peso_unitario_kg,
+            COALESCE(SUM(tp.cantidad_kg), 0) AS kg_firmes
+        FROM {ENV}.orden_produccion op
+        JOIN {ENV}.producto p ON p.id = op.id_producto
+        LEFT JOIN {ENV}.orden_venta ov ON ov.id = op.id_orden_venta
+        LEFT JOIN {ENV}.tanda_produccion tp
+            ON tp.orden_produccion_id = op.id
+           AND tp.estado = ANY(%s)
+        WHERE {filtro}
+        GROUP BY op.id, op.id_producto, op.id_orden_venta, op.estado, p.nombre, op.cantidad, op.fecha_creacion,
+                 ov.fecha_entrega_solicitada, ov.prioritario, p.peso_unitario_kg
+    """
+    rows = fetch_all(cur, sql, params)
+    ordenes: List[Dict[str, Any]] = []
+    for r in rows:
+        cantidad = decimal_value(r["cantidad"], contexto=f"cantidad OP {r['id']}")
+        peso_unit = decimal_value(r["peso_unitario_kg"], contexto=f"peso producto {r['id_producto']}")
+        kg_total = cantidad * peso_unit
+        kg_firmes = decimal_value(r["kg_firmes"], contexto=f"firmes OP {r['id']}", default="0")
+        gramos_pend = a_gramos(kg_total) - a_gramos(kg_firmes)
+        if gramos_pend <= 0:
+            continue
+        ordenes.append({
+            "id": int(r["id"]),
+            "id_producto": int(r["id_producto"]),
+            "id_orden_venta": r["id_orden_venta"],
+            "estado": r["estado"],
+            "producto": r["producto"],
+            "gramos_pendientes": gramos_pend,
+            "fecha_creacion": r["fecha_creacion"],
+            "fecha_entrega_solicitada": r["fecha_entrega_solicitada"],
+            "prioritario": bool(r.get("prioritario")) if "prioritario" in r else False,
+        })
+    return ordenes
+
+
+def ordenar_ordenes(ordenes: List[Dict[str, Any]]) -> None:
+    """ordena OP por due date y luego prioritario; empata con antigüedad (EDD + prioridad + FIFO)."""
+    def key_fn(item: Dict[str, Any]) -> Tuple[Any, int, Any, int]:
+        due = item["fecha_entrega_solicitada"]
+        due_key = due if isinstance(due, datetime) else datetime.max.replace(tzinfo=timezone.utc)
+        prio = 0 if item.get("prioritario") else 1  # prioritario=True primero
+        return (due_key, prio, item["fecha_creacion"], item["id"])
+    ordenes.sort(key=key_fn)
+
+
+def cargar_entradas(cur, ids_orden_venta: Sequence[int] = ()) -> EntradasPlan:
+    """Lee líneas, compatibilidades, secuencias firmes y OP pendientes (ya ordenadas por prioridad)."""
+    lineas = obtener_lineas_activas(cur)
+    compat = obtener_compatibilidades(cur)
+    secuencias = obtener_secuencias_existentes(cur)
+    ordenes = obtener_ordenes_pendientes(cur, ids_orden_venta)
+    ordenar_ordenes(ordenes)
+    return EntradasPlan({lid: data["capacidad"] for lid, data in lineas.items()}, compat, secuencias, ordenes)
+
+
+def calcular_plan_diario(
+    entradas: EntradasPlan,
+    ordenes: Optional[Sequence[Mapping[str, Any]]] = None,
+    factor: int = CAPACIDAD_DIARIA_FACTOR,
+) -> Plan:
+    """Plan greedy con cada tanda ubicada en un día hábil (capacidad diaria = capacidad * factor).
+
+    Sin límite de capacidad por período: los días necesarios salen del
+    calendario. `ordenes` (un subconjunto de `entradas.ordenes`, en el mismo
+    orden) permite planificar variantes sin volver a leer la base. Las
+    componentes independientes de líneas se planifican en paralelo.
+    """
+    calendario = Calendario({lid: capacidad * factor for lid, capacidad in entradas.capacidades.items()})
+    return calcular_plan_por_componentes(
+        entradas.capacidades,
+        entradas.compatibilidades,
+        entradas.secuencias,
+        entradas.ordenes if ordenes is None else ordenes,
+        calendario=calendario,
+    )
+
+
+def _siguiente_habil(d: datetime) -> datetime:
+    """avanza al próximo día hábil si d es sábado/domingo."""
+    while d.weekday() >= 5:
+        d = d + timedelta(days=1)
+    return d
+
+
+def fecha_base() -> date:
+    """hoy en AR (o UTC-3) movido al próximo día hábil: primer día de la agenda."""
+    if ZoneInfo is not None:
+        now_local = datetime.now(ZoneInfo(ZONA_HORARIA))
+    else:
+        now_local = datetime.now(timezone(timedelta(hours=-3)))
+    return _siguiente_habil(now_local).date()
+
+
+def estado_pedido(fecha_plan: str, fecha_entrega: Optional[datetime]) -> str:
+    """clasifica la OP según fecha planificada vs fecha_entrega_solicitada."""
+    if not fecha_entrega:
+        return "en_tiempo"
+    try:
+        fp = datetime.fromisoformat(fecha_plan).date()
+    except Exception:
+        return "en_tiempo"
+    if isinstance(fecha_entrega, datetime):
+        fe = fecha_entrega.date()
+    elif isinstance(fecha_entrega, date):
+        fe = fecha_entrega
+    else:
+        return "en_tiempo"
+    diff = (fe - fp).days
+    if diff < 0:
+        return "atrasado"
+    if diff == 1:
+        return "por_vencer"
+    return "en_tiempo"
+
+
+def _agendar(fechas: Sequence[str], tandas: Iterable[Tuple[Optional[int], int, Any]]) -> Agenda:
+    """agenda sobre `fechas` a partir de (índice del día, OP, fecha_entrega) en el orden de las colas."""
+    agenda: Agenda = [{f: []} for f in fechas]
+    vistos_por_dia: List[set] = [set() for _ in fechas]
+    # Una OP aparece una vez por día.
+    for dia, op_id, fecha_entrega in tandas:
+        if op_id in vistos_por_dia[dia]:
+            continue
+        vistos_por_dia[dia].add(op_id)
+        fecha = fechas[dia]
+        agenda[dia][fecha].append({
+            "estado_pedido": estado_pedido(fecha, fecha_entrega),
+            "id_orden_produccion": op_id,
+        })
+    return agenda
+
+
+def armar_agenda(plan: Plan, ordenes: Mapping[int, Mapping[str, Any]], base: date) -> Agenda:
+    """agenda por día hábil desde `base` (una entrada por OP y día, en el orden de las colas)."""
+    fechas = [d.isoformat() for d in dias_habiles(base, plan.calendario.dias)]
+
+    def tandas() -> Iterable[Tuple[Optional[int], int, Any]]:
+        # Mismo orden que las colas (línea, secuencia).
+        for t in plan.por_linea():
+            op_id = t.orden_produccion_id
+            if t.dia is None:
+                logger.warning("[preview] Línea %s con capacidad diaria 0; omitiendo tanda OP %s (kg=%s)", t.linea_produccion_id, op_id, t.cantidad_kg)
+                continue
+            yield t.dia, op_id, ordenes[op_id]["fecha_entrega_solicitada"]
+
+    return _agendar(fechas, tandas())
+
+
+def agenda_desde_tandas(cur, base: date) -> Agenda:
+    """agenda por día hábil de las tandas `planificada` guardadas, con el día que les dio el planificador.
+
+    Una consulta. Empieza en `base` o en el primer día con tandas si es
+    anterior (un plan que todavía no se recalculó sigue a la vista) y llega
+    hasta el último; las tandas sin horario (línea sin capacidad) no entran.
+    """
+    # Fechas como texto: pg8000 las parsea con strptime, que con miles de tandas domina el tiempo.
+    filas = fetch_all(
+        cur,
+        f"""
+            SELECT t.orden_produccion_id,
+                   (t.fecha_inicio_planificada AT TIME ZONE %s)::date::text AS dia,
+                   (ov.fecha_entrega_solicitada AT TIME ZONE 'UTC')::date::text AS entrega
+            FROM {ENV}.tanda_produccion t
+            JOIN {ENV}.orden_produccion op ON op.id = t.orden_produccion_id
+            LEFT JOIN {ENV}.orden_venta ov ON ov.id = op.id_orden_venta
+            WHERE t.estado = 'planificada' AND t.fecha_inicio_planificada IS NOT NULL
+            ORDER BY t.linea_produccion_id, t.secuencia_en_linea, t.id
+        """,
+        (ZONA_HORARIA,),
+    )
+    dias = {r["dia"]: date.fromisoformat(r["dia"]) for r in filas}
+    desde = min([base, *dias.values()])
+    ultimo = max([base, *dias.values()])
+    fechas = [d.isoformat() for d in dias_habiles(desde, (ultimo - desde).days + 1) if d <= ultimo]
+    indice = {f: i for i, f in enumerate(fechas)}
+    return _agendar(
+        fechas,
+        (
+            # estado_pedido compara contra el día (UTC) de fecha_entrega_solicitada, como con el datetime.
+            (indice[r["dia"]], int(r["orden_produccion_id"]), date.fromisoformat(r["entrega"]) if r["entrega"] else None)
+            for r in filas
+        ),
+    )
+
+
+def subir_version_agenda(cur) -> None:
+    """Invalida la agenda en cache del planificador diario: sube planificacion_diaria_version una vez.
+
+    La llama el planificador al final de cada plan, después de escribir las
+    tandas y `planificacion_diaria`; la fila queda bloqueada sólo hasta el
+    commit, que sigue enseguida.
+    """
+    cur.execute(
+        f"""
+            INSERT INTO {ENV}.planificacion_diaria_version AS v (id, version) VALUES (1, 1)
+            ON CONFLICT (id) DO UPDATE SET version = v.version + 1
+        """
+    )
+
+
+def guardar_planificacion(cur, agenda: Agenda) -> Dict[str, int]:
+    """aplica a {ENV}.planificacion_diaria sólo la diferencia con la agenda guardada, en la transacción de `cur`.
+
+    Un upsert para las filas (fecha, OP) nuevas o que cambiaron de posición y
+    un DELETE para las que ya no están. Sin TRUNCATE no se toma ACCESS
+    EXCLUSIVE: los lectores siguen viendo la agenda anterior hasta el commit,
+    sin bloquearse y sin ver nunca la tabla vacía.
+    """
+    # Serializa dos regeneraciones simultáneas (la diferencia se calcula sobre lo leído).
+    cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (f"{ENV}.planificacion_diaria",))
+    guardadas = {
+        (r["fecha"].isoformat(), int(r["id_orden_produccion"])): int(r["posicion"])
+        for r in fetch_all(cur, f"SELECT fecha, id_orden_produccion, posicion FROM {ENV}.planificacion_diaria")
+    }
+    nuevas: Dict[Tuple[str, int], int] = {}
+    for item in agenda:
+        fecha = next(iter(item))
+        for posicion, fila in enumerate(item[fecha]):
+            nuevas[(fecha, int(fila["id_orden_produccion"]))] = posicion
+
+    cambios = [(clave, posicion) for clave, posicion in nuevas.items() if guardadas.get(clave) != posicion]
+    bajas = [clave for clave in guardadas if clave not in nuevas]
+    if cambios:
+        cur.execute(
+            f"""
+                INSERT INTO {ENV}.planificacion_diaria (fecha, id_orden_produccion, posicion)
+                SELECT fecha, op_id, posicion
+                FROM unnest(%s::date[], %s::int[], %s::int[]) AS n(fecha, op_id, posicion)
+                ON CONFLICT (fecha, id_orden_produccion) DO UPDATE SET posicion = EXCLUDED.posicion
+            """,
+            (
+                [fecha for (fecha, _), _ in cambios],
+                [op_id for (_, op_id), _ in cambios],
+                [posicion for _, posicion in cambios],
+            ),
+        )
+    if bajas:
+        cur.execute(
+            f"""
+                DELETE FROM {ENV}.planificacion_diaria pd
+                USING unnest(%s::date[], %s::int[]) AS b(fecha, op_id)
+                WHERE pd.fecha = b.fecha AND pd.id_orden_produccion = b.op_id
+            """,
+            ([fecha for fecha, _ in bajas], [op_id for _, op_id in bajas]),
+        )
+    altas = sum(1 for clave, _ in cambios if clave not in guardadas)
+    return {
+        "altas": altas,
+        "movidas": len(cambios) - altas,
+        "bajas": len(bajas),
+        "sin_cambios": len(nuevas) - len(cambios),
+    }
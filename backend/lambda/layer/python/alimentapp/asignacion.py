@@ -0,0 +1,279 @@
+"""Asignación de lotes de materia prima a un lote de órdenes de producción.
+
+Tres pasos, con la misma cantidad de consultas para 1 o para cientos de órdenes:
+
+    cargar_insumos      recetas, consumos ya asignados y lotes candidatos de todas
+                        las órdenes (lotes bloqueados FOR UPDATE)
+    asignar_lotes       reparto en memoria, orden por orden: cada materia faltante
+                        se toma de los lotes que vencen primero
+    guardar_asignacion  filas de materia_prima_por_orden_produccion, saldos de los
+                        lotes tocados y OP completas, un INSERT y dos UPDATE sobre unnest
+
+Las órdenes se atienden en el orden recibido y comparten el saldo en memoria
+de los lotes: una orden anterior consume primero, igual que asignándolas una
+por una. Cantidades en centésimos enteros (`alimentapp.cantidades`).
+
+Concurrencia: varias asignaciones pueden correr a la vez sin deadlocks.
+
+    órdenes   cada corrida bloquea sus OP antes de leer nada (`reclamar_ordenes`):
+              las elegidas por urgencia se toman con SKIP LOCKED, así dos
+              corridas nunca asignan la misma OP; una lista explícita espera
+              por sus OP, en orden de id
+    lotes     se bloquean en una sola sentencia en orden de id (un orden
+              global); el orden FEFO se arma después, en memoria. Quien espera
+              un lote sólo tiene bloqueados lotes de id menor, así que no hay
+              ciclos, y al obtenerlo lee el saldo que dejó la otra corrida
+
+Uso:
+
+    ordenes = reclamar_ordenes(cur, ids, limite)
+    insumos = cargar_insumos(cur, ordenes, fecha_corte)
+    asignacion = asignar_lotes(ordenes, insumos)
+    guardar_asignacion(cur, asignacion)
+    asignacion.resultados
+"""
+
+import logging
+from datetime import date, datetime
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+from alimentapp.cantidades import CENTESIMOS, a_centesimos, desde_centesimos
+from alimentapp.db import ENV, fetch_all
+from alimentapp.recetas import Recetas, cargar_recetas
+
+logger = logging.getLogger(__name__)
+
+LIMITE_POR_DEFECTO = 50
+
+
+class ValidationError(Exception):
+    """Errores de negocio en la asignacion de materia prima."""
+
+
+class Insumos(NamedTuple):
+    """Lo que lee `cargar_insumos` (centésimos)."""
+
+    recetas: Recetas  # producto × materia, por unidad
+    consumos: Dict[int, Dict[int, int]]  # orden → materia → ya asignado
+    lotes: Dict[int, List[List[int]]]  # materia → [[lote, disponible]] en orden FEFO
+
+
+class Asignacion(NamedTuple):
+    """Resultado de `asignar_lotes`, listo para `guardar_asignacion`."""
+
+    resultados: List[Dict[str, Any]]
+    filas: List[Tuple[int, int, int]]  # (lote, orden, centésimos usados)
+    saldos: Dict[int, int]  # lote tocado → disponible final
+    completas: List[int]
+
+
+def _cantidad(orden: Mapping[str, Any]) -> int:
+    return int(orden["cantidad"])
+
+
+def _faltantes(
+    orden: Mapping[str, Any], recetas: Recetas, consumos: Mapping[int, Mapping[int, int]]
+) -> List[Tuple[int, int, int, int]]:
+    """(materia, requerido, ya asignado, faltante) por ítem de la receta de la orden."""
+    ya_asignado = consumos.get(int(orden["id"]), {})
+    items = []
+    for materia_id, requerido in recetas.de_orden(orden):
+        asignado = ya_asignado.get(materia_id, 0)
+        items.append((materia_id, requerido, asignado, requerido - asignado))
+    return items
+
+
+def reclamar_ordenes(cur, ids: Optional[Sequence[int]] = None, limite: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Bloquea (FOR UPDATE) y devuelve las OP a asignar, en el orden en que se atienden.
+
+    Con `ids`, esas OP en orden de id, esperando si otra corrida las tiene.
+    Sin `ids`, las `limite` OP `planificada` de entrega más próxima que no
+    estén tomadas por otra corrida (SKIP LOCKED).
+    """
+    if ids:
+        sql = f"""
+            SELECT id, id_producto, cantidad, estado
+            FROM {ENV}.orden_produccion
+            WHERE id = ANY(%s::int[])
+            ORDER BY id
+            FOR UPDATE
+        """
+        ordenes = fetch_all(cur, sql, ([int(i) for i in ids],))
+    else:
+        sql = f"""
+            SELECT a.id, a.id_producto, a.cantidad, a.estado
+            FROM {ENV}.orden_produccion a
+            JOIN {ENV}.orden_venta b
+                ON a.id_orden_venta = b.id
+            WHERE a.estado = 'planificada'
+            ORDER BY b.fecha_entrega_solicitada ASC, a.id
+            LIMIT %s
+            FOR UPDATE OF a SKIP LOCKED
+        """
+        ordenes = fetch_all(cur, sql, (limite or LIMITE_POR_DEFECTO,))
+    if not ordenes:
+        raise ValidationError("No se encontraron órdenes de producción para asignar.")
+    return ordenes
+
+
+def cargar_insumos(cur, ordenes: Sequence[Mapping[str, Any]], fecha_corte: datetime) -> Insumos:
+    """Tres consultas: recetas, consumos asignados y lotes disponibles de las materias que faltan.
+
+    Las órdenes tienen que venir de `reclamar_ordenes` en la misma
+    transacción (sus consumos no cambian hasta el commit). Los lotes quedan
+    bloqueados hasta el fin de la transacción. Falla si una orden con
+    cantidad no tiene receta.
+    """
+    con_cantidad = [o for o in ordenes if _cantidad(o) > 0]
+    productos = sorted({int(o["id_producto"]) for o in con_cantidad})
+    recetas = cargar_recetas(cur, productos) if productos else Recetas(())
+    for orden in con_cantidad:
+        if int(orden["id_producto"]) not in recetas:
+            raise ValidationError(f"El producto {orden['id_producto']} no tiene receta definida.")
+
+    consumos: Dict[int, Dict[int, int]] = {}
+    if con_cantidad:
+        filas = fetch_all(
+            cur,
+            f"""
+                SELECT mpop.id_orden_produccion, lmp.id_materia_prima, SUM(mpop.cantidad_utilizada) AS total
+                FROM {ENV}.materia_prima_por_orden_produccion mpop
+                JOIN {ENV}.lote_materia_prima lmp ON lmp.id = mpop.id_lote_materia_prima
+                WHERE mpop.id_orden_produccion = ANY(%s::int[])
+                GROUP BY mpop.id_orden_produccion, lmp.id_materia_prima
+            """,
+            ([int(o["id"]) for o in con_cantidad],),
+        )
+        for r in filas:
+            consumos.setdefault(int(r["id_orden_produccion"]), {})[int(r["id_materia_prima"])] = a_centesimos(r["total"])
+
+    materias = sorted({
+        materia_id
+        for orden in con_cantidad
+        for materia_id, _, _, faltante in _faltantes(orden, recetas, consumos)
+        if faltante > 0
+    })
+    lotes: Dict[int, List[List[int]]] = {}
+    if materias:
+        filas = fetch_all(
+            cur,
+            f"""
+                SELECT id, id_materia_prima, fecha_vencimiento, cantidad_unitaria_disponible
+                FROM {ENV}.lote_materia_prima
+                WHERE id_materia_prima = ANY(%s::int[])
+                  AND estado = 'disponible' AND cantidad_unitaria_disponible > 0
+                  AND (fecha_vencimiento IS NULL OR fecha_vencimiento >= %s)
+                ORDER BY id
+                FOR UPDATE
+            """,
+            (materias, fecha_corte),
+        )
+        # FEFO: vencimiento más próximo primero, sin vencimiento al final.
+        filas.sort(key=lambda r: (r["fecha_vencimiento"] is None, r["fecha_vencimiento"] or date.min, r["id"]))
+        for r in filas:
+            lotes.setdefault(int(r["id_materia_prima"]), []).append(
+                [int(r["id"]), a_centesimos(r["cantidad_unitaria_disponible"])]
+            )
+    return Insumos(recetas, consumos, lotes)
+
+
+def asignar_lotes(ordenes: Sequence[Mapping[str, Any]], insumos: Insumos) -> Asignacion:
+    """Reparte los lotes de `insumos` entre las órdenes (FEFO), sin tocar la base.
+
+    Una orden queda completa si no le falta ninguna materia de su receta.
+    """
+    lotes = {materia: [list(lote) for lote in candidatos] for materia, candidatos in insumos.lotes.items()}
+    resultados: List[Dict[str, Any]] = []
+    filas: List[Tuple[int, int, int]] = []
+    saldos: Dict[int, int] = {}
+    completas: List[int] = []
+
+    for orden in ordenes:
+        orden_id = int(orden["id"])
+        if _cantidad(orden) <= 0:
+            logger.warning(f"Orden {orden_id} tiene cantidad 0 o negativa. Se omite.")
+            resultados.append({"id": orden_id, "estado": "sin_cantidad"})
+            continue
+
+        resultado: Dict[str, Any] = {"id": orden_id, "asignaciones": [], "faltantes": []}
+        completa = True
+        for materia_id, requerido, asignado, faltante in _faltantes(orden, insumos.recetas, insumos.consumos):
+            if faltante <= 0:
+                continue
+            restante = faltante
+            for lote in lotes.get(materia_id, ()):
+                if restante <= 0:
+                    break
+                lote_id, disponible = lote
+                if disponible <= 0:
+                    continue
+                usar = min(disponible, restante)
+                lote[1] = saldos[lote_id] = disponible - usar
+                restante -= usar
+                filas.append((lote_id, orden_id, usar))
+                resultado["asignaciones"].append({
+                    "id_materia_prima": materia_id, "id_lote": lote_id, "cantidad_utilizada": usar / CENTESIMOS
+                })
+
+            if restante > 0:
+                completa = False
+                logger.warning(
+                    f"Orden {orden_id} - Faltante de {desde_centesimos(restante)} para MP {materia_id} "
+                    f"(requiere {desde_centesimos(requerido)}, tenía {desde_centesimos(asignado)})."
+                )
+                resultado["faltantes"].append({"id_materia_prima": materia_id, "faltante": restante / CENTESIMOS})
+
+        if completa:
+            completas.append(orden_id)
+            resultado["estado_final"] = "lista_para_produccion"
+        else:
+            resultado["estado_final"] = orden["estado"]
+        resultados.append(resultado)
+
+    return Asignacion(resultados, filas, saldos, completas)
+
+
+def guardar_asignacion(cur, asignacion: Asignacion) -> None:
+    """Escribe la asignación en la transacción de `cur`: consumos, saldos de lotes y OP completas.
+
+    Un lote que ya tenía consumo de la misma orden suma la nueva cantidad a
+    esa fila (UNIQUE (id_orden_produccion, id_lote_materia_prima)). Los lotes
+    sin saldo pasan a `agotado`; sólo las OP `planificada` pasan a
+    `lista_para_produccion`.
+    """
+    if asignacion.filas:
+        cur.execute(
+            f"""
+                INSERT INTO {ENV}.materia_prima_por_orden_produccion AS mpop
+                    (id_lote_materia_prima, id_orden_produccion, cantidad_utilizada)
+                SELECT lote, orden, cantidad
+                FROM unnest(%s::int[], %s::int[], %s::numeric[]) AS n(lote, orden, cantidad)
+                ON CONFLICT (id_orden_produccion, id_lote_materia_prima)
+                DO UPDATE SET cantidad_utilizada = mpop.cantidad_utilizada + EXCLUDED.cantidad_utilizada
+            """,
+            (
+                [lote for lote, _, _ in asignacion.filas],
+                [orden for _, orden, _ in asignacion.filas],
+                [desde_centesimos(usado) for _, _, usado in asignacion.filas],
+            ),
+        )
+    if asignacion.saldos:
+        cur.execute(
+            f"""
+                UPDATE {ENV}.lote_materia_prima l
+                SET cantidad_unitaria_disponible = n.disponible,
+                    estado = CASE WHEN n.disponible <= 0 THEN 'agotado' ELSE l.estado END
+                FROM unnest(%s::int[], %s::numeric[]) AS n(id, disponible)
+                WHERE l.id = n.id
+            """,
+            (list(asignacion.saldos), [desde_centesimos(d) for d in asignacion.saldos.values()]),
+        )
+    if asignacion.completas:
+        cur.execute(
+            f"""
+                UPDATE {ENV}.orden_produccion
+                SET estado = 'lista_para_produccion'
+                WHERE id = ANY(%s::int[]) AND estado = 'planificada'
+            """,
+            (asignacion.completas,),
+        )
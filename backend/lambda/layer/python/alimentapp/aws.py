@@ -0,0 +1,94 @@
+"""Clientes AWS perezosos y parámetros SSM cacheados.
+
+Antes cada módulo creaba `boto3.client("ssm")` (y a veces lambda/ses) al
+importarse, y la primera invocación de cada contenedor llamaba a SSM. Acá:
+
+- `boto3` se importa y cada cliente se construye recién cuando se usa por
+  primera vez; un handler que nunca envía mails ni invoca otra Lambda no paga
+  ese costo en el cold start.
+- Los parámetros de SSM se cachean con TTL en memoria y en un archivo de /tmp,
+  que sobrevive a reinicios del runtime dentro del mismo entorno de ejecución.
+"""
+
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SSM_CACHE_TTL_SECONDS = float(os.getenv("SSM_CACHE_TTL_SECONDS", "900"))
+SSM_CACHE_FILE = os.getenv("SSM_CACHE_FILE", "/tmp/alimentapp-ssm-cache.json")
+
+_CLIENTES: Dict[Tuple[str, Optional[str]], Any] = {}
+# nombre de parámetro -> (valor, epoch de lectura)
+_PARAMETROS: Dict[str, Tuple[str, float]] = {}
+
+
+def get_client(servicio: str, region_name: Optional[str] = None):
+    """Devuelve el cliente boto3 del servicio, creándolo (e importando boto3) en el primer uso."""
+    clave = (servicio, region_name)
+    cliente = _CLIENTES.get(clave)
+    if cliente is None:
+        import boto3
+
+        if region_name:
+            cliente = boto3.client(servicio, region_name=region_name)
+        else:
+            cliente = boto3.client(servicio)
+        _CLIENTES[clave] = cliente
+    return cliente
+
+
+def _vigente(nombre: str, ahora: float) -> bool:
+    entrada = _PARAMETROS.get(nombre)
+    return entrada is not None and ahora - entrada[1] < SSM_CACHE_TTL_SECONDS
+
+
+def _leer_cache_archivo() -> None:
+    """Carga en memoria los parámetros guardados en /tmp por una invocación anterior."""
+    try:
+        with open(SSM_CACHE_FILE, "r", encoding="utf-8") as fh:
+            data = json.load(fh)
+    except (OSError, ValueError):
+        return
+    for nombre, (valor, leido_en) in data.items():
+        actual = _PARAMETROS.get(nombre)
+        if actual is None or actual[1] < leido_en:
+            _PARAMETROS[nombre] = (valor, float(leido_en))
+
+
+def _guardar_cache_archivo() -> None:
+    """Persiste la cache en /tmp (0600, escritura atómica). Un fallo sólo se loguea."""
+    tmp = f"{SSM_CACHE_FILE}.{os.getpid()}"
+    try:
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump({n: [v, t] for n, (v, t) in _PARAMETROS.items()}, fh)
+        os.replace(tmp, SSM_CACHE_FILE)
+    except OSError:
+        logger.warning("No se pudo escribir la cache de SSM en %s", SSM_CACHE_FILE)
+
+
+def get_parameters(names: Iterable[str], with_decryption: bool = True) -> Dict[str, str]:
+    """Devuelve {nombre: valor} para los parámetros pedidos; los inexistentes en SSM se omiten."""
+    names = list(names)
+    ahora = time.time()
+    faltantes = [n for n in names if not _vigente(n, ahora)]
+    if faltantes:
+        _leer_cache_archivo()
+        faltantes = [n for n in faltantes if not _vigente(n, ahora)]
+    if faltantes:
+        resp = get_client("ssm").get_parameters(Names=faltantes, WithDecryption=with_decryption)
+        for p in resp.get("Parameters", []):
+            _PARAMETROS[p["Name"]] = (p["Value"], ahora)
+        _guardar_cache_archivo()
+    return {n: _PARAMETROS[n][0] for n in names if n in _PARAMETROS}
+
+
+def invalidar_parametros(names: Iterable[str]) -> None:
+    """Olvida parámetros cacheados (p.ej. tras un error de autenticación por rotación de password)."""
+    for nombre in names:
+        _PARAMETROS.pop(nombre, None)
+    _guardar_cache_archivo()
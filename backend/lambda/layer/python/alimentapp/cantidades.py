@@ -0,0 +1,61 @@
+"""Cantidades en punto fijo: enteros en vez de Decimal dentro de los loops.
+
+Las columnas de cantidades son NUMERIC con escala fija: `peso_unitario_kg`
+es NUMERIC(10,3) y `cantidad_kg`, `capacidad_maxima_kg`, `cantidad_utilizada`,
+`cantidad_unitaria` y `cantidad_unitaria_disponible` son NUMERIC(10,2). Los
+cálculos internos trabajan con enteros en la unidad más chica que aparece:
+
+    gramos      milésimos de kg (planificador: cantidad * peso_unitario_kg)
+    centésimos  centésimos de la unidad de la columna (asignación de lotes)
+
+Sumas, restas, comparaciones y `min` entre enteros son exactas, así que
+convertir una vez al cargar (`a_gramos`, `a_centesimos`) y una vez al
+persistir (`kg_numeric`, `desde_centesimos`) da el mismo resultado que
+operar con Decimal en todo el recorrido.
+"""
+
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any
+
+GRAMOS_POR_KG = 1000
+CENTESIMOS = 100
+
+
+def _escalar(valor: Any, escala: int) -> int:
+    if isinstance(valor, int):
+        return valor * escala
+    if not isinstance(valor, Decimal):
+        valor = Decimal(str(valor))
+    return int((valor * escala).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def a_gramos(kg: Any) -> int:
+    """kg (Decimal, int, float o str) a gramos enteros; más de tres decimales se redondean half-up."""
+    return _escalar(kg, GRAMOS_POR_KG)
+
+
+def a_centesimos(valor: Any) -> int:
+    """Valor de una columna NUMERIC(10,2) a centésimos enteros (redondeo half-up)."""
+    return _escalar(valor, CENTESIMOS)
+
+
+def redondear_gramos(gramos: int) -> int:
+    """Gramos redondeados a centésimos de kg, como `NUMERIC(10,2)` (half-up, lejos de cero)."""
+    if gramos < 0:
+        return -redondear_gramos(-gramos)
+    return (gramos + 5) // 10 * 10
+
+
+def kg_numeric(gramos: int) -> Decimal:
+    """Gramos al Decimal que se guarda en una columna de kg NUMERIC(10,2)."""
+    return Decimal(redondear_gramos(gramos) // 10).scaleb(-2)
+
+
+def desde_gramos(gramos: int) -> Decimal:
+    """Gramos a kg sin redondear (tres decimales)."""
+    return Decimal(gramos).scaleb(-3)
+
+
+def desde_centesimos(centesimos: int) -> Decimal:
+    """Centésimos al Decimal de dos decimales de una columna NUMERIC(10,2)."""
+    return Decimal(centesimos).scaleb(-2)
@@ -0,0 +1,187 @@
+"""Conexiones pg8000 reutilizadas entre invocaciones de un mismo contenedor Lambda.
+
+Cada handler pedía credenciales y abría una conexión SSL nueva por request
+(TCP + TLS + auth de Postgres). Este módulo conserva la conexión del
+contenedor caliente, la valida de forma barata antes de entregarla y la
+devuelve con la transacción limpia al terminar la invocación.
+
+Uso en un handler:
+
+    conn = None
+    try:
+        conn = get_connection()
+        cur = conn.cursor()
+        ...
+        conn.commit()
+    finally:
+        if conn:
+            release_connection(conn)
+"""
+
+import logging
+import os
+import ssl
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import pg8000
+
+from alimentapp.aws import get_parameters, invalidar_parametros
+from alimentapp.instrumentacion import envolver
+
+logger = logging.getLogger(__name__)
+
+ENV = os.getenv("DB_SCHEMA", "dev")
+
+DB_PARAM_NAMES = [
+    "/alimentapp/db/host",
+    "/alimentapp/db/password",
+    "/alimentapp/db/port",
+    "/alimentapp/db/username",
+]
+DB_CONFIG: Optional[Dict[str, Any]] = None  # cache SSM
+
+# Segundos de inactividad a partir de los cuales se valida la conexión con SELECT 1.
+IDLE_CHECK_SECONDS = float(os.getenv("DB_IDLE_CHECK_SECONDS", "60"))
+# Conexiones ociosas que se conservan por contenedor.
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "1"))
+
+SSL_CONTEXT = ssl.create_default_context()
+
+# Conexiones ociosas junto al instante (monotonic) en que se liberaron.
+_POOL: List[Tuple[Any, float]] = []
+
+
+def get_db_parameters() -> Dict[str, Any]:
+    """Lee parámetros de RDS desde SSM (cacheado en memoria y en /tmp, ver alimentapp.aws)."""
+    global DB_CONFIG
+    if DB_CONFIG:
+        return DB_CONFIG
+
+    params = get_parameters(DB_PARAM_NAMES, with_decryption=True)
+    if len(params) != len(DB_PARAM_NAMES):
+        missing = set(DB_PARAM_NAMES) - set(params)
+        raise RuntimeError(f"Parámetros faltantes en SSM: {', '.join(sorted(missing))}")
+
+    data = {name.split("/")[-1]: value for name, value in params.items()}
+    DB_CONFIG = {
+        "host": data["host"],
+        "port": int(data.get("port", "5432")),
+        "user": data["username"],
+        "password": data["password"],
+        "database": os.getenv("DB_NAME", "postgres"),
+    }
+    return DB_CONFIG
+
+
+def _es_error_de_auth(exc: Exception) -> bool:
+    """28P01 (password inválido) / 28000 (autorización): credenciales cacheadas viejas."""
+    return any(codigo in str(exc) for codigo in ("28P01", "28000"))
+
+
+def _connect():
+    """Abre conexión pg8000 + SSL con credenciales de SSM.
+
+    Si las credenciales cacheadas fueron rotadas, se invalida la cache y se
+    reintenta una vez con los valores frescos de SSM.
+    """
+    global DB_CONFIG
+    for intento in (1, 2):
+        cfg = get_db_parameters()
+        try:
+            return pg8000.connect(
+                host=cfg["host"],
+                port=cfg["port"],
+                database=cfg["database"],
+                user=cfg["user"],
+                password=cfg["password"],
+                ssl_context=SSL_CONTEXT,
+                timeout=10,
+            )
+        except pg8000.DatabaseError as exc:
+            if intento == 2 or not _es_error_de_auth(exc):
+                raise
+            logger.info("Autenticación rechazada, se releen las credenciales de SSM.")
+            DB_CONFIG = None
+            invalidar_parametros(DB_PARAM_NAMES)
+
+
+def _descartar(conn) -> None:
+    """Cierra una conexión sin propagar errores (socket ya caído, etc.)."""
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+def _es_valida(conn, liberada_en: float) -> bool:
+    """Chequeo barato: solo se consulta al servidor si la conexión estuvo ociosa un rato."""
+    if time.monotonic() - liberada_en < IDLE_CHECK_SECONDS:
+        return True
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT 1")
+        cur.fetchall()
+        conn.rollback()
+        return True
+    except Exception:
+        return False
+
+
+def get_connection():
+    """Devuelve la conexión caliente del contenedor o abre una nueva si no hay/está caída.
+
+    Si la conexión cacheada ya está en uso (p.ej. un handler que abre una
+    segunda conexión), se abre otra; al liberarse, las que excedan
+    POOL_SIZE se cierran. Las conexiones nuevas se envuelven para registrar
+    las consultas de cada invocación (ver alimentapp.instrumentacion).
+    """
+    while _POOL:
+        conn, liberada_en = _POOL.pop()
+        if _es_valida(conn, liberada_en):
+            return conn
+        logger.info("Conexión ociosa inválida, se descarta y se reconecta.")
+        _descartar(conn)
+    return envolver(_connect())
+
+
+def release_connection(conn, descartar: bool = False) -> None:
+    """Resetea el estado transaccional y deja la conexión lista para la próxima invocación.
+
+    Con `descartar` la cierra en vez de volver al pool (p.ej. si quedó con un
+    advisory lock de sesión que no se pudo soltar).
+    """
+    if conn is None:
+        return
+    if descartar:
+        _descartar(conn)
+        return
+    try:
+        conn.rollback()
+    except Exception:
+        logger.info("No se pudo resetear la conexión, se descarta.")
+        _descartar(conn)
+        return
+    if len(_POOL) >= POOL_SIZE:
+        _descartar(conn)
+        return
+    _POOL.append((conn, time.monotonic()))
+
+
+def fetch_all(cur, sql: str, params: Iterable[Any] = None) -> List[Dict[str, Any]]:
+    """Ejecuta un SELECT y devuelve filas como diccionarios."""
+    cur.execute(sql, tuple(params or ()))
+    rows = cur.fetchall()
+    if not rows:
+        return []
+    columns = [c[0] for c in cur.description]
+    return [dict(zip(columns, row)) for row in rows]
+
+
+# Nombre histórico usado por los handlers CRUD.
+run_query = fetch_all
+
+
+def run_command(cur, sql: str, params: Iterable[Any] = None) -> None:
+    """INSERT/UPDATE/DELETE; no retorna filas."""
+    cur.execute(sql, tuple(params or ()))
@@ -0,0 +1,270 @@
+"""Instrumentación de consultas por invocación: conteo, duración, filas y patrones N+1.
+
+`alimentapp.db` envuelve cada conexión que entrega; mientras haya una
+invocación medida en curso (`medir` / `@instrumentar`), cada sentencia se
+registra con su texto, duración y filas. Las sentencias se agrupan por
+"forma" (el SQL con los literales reemplazados por `?`), así que un
+`WHERE id = {x}` interpolado dentro de un loop cuenta como una misma forma
+repetida: el patrón N+1.
+
+Al terminar la invocación se emite una sola línea de log JSON:
+
+    {"evento": "consultas", "handler": "get-ordenes-venta", "consultas": 10006,
+     "ms": 1520.3, "filas": 34907, "presupuesto": 2, "repetidas": [...]}
+
+Con `DB_PRESUPUESTO_ESTRICTO=1` (tests y benchmarks) un handler que supera el
+presupuesto declarado levanta `PresupuestoExcedido` en vez de sólo avisar.
+
+Uso en un handler:
+
+    @instrumentar(presupuesto=2)
+    def lambda_handler(event, context):
+        ...
+"""
+
+import functools
+import json
+import logging
+import os
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Envolver las conexiones (0 desactiva la instrumentación por completo).
+INSTRUMENTAR = os.getenv("DB_INSTRUMENTAR", "1") != "0"
+# Repeticiones de una misma forma a partir de las cuales se reporta como N+1.
+UMBRAL_REPETICIONES = int(os.getenv("DB_UMBRAL_REPETICIONES", "5"))
+# Superar el presupuesto levanta excepción en vez de loguear un warning.
+ESTRICTO = os.getenv("DB_PRESUPUESTO_ESTRICTO", "0") == "1"
+# Largo máximo del SQL de ejemplo incluido en el log.
+LARGO_SQL_LOG = 200
+
+_LITERALES = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LISTAS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ESPACIOS = re.compile(r"\s+")
+
+
+class PresupuestoExcedido(Exception):
+    """La invocación ejecutó más consultas que las declaradas en su presupuesto."""
+
+
+def forma(sql: str) -> str:
+    """SQL normalizado: literales como `?`, listas `(?, ?, ...)` como `(?)` y espacios colapsados."""
+    sql = _LITERALES.sub("?", sql)
+    sql = _LISTAS.sub("(?)", sql)
+    return _ESPACIOS.sub(" ", sql).strip()
+
+
+class Forma:
+    """Acumulado de las ejecuciones de una misma forma de sentencia."""
+
+    __slots__ = ("sql", "veces", "ms", "filas")
+
+    def __init__(self, sql: str):
+        self.sql = sql
+        self.veces = 0
+        self.ms = 0.0
+        self.filas = 0
+
+
+class Registro:
+    """Consultas de una invocación."""
+
+    def __init__(self, nombre: str, presupuesto: Optional[int] = None):
+        self.nombre = nombre
+        self.presupuesto = presupuesto
+        self.formas: Dict[str, Forma] = {}
+        self.consultas = 0
+        self.ms = 0.0
+        self.filas = 0
+
+    def agregar(self, sql: str, ms: float, filas: int, veces: int = 1) -> None:
+        clave = forma(sql)
+        acumulado = self.formas.get(clave)
+        if acumulado is None:
+            acumulado = self.formas[clave] = Forma(sql)
+        acumulado.veces += veces
+        acumulado.ms += ms
+        acumulado.filas += filas
+        self.consultas += veces
+        self.ms += ms
+        self.filas += filas
+
+    def repetidas(self) -> List[Forma]:
+        """Formas ejecutadas al menos UMBRAL_REPETICIONES veces (posible N+1), de más a menos tiempo."""
+        return sorted(
+            (f for f in self.formas.values() if f.veces >= UMBRAL_REPETICIONES),
+            key=lambda f: f.ms,
+            reverse=True,
+        )
+
+    def excedido(self) -> bool:
+        return self.presupuesto is not None and self.consultas > self.presupuesto
+
+    def resumen(self) -> Dict[str, Any]:
+        return {
+            "evento": "consultas",
+            "handler": self.nombre,
+            "consultas": self.consultas,
+            "ms": round(self.ms, 1),
+            "filas": self.filas,
+            "formas": len(self.formas),
+            "presupuesto": self.presupuesto,
+            "repetidas": [
+                {"veces": f.veces, "ms": round(f.ms, 1), "filas": f.filas, "sql": forma(f.sql)[:LARGO_SQL_LOG]}
+                for f in self.repetidas()
+            ],
+        }
+
+
+_ACTUAL: ContextVar[Optional[Registro]] = ContextVar("alimentapp_registro_consultas", default=None)
+
+
+def registro_actual() -> Optional[Registro]:
+    return _ACTUAL.get()
+
+
+@contextmanager
+def medir(nombre: str, presupuesto: Optional[int] = None) -> Iterator[Registro]:
+    """Mide las consultas del bloque y al salir emite el resumen y controla el presupuesto.
+
+    Anidado (p.ej. el router mide y el handler está decorado) se reutiliza el
+    registro exterior: se completa el presupuesto si faltaba y el resumen se
+    emite una sola vez, al cerrar el bloque más externo.
+    """
+    registro = _ACTUAL.get()
+    if registro is not None:
+        if registro.presupuesto is None:
+            registro.presupuesto = presupuesto
+        yield registro
+        return
+
+    registro = Registro(nombre, presupuesto)
+    token = _ACTUAL.set(registro)
+    try:
+        yield registro
+    finally:
+        _ACTUAL.reset(token)
+        _emitir(registro)
+    if registro.excedido() and ESTRICTO:
+        raise PresupuestoExcedido(
+            f"{registro.nombre}: {registro.consultas} consultas, presupuesto {registro.presupuesto}"
+        )
+
+
+def _emitir(registro: Registro) -> None:
+    nivel = logging.WARNING if registro.excedido() or registro.repetidas() else logging.INFO
+    logger.log(nivel, json.dumps(registro.resumen(), ensure_ascii=False))
+
+
+def instrumentar(funcion: Optional[Callable] = None, *, presupuesto: Optional[int] = None, nombre: Optional[str] = None):
+    """Decorador para `lambda_handler`: mide cada invocación (ver `medir`).
+
+    Se puede usar como `@instrumentar` o `@instrumentar(presupuesto=2)`.
+    """
+
+    def decorar(handler: Callable) -> Callable:
+        etiqueta = nombre or os.getenv("AWS_LAMBDA_FUNCTION_NAME") or handler.__module__
+
+        @functools.wraps(handler)
+        def envuelto(event, context):
+            with medir(etiqueta, presupuesto):
+                return handler(event, context)
+
+        envuelto.presupuesto_consultas = presupuesto
+        return envuelto
+
+    return decorar(funcion) if funcion is not None else decorar
+
+
+# --------------------------
+# ENVOLTORIOS pg8000
+# --------------------------
+class CursorInstrumentado:
+    """Cursor pg8000 que registra cada execute en la invocación en curso."""
+
+    def __init__(self, cur):
+        self._cur = cur
+
+    def execute(self, operation, args=(), stream=None):
+        registro = _ACTUAL.get()
+        if registro is None:
+            return self._cur.execute(operation, args, stream=stream)
+        t0 = time.perf_counter()
+        try:
+            return self._cur.execute(operation, args, stream=stream)
+        finally:
+            registro.agregar(operation, (time.perf_counter() - t0) * 1000, max(self._cur.rowcount, 0))
+
+    def executemany(self, operation, param_sets):
+        registro = _ACTUAL.get()
+        if registro is None:
+            return self._cur.executemany(operation, param_sets)
+        param_sets = list(param_sets)
+        t0 = time.perf_counter()
+        try:
+            return self._cur.executemany(operation, param_sets)
+        finally:
+            registro.agregar(
+                operation, (time.perf_counter() - t0) * 1000, max(self._cur.rowcount, 0), veces=len(param_sets)
+            )
+
+    def __iter__(self):
+        return iter(self._cur)
+
+    def __getattr__(self, nombre):
+        return getattr(self._cur, nombre)
+
+
+class SentenciaInstrumentada:
+    """PreparedStatement pg8000 que registra cada `run`."""
+
+    def __init__(self, ps, sql: str):
+        self._ps = ps
+        self._sql = sql
+
+    def run(self, **vals):
+        registro = _ACTUAL.get()
+        if registro is None:
+            return self._ps.run(**vals)
+        t0 = time.perf_counter()
+        filas = None
+        try:
+            filas = self._ps.run(**vals)
+            return filas
+        finally:
+            registro.agregar(self._sql, (time.perf_counter() - t0) * 1000, len(filas or ()))
+
+    def __getattr__(self, nombre):
+        return getattr(self._ps, nombre)
+
+
+class ConexionInstrumentada:
+    """Conexión pg8000 cuyos cursores y sentencias preparadas se registran por invocación."""
+
+    def __init__(self, conn):
+        object.__setattr__(self, "_conn", conn)
+
+    def cursor(self):
+        return CursorInstrumentado(self._conn.cursor())
+
+    def prepare(self, operation):
+        return SentenciaInstrumentada(self._conn.prepare(operation), operation)
+
+    def __getattr__(self, nombre):
+        return getattr(self._conn, nombre)
+
+    def __setattr__(self, nombre, valor):
+        # p.ej. conn.autocommit = True
+        setattr(self._conn, nombre, valor)
+
+
+def envolver(conn):
+    """Envuelve la conexión si la instrumentación está activa (DB_INSTRUMENTAR)."""
+    if not INSTRUMENTAR or isinstance(conn, ConexionInstrumentada):
+        return conn
+    return ConexionInstrumentada(conn)
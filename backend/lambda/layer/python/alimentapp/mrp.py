@@ -0,0 +1,388 @@
+"""Requerimientos de materia prima por fecha (MRP) sobre la agenda de producción.
+
+Una corrida mira todo el backlog, no una OV:
+
+    cargar_entradas_mrp   fecha de cada OP sin asignar (pendiente / planificada)
+                          según la agenda en memoria, recetas explotadas por
+                          (fecha, materia) con `alimentapp.recetas`, lotes
+                          disponibles, en cuarentena y pedidos, y datos de
+                          compra de cada materia
+    calcular_mrp          neteo por día de lo requerido contra lo que hay y lo
+                          que llega, y faltantes consolidados en sugerencias
+                          de compra (una por materia y ventana de días)
+
+Fechas:
+
+    requerimiento   primer día hábil en que la agenda ubica una tanda de la OP.
+                    Se planifica como la simulación de OV: las OP listas más
+                    las de las OV con OP sin asignar. Una OP que no entra en el
+                    plan (sin OV o sin línea compatible) se pide para `base`
+    oferta          lotes `disponible` desde `base` hasta su vencimiento,
+                    `en_cuarentena` desde `base`, `pedido_generado` desde
+                    `fecha_generacion_pedido` + `MRP_DIAS_ENTREGA`
+
+Los pedidos ya generados cuentan como oferta, así que volver a correr el MRP
+no compra de nuevo lo mismo. Cada sugerencia se redondea a paquetes enteros
+(`cantidad_por_unidad_compra`) y lo que sobra del redondeo cubre las ventanas
+siguientes. Cantidades en centésimos enteros (`alimentapp.cantidades`).
+
+Uso:
+
+    resultado = calcular_mrp(cargar_entradas_mrp(cur))
+    [s for s in resultado.sugerencias if s.fecha_pedido <= resultado.base]
+"""
+
+import heapq
+import logging
+import os
+from collections import deque
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Any, Deque, Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+from alimentapp.agenda import calcular_plan_diario, cargar_entradas, fecha_base
+from alimentapp.cantidades import a_centesimos, desde_centesimos
+from alimentapp.db import ENV, fetch_all
+from alimentapp.planificacion import dias_habiles
+from alimentapp.recetas import cargar_recetas
+
+logger = logging.getLogger(__name__)
+
+# Días corridos entre generar un pedido y tener el lote.
+DIAS_ENTREGA = int(os.getenv("MRP_DIAS_ENTREGA", "3"))
+# Días corridos que cubre una sugerencia de compra desde su primer faltante.
+DIAS_CONSOLIDACION = int(os.getenv("MRP_DIAS_CONSOLIDACION", "7"))
+
+ESTADOS_SIN_ASIGNAR = ("pendiente", "planificada")
+# OP que la agenda planifica: las listas y las que todavía esperan materia prima.
+ESTADOS_AGENDA = ("lista_para_produccion",) + ESTADOS_SIN_ASIGNAR
+
+MILESIMOS = 1000
+
+
+class Oferta(NamedTuple):
+    """Lo que un lote puede cubrir: desde qué fecha, hasta cuál (None: no vence) y cuánto (centésimos)."""
+
+    id_lote: int
+    desde: date
+    vence: Optional[date]
+    cantidad: int
+
+
+class Materia(NamedTuple):
+    """Datos de compra de una materia prima."""
+
+    nombre: str
+    unidad_medida: str
+    milesimos_por_paquete: int  # cantidad_por_unidad_compra en milésimos
+    id_proveedor: Optional[int]  # proveedor activo más barato
+
+
+class EntradasMRP(NamedTuple):
+    """Lo que lee `cargar_entradas_mrp` (centésimos)."""
+
+    base: date
+    necesidades: Dict[int, List[Tuple[date, int]]]  # materia → [(fecha, requerido)] por fecha
+    ofertas: Dict[int, List[Oferta]]  # materia → lotes
+    materias: Dict[int, Materia]
+    ordenes: int  # OP sin asignar consideradas
+    sin_fecha: List[int]  # OP sin lugar en la agenda (se piden para `base`)
+
+
+class Sugerencia(NamedTuple):
+    """Compra sugerida: cubre los faltantes de una materia desde `fecha_necesaria` por `DIAS_CONSOLIDACION` días."""
+
+    id_materia_prima: int
+    fecha_pedido: date
+    fecha_necesaria: date
+    faltante: int  # centésimos
+    paquetes: Optional[int]
+    id_proveedor: Optional[int]
+    motivo: Optional[str] = None  # por qué no se puede comprar
+
+    def resumen(self, materia: Optional[Materia] = None) -> Dict[str, Any]:
+        return {
+            "id_materia_prima": self.id_materia_prima,
+            "nombre": materia.nombre if materia else None,
+            "unidad_medida": materia.unidad_medida if materia else None,
+            "fecha_pedido": self.fecha_pedido.isoformat(),
+            "fecha_necesaria": self.fecha_necesaria.isoformat(),
+            "faltante": str(desde_centesimos(self.faltante)),
+            "paquetes": self.paquetes,
+            "id_proveedor": self.id_proveedor,
+            "motivo": self.motivo,
+        }
+
+
+class ResultadoMRP(NamedTuple):
+    base: date
+    sugerencias: List[Sugerencia]  # por fecha de pedido y materia
+    faltantes: Dict[int, List[Tuple[date, int]]]  # materia → faltante neto por fecha
+    materias: Dict[int, Materia]
+    ordenes: int
+    sin_fecha: List[int]
+
+    def resumen(self) -> Dict[str, Any]:
+        """Para la respuesta de la Lambda."""
+        return {
+            "base": self.base.isoformat(),
+            "ordenes_consideradas": self.ordenes,
+            "ordenes_sin_fecha": self.sin_fecha,
+            "sugerencias": [s.resumen(self.materias.get(s.id_materia_prima)) for s in self.sugerencias],
+        }
+
+
+def fechar_ordenes(cur, base: date) -> Tuple[List[Dict[str, Any]], List[int]]:
+    """(OP sin asignar con la `fecha` en que empiezan a producirse, OP que no entran en el plan)."""
+    pendientes = fetch_all(
+        cur,
+        f"""
+            SELECT id, id_orden_venta, id_producto, cantidad
+            FROM {ENV}.orden_produccion
+            WHERE estado = ANY(%s) AND cantidad > 0
+        """,
+        (list(ESTADOS_SIN_ASIGNAR),),
+    )
+    if not pendientes:
+        return [], []
+    ovs = sorted({int(r["id_orden_venta"]) for r in pendientes if r["id_orden_venta"] is not None})
+    entradas = cargar_entradas(cur, ovs)
+    ordenes = [o for o in entradas.ordenes if o["estado"] in ESTADOS_AGENDA]
+    plan = calcular_plan_diario(entradas, ordenes)
+
+    primer_dia: Dict[int, int] = {}
+    for t in plan.tandas:
+        if t.dia is not None and t.dia < primer_dia.get(t.orden_produccion_id, t.dia + 1):
+            primer_dia[t.orden_produccion_id] = t.dia
+    fechas_plan = dias_habiles(base, max(primer_dia.values(), default=0) + 1)
+
+    sin_fecha: List[int] = []
+    for r in pendientes:
+        op_id = int(r["id"])
+        dia = primer_dia.get(op_id)
+        if dia is None:
+            sin_fecha.append(op_id)
+            r["fecha"] = base
+        else:
+            r["fecha"] = fechas_plan[dia]
+    sin_fecha.sort()
+    return pendientes, sin_fecha
+
+
+def explotar_recetas(cur, ordenes: Sequence[Mapping[str, Any]]) -> Dict[int, List[Tuple[date, int]]]:
+    """Lo que falta asignar de cada materia por fecha: receta * cantidad − ya asignado, por OP, sumado por (fecha, materia).
+
+    El bruto sale de `Recetas.requerimiento_por` (una multiplicación por
+    fecha); a eso se le resta lo ya asignado a cada OP, hasta lo que pide.
+    """
+    if not ordenes:
+        return {}
+    recetas = cargar_recetas(cur, sorted({int(o["id_producto"]) for o in ordenes}))
+    por_fecha = recetas.requerimiento_por(ordenes, lambda o: o["fecha"])
+
+    por_id = {int(o["id"]): o for o in ordenes}
+    asignados = fetch_all(
+        cur,
+        f"""
+            SELECT mpop.id_orden_produccion, lmp.id_materia_prima, SUM(mpop.cantidad_utilizada) AS total
+            FROM {ENV}.materia_prima_por_orden_produccion mpop
+            JOIN {ENV}.lote_materia_prima lmp ON lmp.id = mpop.id_lote_materia_prima
+            WHERE mpop.id_orden_produccion = ANY(%s::int[])
+            GROUP BY mpop.id_orden_produccion, lmp.id_materia_prima
+        """,
+        (sorted(por_id),),
+    )
+    requeridos: Dict[int, Dict[int, int]] = {}
+    for r in asignados:
+        orden = por_id[int(r["id_orden_produccion"])]
+        if orden["id"] not in requeridos:
+            requeridos[orden["id"]] = dict(recetas.de_orden(orden))
+        materia_id = int(r["id_materia_prima"])
+        requerido = requeridos[orden["id"]].get(materia_id, 0)
+        if requerido:
+            total = por_fecha[orden["fecha"]]
+            total[materia_id] -= min(a_centesimos(r["total"]), requerido)
+
+    necesidades: Dict[int, List[Tuple[date, int]]] = {}
+    for fecha in sorted(por_fecha):
+        for materia_id, requerido in por_fecha[fecha].items():
+            if requerido > 0:
+                necesidades.setdefault(materia_id, []).append((fecha, requerido))
+    return dict(sorted(necesidades.items()))
+
+
+def cargar_ofertas(cur, materias: Sequence[int], base: date) -> Dict[int, List[Oferta]]:
+    """Lotes que pueden cubrir requerimientos: disponibles sin vencer, en cuarentena y pedidos."""
+    if not materias:
+        return {}
+    filas = fetch_all(
+        cur,
+        f"""
+            SELECT id, id_materia_prima, estado, fecha_vencimiento, fecha_generacion_pedido, cantidad_unitaria_disponible
+            FROM {ENV}.lote_materia_prima
+            WHERE id_materia_prima = ANY(%s::int[])
+              AND estado IN ('disponible', 'en_cuarentena', 'pedido_generado')
+              AND cantidad_unitaria_disponible > 0
+              AND (fecha_vencimiento IS NULL OR fecha_vencimiento >= %s)
+            ORDER BY id
+        """,
+        (list(materias), base),
+    )
+    ofertas: Dict[int, List[Oferta]] = {}
+    for r in filas:
+        desde = base
+        if r["estado"] == "pedido_generado":
+            desde = max(base, r["fecha_generacion_pedido"].date() + timedelta(days=DIAS_ENTREGA))
+        ofertas.setdefault(int(r["id_materia_prima"]), []).append(
+            Oferta(int(r["id"]), desde, r["fecha_vencimiento"], a_centesimos(r["cantidad_unitaria_disponible"]))
+        )
+    return ofertas
+
+
+def cargar_materias(cur, materias: Sequence[int]) -> Dict[int, Materia]:
+    """Nombre, unidad, tamaño de paquete y proveedor activo más barato de cada materia."""
+    if not materias:
+        return {}
+    filas = fetch_all(
+        cur,
+        f"""
+            SELECT mp.id, mp.nombre, mp.unidad_medida, mp.cantidad_por_unidad_compra, p.id_proveedor
+            FROM {ENV}.materia_prima mp
+            LEFT JOIN LATERAL (
+                SELECT id_proveedor
+                FROM {ENV}.proveedor_por_materia_prima
+                WHERE id_materia_prima = mp.id AND activo = TRUE
+                ORDER BY precio ASC NULLS LAST, id
+                LIMIT 1
+            ) p ON TRUE
+            WHERE mp.id = ANY(%s::int[])
+        """,
+        (list(materias),),
+    )
+    return {
+        int(r["id"]): Materia(
+            r["nombre"],
+            r["unidad_medida"],
+            int(Decimal(str(r["cantidad_por_unidad_compra"] or 0)).scaleb(3)),
+            r["id_proveedor"],
+        )
+        for r in filas
+    }
+
+
+def cargar_entradas_mrp(cur, base: Optional[date] = None) -> EntradasMRP:
+    """Lee todo lo que usa `calcular_mrp`: agenda, recetas explotadas, lotes y materias."""
+    base = base or fecha_base()
+    ordenes, sin_fecha = fechar_ordenes(cur, base)
+    necesidades = explotar_recetas(cur, ordenes)
+    materias = sorted(necesidades)
+    return EntradasMRP(
+        base,
+        necesidades,
+        cargar_ofertas(cur, materias, base),
+        cargar_materias(cur, materias),
+        len(ordenes),
+        sin_fecha,
+    )
+
+
+def netear(necesidades: Sequence[Tuple[date, int]], ofertas: Sequence[Oferta]) -> List[Tuple[date, int]]:
+    """Faltante neto por fecha de una materia.
+
+    Cada fecha (en orden) consume de los lotes que ya llegaron y no vencieron
+    antes, el que vence primero antes (FEFO). Lo que no se cubre queda
+    atrasado y lo toma el primer lote que llega después (un pedido en camino
+    cubre la OP aunque llegue tarde): sólo es faltante lo que ningún lote
+    cubre, con la fecha en que se necesitaba.
+    """
+    pendientes = sorted(ofertas, key=lambda o: o.desde)
+    activas: List[Tuple[date, int, int]] = []  # (vence, id_lote, índice en saldos)
+    saldos: List[int] = []
+    atrasados: Deque[List[Any]] = deque()  # [fecha, faltante] sin cubrir, del más viejo al más nuevo
+    siguiente = 0
+
+    def llegar(oferta: Oferta) -> None:
+        saldo = oferta.cantidad
+        while saldo > 0 and atrasados:
+            tomado = min(saldo, atrasados[0][1])
+            saldo -= tomado
+            atrasados[0][1] -= tomado
+            if atrasados[0][1] == 0:
+                atrasados.popleft()
+        if saldo > 0:
+            heapq.heappush(activas, (oferta.vence or date.max, oferta.id_lote, len(saldos)))
+            saldos.append(saldo)
+
+    for fecha, requerido in necesidades:
+        while siguiente < len(pendientes) and pendientes[siguiente].desde <= fecha:
+            llegar(pendientes[siguiente])
+            siguiente += 1
+        while requerido > 0 and activas:
+            vence, _, k = activas[0]
+            if vence < fecha or saldos[k] == 0:
+                heapq.heappop(activas)
+                continue
+            tomado = min(saldos[k], requerido)
+            saldos[k] -= tomado
+            requerido -= tomado
+        if requerido > 0:
+            atrasados.append([fecha, requerido])
+    for oferta in pendientes[siguiente:]:
+        llegar(oferta)
+    return [(fecha, faltante) for fecha, faltante in atrasados]
+
+
+def consolidar(materia_id: int, faltantes: Sequence[Tuple[date, int]], materia: Optional[Materia]) -> List[Sugerencia]:
+    """Agrupa los faltantes en ventanas de `DIAS_CONSOLIDACION` días y los redondea a paquetes.
+
+    Lo que sobra de redondear una ventana cubre las siguientes.
+    """
+    sugerencias: List[Sugerencia] = []
+    sobrante = 0
+    k = 0
+    while k < len(faltantes):
+        inicio = faltantes[k][0]
+        total = 0
+        while k < len(faltantes) and faltantes[k][0] < inicio + timedelta(days=DIAS_CONSOLIDACION):
+            total += faltantes[k][1]
+            k += 1
+        cubierto = min(sobrante, total)
+        sobrante -= cubierto
+        total -= cubierto
+        if total <= 0:
+            continue
+        fecha_pedido = inicio - timedelta(days=DIAS_ENTREGA)
+        if materia is None:
+            sugerencias.append(Sugerencia(materia_id, fecha_pedido, inicio, total, None, None, "Materia prima inexistente"))
+            continue
+        if materia.milesimos_por_paquete <= 0:
+            sugerencias.append(
+                Sugerencia(materia_id, fecha_pedido, inicio, total, None, materia.id_proveedor, "cantidad_por_unidad_compra no configurada")
+            )
+            continue
+        # total está en centésimos y el paquete en milésimos.
+        paquetes = -(-total * (MILESIMOS // 100) // materia.milesimos_por_paquete)
+        # El lote se guarda como NUMERIC(10,2), igual que en post-generar-compra-lote-materia-prima.
+        comprado = a_centesimos(paquetes * Decimal(materia.milesimos_por_paquete).scaleb(-3))
+        sobrante += comprado - total
+        motivo = None if materia.id_proveedor is not None else "Sin proveedor activo"
+        sugerencias.append(Sugerencia(materia_id, fecha_pedido, inicio, total, paquetes, materia.id_proveedor, motivo))
+    return sugerencias
+
+
+def calcular_mrp(entradas: EntradasMRP) -> ResultadoMRP:
+    """Neteo y sugerencias de compra de todas las materias, sin tocar la base."""
+    faltantes: Dict[int, List[Tuple[date, int]]] = {}
+    sugerencias: List[Sugerencia] = []
+    for materia_id, necesidades in entradas.necesidades.items():
+        netos = netear(necesidades, entradas.ofertas.get(materia_id, []))
+        if not netos:
+            continue
+        faltantes[materia_id] = netos
+        sugerencias.extend(consolidar(materia_id, netos, entradas.materias.get(materia_id)))
+    sugerencias.sort(key=lambda s: (s.fecha_pedido, s.id_materia_prima))
+    logger.info(
+        "MRP: %s OP, %s materias con requerimiento, %s con faltante, %s sugerencias",
+        entradas.ordenes, len(entradas.necesidades), len(faltantes), len(sugerencias),
+    )
+    return ResultadoMRP(entradas.base, sugerencias, faltantes, entradas.materias, entradas.ordenes, entradas.sin_fecha)
@@ -0,0 +1,289 @@
+"""Búsqueda local sobre el plan greedy para bajar el atraso contra `fecha_entrega_solicitada`.
+
+El greedy recorre las órdenes una vez por EDD y pone cada tanda en la línea
+compatible más libre. Cuando los conjuntos de líneas compatibles se pisan,
+una orden flexible puede ocupar la única línea que le sirve a otra más
+urgente y dejarla atrasada sin necesidad.
+
+`optimizar_plan` parte del plan greedy y prueba movimientos mientras quede
+presupuesto de tiempo:
+
+    adelantar   mover una orden atrasada justo antes de otra no atrasada que
+                ocupa sus líneas (cambia las secuencias en esas colas)
+    desviar     fijar esa otra orden a una línea compatible distinta
+                (reasigna sus tandas de línea)
+    fijar       fijar la orden atrasada a una de sus líneas compatibles
+
+Cada candidato se decodifica con el mismo `calcular_plan` (la función
+`decodificar` que arma el handler), así que el resultado respeta
+compatibilidades, capacidades y calendario igual que el greedy. Una línea
+fijada viaja en la orden como `"lineas"`. Se acepta un movimiento si no
+empeora (atraso total, atraso máximo); los empates se aceptan salvo que
+toquen una orden movida hace poco (lista tabú), para recorrer mesetas sin
+ciclar. Nunca se devuelve algo peor que el greedy.
+
+El atraso de una orden son los días corridos entre su `fecha_entrega_solicitada`
+y el día hábil de su última tanda; lo que queda sin planificar cuenta como
+terminado el día hábil siguiente al último del plan. Las órdenes sin línea
+compatible no se cuentan y una orden atrasada que ya termina el primer día no
+se intenta mejorar (ningún movimiento las cambia).
+
+Uso:
+
+    resultado = optimizar_plan(decodificar, ordenes, compat, desde, segundos=5)
+    resultado.plan, resultado.greedy, resultado.atraso
+"""
+
+import logging
+import random
+import time
+from collections import deque
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+from alimentapp.planificacion import Plan, dias_habiles
+
+logger = logging.getLogger(__name__)
+
+TENENCIA_TABU = 10
+# Órdenes que bloquean consideradas por movimiento (las de más holgura primero).
+CANDIDATAS_POR_MOVIMIENTO = 8
+# Sorteos seguidos sin movimiento posible antes de dar la búsqueda por terminada.
+INTENTOS_SIN_MOVIMIENTO = 100
+
+
+class Atraso(NamedTuple):
+    """Atraso de un plan en días corridos."""
+
+    total: int
+    maximo: int
+    ordenes: int
+
+    def clave(self) -> Tuple[int, int]:
+        return self.total, self.maximo
+
+
+class Optimizacion(NamedTuple):
+    """Resultado de `optimizar_plan`: el mejor plan encontrado y cómo se llegó."""
+
+    plan: Plan
+    ordenes: List[Mapping[str, Any]]
+    greedy: Atraso
+    atraso: Atraso
+    evaluaciones: int
+    mejoras: int
+    segundos: float
+    fin: str
+
+    def resumen(self) -> Dict[str, Any]:
+        """Para la respuesta de la Lambda."""
+        return {
+            "greedy": self.greedy._asdict(),
+            "optimizado": self.atraso._asdict(),
+            "mejora_dias": self.greedy.total - self.atraso.total,
+            "evaluaciones": self.evaluaciones,
+            "mejoras": self.mejoras,
+            "segundos": round(self.segundos, 3),
+            "fin": self.fin,
+        }
+
+
+def _ordinal(valor: Any) -> Optional[int]:
+    if isinstance(valor, datetime):
+        return valor.date().toordinal()
+    if isinstance(valor, date):
+        return valor.toordinal()
+    return None
+
+
+class _Evaluador:
+    """Mide el atraso de un plan; guarda las fechas como ordinales para no crear `date` por orden."""
+
+    def __init__(self, ordenes: Sequence[Mapping[str, Any]], compatibilidades: Mapping[int, List[int]], desde: date):
+        self.desde = desde
+        self.vencimientos = {
+            o["id"]: _ordinal(o.get("fecha_entrega_solicitada"))
+            for o in ordenes
+            if compatibilidades.get(o["id_producto"])
+        }
+        self._fechas: List[int] = []
+
+    def _fecha(self, dia: int) -> int:
+        if dia >= len(self._fechas):
+            self._fechas = [d.toordinal() for d in dias_habiles(self.desde, max(dia + 1, 2 * len(self._fechas)))]
+        return self._fechas[dia]
+
+    def medir(self, plan: Plan) -> Tuple[Atraso, Dict[int, int], Dict[int, int]]:
+        """(atraso, día de fin por orden, holgura o -atraso en días por orden con vencimiento)."""
+        fin: Dict[int, int] = {}
+        for t in plan.tandas:
+            if t.dia is not None and t.dia > fin.get(t.orden_produccion_id, -1):
+                fin[t.orden_produccion_id] = t.dia
+        horizonte = plan.calendario.dias if plan.calendario else 1
+        completas = {o["orden_id"] for o in plan.ordenes_planificadas}
+        total = maximo = atrasadas = 0
+        holguras: Dict[int, int] = {}
+        for orden_id, vencimiento in self.vencimientos.items():
+            dia = fin.get(orden_id, horizonte) if orden_id in completas else horizonte
+            fin[orden_id] = dia
+            if vencimiento is None:
+                continue
+            holgura = vencimiento - self._fecha(dia)
+            holguras[orden_id] = holgura
+            if holgura < 0:
+                total -= holgura
+                maximo = max(maximo, -holgura)
+                atrasadas += 1
+        return Atraso(total, maximo, atrasadas), fin, holguras
+
+
+def _lineas_por_orden(plan: Plan) -> Dict[int, set]:
+    usadas: Dict[int, set] = {}
+    for t in plan.tandas:
+        usadas.setdefault(t.orden_produccion_id, set()).add(t.linea_produccion_id)
+    return usadas
+
+
+def optimizar_plan(
+    decodificar: Callable[[Sequence[Mapping[str, Any]]], Plan],
+    ordenes: Sequence[Mapping[str, Any]],
+    compatibilidades: Mapping[int, List[int]],
+    desde: date,
+    segundos: float,
+    max_evaluaciones: Optional[int] = None,
+    semilla: int = 0,
+) -> Optimizacion:
+    """Mejora el plan de `decodificar(ordenes)` durante hasta `segundos` (o `max_evaluaciones` planes).
+
+    `ordenes` va en el orden de prioridad del greedy; `desde` es el primer
+    día hábil del calendario. El reloj se mira entre evaluaciones: el tiempo
+    real puede pasarse en lo que tarda un plan.
+    """
+    inicio = time.monotonic()
+    limite = inicio + max(0.0, segundos)
+    azar = random.Random(semilla)
+    evaluador = _Evaluador(ordenes, compatibilidades, desde)
+
+    actual = list(ordenes)
+    plan = decodificar(actual)
+    atraso, fin, holguras = evaluador.medir(plan)
+    greedy = atraso
+    mejor = (atraso, plan, actual)
+    evaluaciones, mejoras = 1, 0
+    tabu: deque = deque(maxlen=TENENCIA_TABU)
+    lineas_usadas = _lineas_por_orden(plan)
+    posiciones = {o["id"]: k for k, o in enumerate(actual)}
+
+    motivo = "sin_atrasos_evitables"
+    sin_movimiento = 0
+    while any(holgura < 0 and fin[orden_id] > 0 for orden_id, holgura in holguras.items()):
+        if time.monotonic() >= limite:
+            motivo = "tiempo"
+            break
+        if max_evaluaciones is not None and evaluaciones >= max_evaluaciones:
+            motivo = "evaluaciones"
+            break
+
+        movimiento = _proponer(azar, actual, posiciones, compatibilidades, lineas_usadas, fin, holguras)
+        if movimiento is None:
+            sin_movimiento += 1
+            if sin_movimiento > INTENTOS_SIN_MOVIMIENTO:
+                motivo = "sin_movimientos"
+                break
+            continue
+        sin_movimiento = 0
+        tocadas, candidata = movimiento
+        plan_candidato = decodificar(candidata)
+        evaluaciones += 1
+        atraso_candidato, fin_candidato, holguras_candidato = evaluador.medir(plan_candidato)
+
+        if atraso_candidato.clave() < atraso.clave() or (
+            atraso_candidato.clave() == atraso.clave() and not any(o in tabu for o in tocadas)
+        ):
+            if atraso_candidato.clave() < mejor[0].clave():
+                mejor = (atraso_candidato, plan_candidato, candidata)
+                mejoras += 1
+            actual, plan, atraso = candidata, plan_candidato, atraso_candidato
+            fin, holguras = fin_candidato, holguras_candidato
+            lineas_usadas = _lineas_por_orden(plan)
+            posiciones = {o["id"]: k for k, o in enumerate(actual)}
+            tabu.extend(tocadas)
+
+    atraso, plan, actual = mejor
+    resultado = Optimizacion(
+        plan, actual, greedy, atraso, evaluaciones, mejoras, time.monotonic() - inicio, motivo
+    )
+    logger.info("Optimización del plan: %s", resultado.resumen())
+    return resultado
+
+
+def _lineas(orden: Mapping[str, Any], compatibilidades: Mapping[int, List[int]]) -> List[int]:
+    return orden.get("lineas") or compatibilidades.get(orden["id_producto"], [])
+
+
+def _proponer(
+    azar: random.Random,
+    actual: List[Mapping[str, Any]],
+    posiciones: Dict[int, int],
+    compatibilidades: Mapping[int, List[int]],
+    lineas_usadas: Dict[int, set],
+    fin: Dict[int, int],
+    holguras: Dict[int, int],
+) -> Optional[Tuple[List[int], List[Mapping[str, Any]]]]:
+    """Un movimiento al azar alrededor de una orden atrasada: (órdenes tocadas, nueva lista de prioridad)."""
+    # Una orden atrasada que ya termina el primer día no puede mejorar.
+    atrasadas = [orden_id for orden_id, holgura in holguras.items() if holgura < 0 and fin[orden_id] > 0]
+    if not atrasadas:
+        return None
+    # Más probable cuanto más atrasada.
+    orden_id = azar.choices(atrasadas, weights=[-holguras[o] for o in atrasadas])[0]
+    posicion = posiciones[orden_id]
+    atrasada = actual[posicion]
+    compatibles = set(compatibilidades.get(atrasada["id_producto"], []))
+
+    # Órdenes anteriores que ocupan sus líneas hasta su día de fin y no están atrasadas.
+    bloqueantes = [
+        o["id"]
+        for o in actual[:posicion]
+        if holguras.get(o["id"], 1) >= 0
+        and fin.get(o["id"], 0) <= fin[orden_id]
+        and lineas_usadas.get(o["id"], set()) & compatibles
+    ]
+    bloqueantes.sort(key=lambda o: -holguras.get(o, 1 << 30))
+    bloqueantes = bloqueantes[:CANDIDATAS_POR_MOVIMIENTO]
+
+    tipo = azar.random()
+    if bloqueantes and tipo < 0.5:
+        otra = azar.choice(bloqueantes)
+        nueva = list(actual)
+        del nueva[posicion]
+        nueva.insert(posiciones[otra], atrasada)
+        return [orden_id, otra], nueva
+
+    if bloqueantes and tipo < 0.8:
+        otra = azar.choice(bloqueantes)
+        orden = actual[posiciones[otra]]
+        opciones = [l for l in compatibilidades.get(orden["id_producto"], []) if l not in compatibles]
+        if not opciones:
+            opciones = [l for l in compatibilidades.get(orden["id_producto"], []) if l not in lineas_usadas.get(otra, ())]
+        if opciones:
+            return [otra], _fijar(actual, posiciones[otra], azar.choice(opciones))
+
+    opciones = [l for l in compatibles if [l] != _lineas(atrasada, compatibilidades)]
+    if len(compatibles) > 1 and opciones:
+        return [orden_id], _fijar(actual, posicion, azar.choice(sorted(opciones)))
+    if atrasada.get("lineas"):
+        return [orden_id], _fijar(actual, posicion, None)
+    return None
+
+
+def _fijar(actual: List[Mapping[str, Any]], posicion: int, linea: Optional[int]) -> List[Mapping[str, Any]]:
+    """Copia de la lista con la orden en `posicion` fijada a `linea` (None = todas sus compatibles)."""
+    orden = dict(actual[posicion])
+    if linea is None:
+        orden.pop("lineas", None)
+    else:
+        orden["lineas"] = [linea]
+    nueva = list(actual)
+    nueva[posicion] = orden
+    return nueva
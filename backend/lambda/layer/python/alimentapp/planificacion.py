@@ -0,0 +1,417 @@
+"""Núcleo del planificador de tandas en Python puro (sin cursor ni base de datos).
+
+Los handlers de planificación cargan las entradas desde la base, llaman a
+`calcular_plan` y después deciden qué hacer con el resultado: persistirlo
+(`planificador_ordenes_produccion`) o sólo distribuirlo por días para una
+vista previa (`preview_por_dias`, planificador diario). Así las previews,
+simulaciones y benchmarks no necesitan escribir tandas en una transacción que
+después se descarta, y el algoritmo se puede probar y perfilar offline.
+
+Las cantidades son gramos enteros (`alimentapp.cantidades`): los handlers
+convierten al cargar y `Tanda.cantidad_kg` da el valor a persistir.
+
+Entradas:
+    capacidades          {linea_id: gramos por tanda} de las líneas activas
+    compatibilidades     {producto_id: [linea_id, ...]}
+    secuencias           {linea_id: última secuencia firme}
+    ordenes              [{"id", "id_producto", "gramos_pendientes"}, ...] ya ordenadas por prioridad;
+                         una orden con `"lineas"` sólo usa esas (ver `alimentapp.optimizacion`)
+    capacidades_diarias  {linea_id: gramos del período} o None para no limitar la carga por línea
+    calendario           `Calendario` opcional: ubica cada tanda en un día hábil a medida que se genera
+
+Las órdenes sólo compiten por capacidad con las que comparten alguna línea:
+`calcular_plan_por_componentes` separa el grafo producto → línea en
+componentes conexas, planifica cada una en su propio proceso y une los
+resultados en el mismo orden que `calcular_plan`.
+"""
+
+import heapq
+import os
+from datetime import date, timedelta
+from decimal import Decimal
+from fractions import Fraction
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+from alimentapp.cantidades import GRAMOS_POR_KG, kg_numeric, redondear_gramos
+from alimentapp.procesos import mapear
+
+# Con menos órdenes, crear los procesos cuesta más que planificar en serie.
+PLAN_PARALELO_MIN_ORDENES = int(os.getenv("PLAN_PARALELO_MIN_ORDENES", "10000"))
+
+
+class Tanda(NamedTuple):
+    """Tanda planificada; los campos se llaman como las columnas de `tanda_produccion`.
+
+    `cantidad_g` son los gramos sin redondear. Con calendario, `dia` es el
+    índice del día hábil asignado (0 = primero) e `inicio_g` los gramos que la
+    línea ya tiene ocupados ese día antes de esta tanda.
+    """
+
+    orden_produccion_id: int
+    linea_produccion_id: int
+    cantidad_g: int
+    secuencia_en_linea: int
+    dia: Optional[int] = None
+    inicio_g: Optional[int] = None
+
+    @property
+    def cantidad_kg(self) -> Decimal:
+        """kg como los guarda `tanda_produccion.cantidad_kg` (NUMERIC(10,2))."""
+        return kg_numeric(self.cantidad_g)
+
+
+class Plan:
+    """Resultado de `calcular_plan`."""
+
+    __slots__ = ("tandas", "ordenes_planificadas", "alertas", "calendario")
+
+    def __init__(self, calendario: Optional["Calendario"] = None) -> None:
+        self.tandas: List[Tanda] = []
+        self.ordenes_planificadas: List[Dict[str, Any]] = []
+        self.alertas: List[Dict[str, Any]] = []
+        self.calendario = calendario
+
+    def por_linea(self) -> List[Tanda]:
+        """Tandas ordenadas por línea y secuencia (el orden de las colas)."""
+        return sorted(self.tandas, key=lambda t: (t.linea_produccion_id, t.secuencia_en_linea))
+
+
+def dias_habiles(desde: date, cantidad: int) -> List[date]:
+    """`cantidad` días hábiles (L-V) a partir de `desde` (o del siguiente hábil si cae en fin de semana)."""
+    dias: List[date] = []
+    dia = desde
+    while len(dias) < cantidad:
+        if dia.weekday() < 5:
+            dias.append(dia)
+        dia += timedelta(days=1)
+    return dias
+
+
+class _DiasLinea:
+    """Capacidad restante por día de una línea, en un árbol de segmentos de máximos.
+
+    Los días no usados tienen la capacidad completa; el árbol duplica su
+    tamaño cuando todos los días conocidos están ocupados. Buscar el primer
+    día con lugar para `gramos` y descontarlo cuesta O(log D).
+    """
+
+    __slots__ = ("capacidad", "hojas", "maximos")
+
+    def __init__(self, capacidad: int):
+        self.capacidad = capacidad
+        self.hojas = 1
+        self.maximos = [capacidad, capacidad]
+
+    def _crecer(self) -> None:
+        hojas = self.maximos[self.hojas:] + [self.capacidad] * self.hojas
+        self.hojas *= 2
+        self.maximos = [0] * self.hojas + hojas
+        for i in range(self.hojas - 1, 0, -1):
+            self.maximos[i] = max(self.maximos[2 * i], self.maximos[2 * i + 1])
+
+    def ocupar(self, gramos: int) -> Tuple[int, int]:
+        """Descuenta `gramos` del primer día con lugar suficiente; devuelve (día, gramos ya ocupados ese día)."""
+        while self.maximos[1] < gramos:
+            self._crecer()
+        maximos, hojas = self.maximos, self.hojas
+        i = 1
+        while i < hojas:
+            i *= 2
+            if maximos[i] < gramos:
+                i += 1
+        dia = i - hojas
+        ocupado = self.capacidad - maximos[i]
+        maximos[i] -= gramos
+        # Subir mientras cambie el máximo: los ancestros sólo dependen de este camino.
+        i //= 2
+        while i:
+            izquierda, derecha = maximos[2 * i], maximos[2 * i + 1]
+            maximo = izquierda if izquierda >= derecha else derecha
+            if maximos[i] == maximo:
+                break
+            maximos[i] = maximo
+            i //= 2
+        return dia, ocupado
+
+    def llenar_dia_libre(self) -> int:
+        """Marca completo el primer día sin uso y devuelve su índice (tandas mayores a la capacidad diaria)."""
+        dia, _ = self.ocupar(self.capacidad)
+        return dia
+
+
+class Calendario:
+    """Asigna cada tanda al primer día hábil en que su línea tiene lugar (first-fit por línea).
+
+    `capacidades_diarias` son los gramos por día de cada línea. Una tanda no se
+    parte entre días; si supera la capacidad diaria ocupa sola un día libre.
+    Las líneas sin capacidad diaria no reciben día.
+    """
+
+    def __init__(self, capacidades_diarias: Mapping[int, int]):
+        self._capacidades = capacidades_diarias
+        self._lineas: Dict[int, _DiasLinea] = {}
+        self.dias = 1
+
+    def ubicar(self, linea_id: int, gramos: int) -> Tuple[Optional[int], Optional[int]]:
+        """(día, gramos ya ocupados ese día en la línea) o (None, None) si la línea no tiene capacidad diaria."""
+        dias = self._lineas.get(linea_id)
+        if dias is None:
+            capacidad = self._capacidades.get(linea_id, 0)
+            if capacidad <= 0:
+                return None, None
+            dias = self._lineas[linea_id] = _DiasLinea(capacidad)
+        if gramos > dias.capacidad:
+            dia, ocupado = dias.llenar_dia_libre(), 0
+        else:
+            dia, ocupado = dias.ocupar(gramos)
+        self.dias = max(self.dias, dia + 1)
+        return dia, ocupado
+
+    def incorporar(self, otro: "Calendario") -> None:
+        """Suma los días ocupados de `otro`, calculado sobre otras líneas (plan por componentes)."""
+        self._lineas.update(otro._lineas)
+        self.dias = max(self.dias, otro.dias)
+
+    def tramo(self, tanda: Tanda) -> Optional[Tuple[Fraction, Fraction]]:
+        """Fracción exacta de la jornada (desde, hasta) que ocupa la tanda en su día, o None si no tiene día."""
+        if tanda.dia is None:
+            return None
+        capacidad = self._lineas[tanda.linea_produccion_id].capacidad
+        fin = tanda.inicio_g + redondear_gramos(tanda.cantidad_g)
+        return Fraction(tanda.inicio_g, capacidad), Fraction(fin, capacidad)
+
+
+def seleccionar_linea(
+    lineas_compatibles: List[int],
+    disponibilidad: Dict[int, Dict[str, Any]],
+    limitar: bool = True,
+) -> Optional[int]:
+    """Elige la línea compatible más libre (menor secuencia y carga acumulada).
+
+    Con `limitar` sólo se consideran líneas con capacidad del período disponible.
+    Es la regla de referencia: recorre todas las compatibles en cada llamada.
+    """
+    candidatas = [
+        linea
+        for linea in lineas_compatibles
+        if linea in disponibilidad
+        and (not limitar or disponibilidad[linea]["carga_planificada"] < disponibilidad[linea]["capacidad_diaria"])
+    ]
+    if not candidatas:
+        return None
+    return min(
+        candidatas,
+        key=lambda linea: (disponibilidad[linea]["sec"], disponibilidad[linea]["carga_planificada"], linea),
+    )
+
+
+class SelectorLineal:
+    """Selección con `seleccionar_linea`: O(L) por tanda."""
+
+    def __init__(self, disponibilidad: Dict[int, Dict[str, Any]], limitar: bool):
+        self._disponibilidad = disponibilidad
+        self._limitar = limitar
+
+    def elegir(self, lineas_compatibles: List[int]) -> Optional[int]:
+        return seleccionar_linea(lineas_compatibles, self._disponibilidad, self._limitar)
+
+
+class SelectorLineas:
+    """Misma regla que `seleccionar_linea`, con un heap por conjunto de líneas compatibles.
+
+    Cada heap guarda (sec, carga_planificada, linea). La clave de una línea
+    sólo crece cuando recibe una tanda, así que una entrada desactualizada
+    nunca es mayor que la vigente: si el tope está viejo se reemplaza por la
+    clave actual y se vuelve a mirar (O(log L)). Una línea que llenó su
+    capacidad del período no vuelve a tener lugar y se descarta del heap.
+    """
+
+    def __init__(self, disponibilidad: Dict[int, Dict[str, Any]], limitar: bool):
+        self._disponibilidad = disponibilidad
+        self._limitar = limitar
+        self._heaps: Dict[Tuple[int, ...], List[Tuple[int, int, int]]] = {}
+
+    def _clave(self, linea: int) -> Tuple[int, int, int]:
+        datos = self._disponibilidad[linea]
+        return datos["sec"], datos["carga_planificada"], linea
+
+    def _con_lugar(self, linea: int) -> bool:
+        datos = self._disponibilidad[linea]
+        return not self._limitar or datos["carga_planificada"] < datos["capacidad_diaria"]
+
+    def elegir(self, lineas_compatibles: List[int]) -> Optional[int]:
+        conjunto = tuple(lineas_compatibles)
+        heap = self._heaps.get(conjunto)
+        if heap is None:
+            heap = [self._clave(linea) for linea in set(conjunto) if linea in self._disponibilidad]
+            heapq.heapify(heap)
+            self._heaps[conjunto] = heap
+        while heap:
+            linea = heap[0][2]
+            if not self._con_lugar(linea):
+                heapq.heappop(heap)
+                continue
+            actual = self._clave(linea)
+            if heap[0] == actual:
+                return linea
+            heapq.heapreplace(heap, actual)
+        return None
+
+
+def calcular_plan(
+    capacidades: Mapping[int, int],
+    compatibilidades: Mapping[int, List[int]],
+    secuencias: Mapping[int, int],
+    ordenes: Iterable[Mapping[str, Any]],
+    capacidades_diarias: Optional[Mapping[int, int]] = None,
+    selector: Callable[[Dict[int, Dict[str, Any]], bool], Any] = SelectorLineas,
+    calendario: Optional[Calendario] = None,
+) -> Plan:
+    """Heurística greedy: reparte los gramos pendientes de cada orden en tandas sobre la línea más libre.
+
+    `selector` construye el objeto que elige la línea (`SelectorLineas` o la
+    referencia `SelectorLineal`); ambos producen el mismo plan. Con
+    `calendario` cada tanda sale ya con su día asignado.
+    """
+    limitar = capacidades_diarias is not None
+    disponibilidad = {
+        linea_id: {
+            "capacidad": capacidad,
+            "capacidad_diaria": capacidades_diarias.get(linea_id, 0) if limitar else None,
+            "sec": secuencias.get(linea_id, 0) + 1,
+            "carga_planificada": 0,
+        }
+        for linea_id, capacidad in capacidades.items()
+    }
+
+    elegir = selector(disponibilidad, limitar).elegir
+
+    plan = Plan(calendario)
+    for orden in ordenes:
+        orden_id = orden["id"]
+        pendientes = orden["gramos_pendientes"]
+        lineas_compatibles = orden.get("lineas") or compatibilidades.get(orden["id_producto"], [])
+        if not lineas_compatibles:
+            plan.alertas.append({"orden_id": orden_id, "motivo": "sin_linea_compatible"})
+            continue
+
+        restantes = pendientes
+        tandas_creadas = 0
+        while restantes > 0:
+            linea_id = elegir(lineas_compatibles)
+            if linea_id is None:
+                plan.alertas.append(
+                    {
+                        "orden_id": orden_id,
+                        "motivo": "sin_linea_disponible_con_capacidad" if limitar else "sin_linea_disponible",
+                        "kg_pendientes": restantes / GRAMOS_POR_KG,
+                    }
+                )
+                break
+
+            linea = disponibilidad[linea_id]
+            if linea["capacidad"] <= 0:
+                plan.alertas.append({"orden_id": orden_id, "motivo": "capacidad_no_valida", "linea_id": linea_id})
+                break
+
+            # Tamaño de la tanda: lo que falta, acotado por la capacidad de la tanda y la del período.
+            tanda = min(restantes, linea["capacidad"])
+            if limitar:
+                tanda = min(tanda, linea["capacidad_diaria"] - linea["carga_planificada"])
+
+            dia, inicio = calendario.ubicar(linea_id, redondear_gramos(tanda)) if calendario else (None, None)
+            plan.tandas.append(Tanda(orden_id, linea_id, tanda, linea["sec"], dia, inicio))
+            linea["sec"] += 1
+            linea["carga_planificada"] += tanda
+            restantes -= tanda
+            tandas_creadas += 1
+
+        if restantes <= 0:
+            plan.ordenes_planificadas.append(
+                {"orden_id": orden_id, "tandas_creadas": tandas_creadas, "kg_total": pendientes / GRAMOS_POR_KG}
+            )
+    return plan
+
+
+def _lineas_orden(orden: Mapping[str, Any], compatibilidades: Mapping[int, List[int]]) -> List[int]:
+    return orden.get("lineas") or compatibilidades.get(orden["id_producto"], [])
+
+
+def componentes(
+    compatibilidades: Mapping[int, List[int]], ordenes: Sequence[Mapping[str, Any]]
+) -> List[List[Mapping[str, Any]]]:
+    """Agrupa las órdenes por componente conexa de líneas, cada grupo en el orden de `ordenes`.
+
+    Dos órdenes caen en el mismo grupo si sus líneas compatibles se conectan
+    a través de algún producto. Las órdenes sin líneas forman un grupo
+    aparte (sólo generan alertas).
+    """
+    padres: Dict[int, int] = {}
+
+    def raiz(linea: int) -> int:
+        padres.setdefault(linea, linea)
+        while padres[linea] != linea:
+            padres[linea] = padres[padres[linea]]
+            linea = padres[linea]
+        return linea
+
+    for lineas in list(compatibilidades.values()) + [o["lineas"] for o in ordenes if o.get("lineas")]:
+        primera = raiz(lineas[0]) if lineas else None
+        for linea in lineas[1:]:
+            otra = raiz(linea)
+            if otra != primera:
+                padres[otra] = primera
+
+    grupos: Dict[Optional[int], List[Mapping[str, Any]]] = {}
+    for orden in ordenes:
+        lineas = _lineas_orden(orden, compatibilidades)
+        grupos.setdefault(raiz(lineas[0]) if lineas else None, []).append(orden)
+    return list(grupos.values())
+
+
+def calcular_plan_por_componentes(
+    capacidades: Mapping[int, int],
+    compatibilidades: Mapping[int, List[int]],
+    secuencias: Mapping[int, int],
+    ordenes: Iterable[Mapping[str, Any]],
+    capacidades_diarias: Optional[Mapping[int, int]] = None,
+    selector: Callable[[Dict[int, Dict[str, Any]], bool], Any] = SelectorLineas,
+    calendario: Optional[Calendario] = None,
+    procesos: Optional[int] = None,
+) -> Plan:
+    """Mismo resultado que `calcular_plan`, planificando cada componente de líneas en paralelo.
+
+    Cada componente usa sólo sus líneas (secuencias, carga y días), así que
+    el greedy de una no depende de las otras. Las partes se unen ordenando
+    tandas, órdenes planificadas y alertas por la posición de su orden en
+    `ordenes`, que es el orden en que las genera `calcular_plan`. Con una
+    sola componente, menos de PLAN_PARALELO_MIN_ORDENES órdenes o un solo
+    proceso disponible, no se crea ningún proceso.
+    """
+    ordenes = list(ordenes)
+    grupos = componentes(compatibilidades, ordenes) if len(ordenes) >= PLAN_PARALELO_MIN_ORDENES else [ordenes]
+    planificar = partial(
+        calcular_plan,
+        capacidades,
+        compatibilidades,
+        secuencias,
+        capacidades_diarias=capacidades_diarias,
+        selector=selector,
+        calendario=calendario,
+    )
+    if len(grupos) <= 1:
+        return planificar(ordenes)
+
+    partes = mapear(planificar, grupos, procesos)
+    posicion = {orden["id"]: k for k, orden in enumerate(ordenes)}
+    plan = Plan(calendario)
+    plan.tandas = list(heapq.merge(*(p.tandas for p in partes), key=lambda t: posicion[t.orden_produccion_id]))
+    plan.ordenes_planificadas = list(
+        heapq.merge(*(p.ordenes_planificadas for p in partes), key=lambda o: posicion[o["orden_id"]])
+    )
+    plan.alertas = list(heapq.merge(*(p.alertas for p in partes), key=lambda a: posicion[a["orden_id"]]))
+    if calendario is not None:
+        for parte in partes:
+            calendario.incorporar(parte.calendario)
+    return plan
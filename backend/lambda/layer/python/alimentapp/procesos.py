@@ -0,0 +1,77 @@
+"""Reparto de trabajo CPU-bound entre procesos dentro de una Lambda.
+
+`multiprocessing.Pool` y `ProcessPoolExecutor` necesitan semáforos en
+`/dev/shm`, que Lambda no monta. `mapear` crea los procesos con fork: cada
+uno hereda en memoria lo que el handler ya cargó (entradas del plan, agenda
+base) sin serializarlo, procesa su parte de los ítems y devuelve sólo los
+resultados por un `Pipe`.
+
+Uso:
+
+    resultados = mapear(partial(evaluar, contexto), candidatos)
+
+`funcion` no debe usar la conexión a la base: el proceso hijo comparte el
+socket del padre. Los resultados tienen que poder serializarse con pickle.
+"""
+
+import logging
+import multiprocessing
+import os
+from typing import Any, Callable, Iterable, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Lambda asigna vCPUs según la memoria configurada (hasta 6).
+PROCESOS_MAX = int(os.getenv("PROCESOS_MAX", "0")) or os.cpu_count() or 1
+
+
+def _trabajar(funcion: Callable[[Any], Any], items: Sequence[Any], envio) -> None:
+    try:
+        envio.send(("ok", [funcion(item) for item in items]))
+    except BaseException as exc:  # el padre decide: se informa en vez de morir en silencio
+        envio.send(("error", f"{type(exc).__name__}: {exc}"))
+    finally:
+        envio.close()
+
+
+def mapear(funcion: Callable[[Any], Any], items: Iterable[Any], procesos: Optional[int] = None) -> List[Any]:
+    """`[funcion(item) for item in items]` repartido en hasta `procesos` procesos, en el mismo orden.
+
+    Con un solo proceso, un solo ítem, sin fork disponible o llamado desde
+    otro `mapear` se ejecuta en el proceso actual.
+    """
+    items = list(items)
+    cantidad = min(procesos or PROCESOS_MAX, len(items))
+    # Dentro de un proceso de `mapear` (daemon) no se pueden crear más procesos.
+    if cantidad <= 1 or multiprocessing.current_process().daemon or "fork" not in multiprocessing.get_all_start_methods():
+        return [funcion(item) for item in items]
+
+    contexto = multiprocessing.get_context("fork")
+    partes = [items[k::cantidad] for k in range(cantidad)]
+    trabajos = []
+    for parte in partes:
+        recepcion, envio = contexto.Pipe(duplex=False)
+        proceso = contexto.Process(target=_trabajar, args=(funcion, parte, envio), daemon=True)
+        proceso.start()
+        envio.close()
+        trabajos.append((proceso, recepcion))
+
+    resultados: List[Any] = [None] * len(items)
+    errores: List[str] = []
+    # Recibir antes de join: un resultado grande bloquearía al hijo escribiendo en el pipe.
+    for k, (proceso, recepcion) in enumerate(trabajos):
+        try:
+            estado, valor = recepcion.recv()
+        except EOFError:
+            estado, valor = "error", "el proceso terminó sin devolver resultados"
+        finally:
+            recepcion.close()
+        proceso.join()
+        if estado == "ok":
+            resultados[k::cantidad] = valor
+        else:
+            errores.append(valor)
+    if errores:
+        raise RuntimeError(f"Fallaron {len(errores)} de {cantidad} procesos: {errores[0]}")
+    logger.info("mapear: %s ítems en %s procesos", len(items), cantidad)
+    return resultados
@@ -0,0 +1,142 @@
+"""Requerimientos de materia prima a partir de las recetas, para cualquier conjunto de OP.
+
+Las recetas (`materia_prima_por_producto`) se cargan una vez como una matriz
+rala producto × materia: una fila por producto guardada en arreglos de
+enteros (materias y cantidad por unidad, con el inicio de cada fila). El
+requerimiento de un conjunto de OP es el producto de esa matriz por el vector
+de cantidades por producto: primero se suman las cantidades de las OP por
+producto y después cada producto recorre su fila una sola vez, así que el
+costo depende de los productos distintos y no de las OP.
+
+Todo en centésimos enteros: `cantidad` (INTEGER) * `cantidad_unitaria`
+(NUMERIC(10,2)) es exacto, y `desde_centesimos` se aplica recién al armar la
+respuesta. Es la misma cuenta que hacen los triggers del requerido de
+`totales_materia_prima` (una `cantidad_unitaria` NULL cuenta como 0),
+así que la asignación de lotes, la gestión de materia prima, el MRP y las
+vistas dan los mismos números.
+
+Uso:
+
+    recetas = cargar_recetas(cur, productos)        # sin productos: todas
+    recetas.requerimiento(ordenes)                  # {materia: centésimos}
+    recetas.requerimiento_por(ordenes, clave)       # {clave(orden): {materia: centésimos}}
+    recetas.de_orden(orden)                         # [(materia, centésimos)] en el orden de la receta
+    faltantes(requerido, disponible)                # {materia: lo que no alcanza}
+"""
+
+from array import array
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from alimentapp.cantidades import a_centesimos
+from alimentapp.db import ENV, fetch_all
+
+Orden = Mapping[str, Any]  # con "id_producto" y "cantidad"
+
+
+def _cantidad(orden: Orden) -> int:
+    return int(orden["cantidad"] or 0)
+
+
+class Recetas:
+    """Matriz producto × materia de cantidades por unidad (centésimos), por filas."""
+
+    __slots__ = ("_filas", "_inicio", "_materias", "_por_unidad")
+
+    def __init__(self, items: Iterable[Tuple[int, int, int]]) -> None:
+        """`items`: (producto, materia, centésimos por unidad), agrupados por producto."""
+        self._filas: Dict[int, int] = {}
+        self._inicio = array("q")
+        self._materias = array("q")
+        self._por_unidad = array("q")
+        for producto, materia, por_unidad in items:
+            if producto not in self._filas:
+                self._filas[producto] = len(self._inicio)
+                self._inicio.append(len(self._materias))
+            elif self._filas[producto] != len(self._inicio) - 1:
+                raise ValueError(f"Receta del producto {producto} no contigua")
+            self._materias.append(materia)
+            self._por_unidad.append(por_unidad)
+        self._inicio.append(len(self._materias))
+
+    def __contains__(self, producto: int) -> bool:
+        return producto in self._filas
+
+    def __len__(self) -> int:
+        return len(self._filas)
+
+    def _fila(self, producto: int) -> range:
+        k = self._filas.get(producto)
+        if k is None:
+            return range(0)
+        return range(self._inicio[k], self._inicio[k + 1])
+
+    def items(self, producto: int) -> List[Tuple[int, int]]:
+        """[(materia, centésimos por unidad)] de la receta del producto, en su orden."""
+        return [(self._materias[j], self._por_unidad[j]) for j in self._fila(producto)]
+
+    def materias(self) -> List[int]:
+        """Materias que aparecen en alguna receta."""
+        return sorted(set(self._materias))
+
+    def sin_receta(self, ordenes: Iterable[Orden]) -> List[int]:
+        """Productos de las órdenes con cantidad que no tienen receta."""
+        return sorted({int(o["id_producto"]) for o in ordenes if _cantidad(o) > 0} - self._filas.keys())
+
+    def de_orden(self, orden: Orden) -> List[Tuple[int, int]]:
+        """[(materia, centésimos requeridos)] de una orden, en el orden de la receta."""
+        cantidad = _cantidad(orden)
+        return [(self._materias[j], cantidad * self._por_unidad[j]) for j in self._fila(int(orden["id_producto"]))]
+
+    def multiplicar(self, cantidades: Mapping[int, int]) -> Dict[int, int]:
+        """Matriz transpuesta por el vector de unidades por producto: {materia: centésimos}."""
+        total: Dict[int, int] = {}
+        materias, por_unidad = self._materias, self._por_unidad
+        for producto, cantidad in cantidades.items():
+            if not cantidad:
+                continue
+            for j in self._fila(producto):
+                materia = materias[j]
+                total[materia] = total.get(materia, 0) + cantidad * por_unidad[j]
+        return total
+
+    def requerimiento(self, ordenes: Iterable[Orden]) -> Dict[int, int]:
+        """Lo que piden las órdenes, sumado por materia (centésimos)."""
+        return self.multiplicar(vector(ordenes))
+
+    def requerimiento_por(self, ordenes: Iterable[Orden], clave: Callable[[Orden], Hashable]) -> Dict[Hashable, Dict[int, int]]:
+        """Lo que piden las órdenes agrupadas por `clave(orden)` (p.ej. su fecha), sumado por materia."""
+        vectores: Dict[Hashable, Dict[int, int]] = {}
+        for orden in ordenes:
+            por_producto = vectores.setdefault(clave(orden), {})
+            producto = int(orden["id_producto"])
+            por_producto[producto] = por_producto.get(producto, 0) + _cantidad(orden)
+        return {k: self.multiplicar(v) for k, v in vectores.items()}
+
+
+def vector(ordenes: Iterable[Orden]) -> Dict[int, int]:
+    """Unidades pedidas por producto."""
+    cantidades: Dict[int, int] = {}
+    for orden in ordenes:
+        producto = int(orden["id_producto"])
+        cantidades[producto] = cantidades.get(producto, 0) + _cantidad(orden)
+    return cantidades
+
+
+def faltantes(requerido: Mapping[int, int], disponible: Mapping[int, int]) -> Dict[int, int]:
+    """{materia: requerido − disponible} de las materias que no alcanzan."""
+    return {m: c - disponible.get(m, 0) for m, c in requerido.items() if c > disponible.get(m, 0)}
+
+
+def cargar_recetas(cur, productos: Optional[Sequence[int]] = None) -> Recetas:
+    """Recetas de `productos` (o de todos), en una consulta."""
+    sql = f"""
+        SELECT id_producto, id_materia_prima, cantidad_unitaria
+        FROM {ENV}.materia_prima_por_producto
+        {"WHERE id_producto = ANY(%s::int[])" if productos is not None else ""}
+        ORDER BY id_producto, id
+    """
+    filas = fetch_all(cur, sql, ([int(p) for p in productos],) if productos is not None else ())
+    return Recetas(
+        (int(r["id_producto"]), int(r["id_materia_prima"]), a_centesimos(r["cantidad_unitaria"] or 0))
+        for r in filas
+    )
@@ -0,0 +1,69 @@
+"""Registro de sentencias SQL con nombre, preparadas una sola vez por conexión.
+
+Armar el SQL con f-strings hace que Postgres parsee y planifique cada
+ejecución como una sentencia nueva. Acá cada sentencia se registra una vez
+(con el schema ya resuelto) y se prepara con `conn.prepare` la primera vez
+que se usa en una conexión; las invocaciones siguientes sobre la misma
+conexión caliente (ver alimentapp.db) sólo hacen BIND + EXECUTE.
+
+Los parámetros usan el estilo `:nombre` de pg8000:
+
+    SQL = RegistroSentencias({
+        "rol_por_nombre": "SELECT id FROM {ENV}.rol WHERE nombre = :rol",
+    })
+    filas = SQL.fetch_all(conn, "rol_por_nombre", rol="admin")
+"""
+
+import weakref
+from typing import Any, Dict, List, Optional
+
+from alimentapp.db import ENV
+
+
+class RegistroSentencias:
+    """Sentencias parametrizadas por nombre, preparadas perezosamente por conexión."""
+
+    def __init__(self, sentencias: Optional[Dict[str, str]] = None):
+        self._sql: Dict[str, str] = {}
+        # conexión -> {nombre: PreparedStatement}; se limpia sola al descartar la conexión.
+        self._preparadas: "weakref.WeakKeyDictionary[Any, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+        for nombre, sql in (sentencias or {}).items():
+            self.registrar(nombre, sql)
+
+    def registrar(self, nombre: str, sql: str) -> None:
+        """Registra una sentencia; `{ENV}` se reemplaza por el schema de trabajo."""
+        if nombre in self._sql:
+            raise ValueError(f"Sentencia '{nombre}' ya registrada")
+        self._sql[nombre] = sql.replace("{ENV}", ENV)
+
+    def sql(self, nombre: str) -> str:
+        """Texto final de la sentencia (útil para logs y benchmarks)."""
+        return self._sql[nombre]
+
+    def nombres(self) -> List[str]:
+        return list(self._sql)
+
+    def _preparada(self, conn, nombre: str):
+        """Devuelve la sentencia preparada en `conn`, preparándola si es la primera vez."""
+        por_conexion = self._preparadas.get(conn)
+        if por_conexion is None:
+            por_conexion = {}
+            self._preparadas[conn] = por_conexion
+        ps = por_conexion.get(nombre)
+        if ps is None:
+            ps = conn.prepare(self._sql[nombre])
+            por_conexion[nombre] = ps
+        return ps
+
+    def fetch_all(self, conn, nombre: str, **params: Any) -> List[Dict[str, Any]]:
+        """Ejecuta una sentencia SELECT registrada y devuelve filas como diccionarios."""
+        ps = self._preparada(conn, nombre)
+        rows = ps.run(**params)
+        if not rows:
+            return []
+        columns = [c["name"] for c in ps.row_desc]
+        return [dict(zip(columns, row)) for row in rows]
+
+    def run_command(self, conn, nombre: str, **params: Any) -> None:
+        """Ejecuta una sentencia INSERT/UPDATE/DELETE registrada."""
+        self._preparada(conn, nombre).run(**params)
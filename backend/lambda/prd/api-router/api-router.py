@@ -0,0 +1,193 @@
+"""Lambda única para la API: enruta por método + path a los handlers CRUD existentes.
+
+API Gateway (REST, integración proxy `ANY /{proxy+}`) entrega todos los
+requests a esta función, que resuelve el handler de `backend/lambda/prd` y
+llama a su `lambda_handler` con el mismo evento. Así todos los endpoints
+comparten el contenedor caliente, las credenciales cacheadas y la conexión
+del pool (ver alimentapp.db); cada handler se importa recién la primera vez
+que se lo pide.
+
+Resolución del último segmento del path:
+1. `ALIASES` para los paths del frontend que no coinciden con la carpeta.
+2. El nombre exacto de la carpeta, si su prefijo corresponde al método
+   (`POST /gestion-envios/post-entregar-envio-por-dni`).
+3. El nombre con prefijo según el método (`POST /login-empleado` -> `post-login-empleado`).
+
+Si el path es el nombre de una carpeta pero con otro método
+(`DELETE /get-clientes`) responde 405 en vez de ejecutarla.
+
+Las funciones individuales siguen desplegándose igual; este router es otra
+entrada al mismo código.
+"""
+
+import importlib.util
+import json
+import logging
+import os
+import sys
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from alimentapp.instrumentacion import instrumentar
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Raíz con una carpeta por handler (en el zip desplegado, la raíz del paquete).
+HANDLERS_DIR = os.getenv(
+    "ROUTER_HANDLERS_DIR", os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+# No se enrutan: planificadores (timeout/memoria propios), PDFs con layers
+# pesadas (reportlab/PIL), Lambdas que sólo se invocan entre funciones y mocks.
+EXCLUIDOS = {
+    "api-router",
+    "asignacion-lote-materia-prima-orden-produccion",
+    "envio-factura-cliente",
+    "generar-factura-orden-venta",
+    "gestion-materia-prima",
+    "planificador_ordenes_produccion",
+    "planificador_ordenes_produccion_daily",
+    "planificador_ordenes_produccion_simulacion_ov",
+    "post-crear-mock-ordenes-prd-test-planificacion",
+    "post-trazabilidad-lote-materia-prima",
+}
+
+# (método, último segmento del path) -> handler, para paths publicados con otro nombre.
+ALIASES: Dict[Tuple[str, str], str] = {
+    ("GET", "all-clients"): "get-clientes",
+    ("GET", "all-empleados"): "get-empleados",
+    ("GET", "productos"): "get-producto",
+    ("GET", "crear-orden-venta"): "get-ordenes-venta",
+    ("POST", "crear-orden-venta"): "post-creacion-orden-venta",
+    ("GET", "get-orden-venta"): "get-orden-venta-pendiente",
+    ("POST", "update-estado-orden-venta"): "post-update-orden-venta-estado",
+    ("POST", "post-cambiar-fecha-solicitada"): "post-update-fecha-solicitada",
+    ("POST", "update-orden-produccion"): "post-update-orden-produccion-estado",
+    ("GET", "pedido-materia-prima"): "get-pedidos-materia-prima",
+    ("GET", "stock"): "get-cantidad-disponible-materia-prima",
+    ("POST", "generar-compra-materia-prima"): "post-generar-compra-lote-materia-prima",
+    ("POST", "obtener-datos-finanzas"): "post-obtener-datos-finanzas-por-fecha",
+    ("POST", "cant-pedidos-entregados-a-tiempo-y-demora"): "post-cant-pedidos-entregados-a-tiempo-y-demora-por-fecha",
+    ("POST", "cant-pedidos-entregados-a-tiempo-y-demora-mensuales"): "post-cant-pedidos-entregados-a-tiempo-y-demora-por-mes",
+    # El frontend la llama con POST (manda el body) aunque la carpeta sea get-.
+    ("POST", "get-detalle-pedido-por-id-y-cuil"): "get-detalle-pedido-por-id-y-cuil",
+}
+
+# Prefijo de carpeta aceptado para cada método.
+PREFIJOS = {"GET": ("get",), "POST": ("post",), "PUT": ("post",)}
+
+CORS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "GET,POST,PUT,OPTIONS",
+    "Access-Control-Allow-Headers": "Content-Type,Authorization",
+}
+
+_HANDLERS: Optional[set] = None
+_CARGADOS: Dict[str, Callable[[Dict[str, Any], Any], Dict[str, Any]]] = {}
+
+
+def handlers_disponibles() -> set:
+    """Carpetas de HANDLERS_DIR con su `<carpeta>.py`, salvo las excluidas (cacheado)."""
+    global _HANDLERS
+    if _HANDLERS is None:
+        _HANDLERS = {
+            nombre
+            for nombre in os.listdir(HANDLERS_DIR)
+            if nombre not in EXCLUIDOS
+            and os.path.isfile(os.path.join(HANDLERS_DIR, nombre, f"{nombre}.py"))
+        }
+    return _HANDLERS
+
+
+def _segmento(path: str) -> str:
+    return (path or "").rstrip("/").rsplit("/", 1)[-1]
+
+
+def acepta_metodo(nombre: str, metodo: str) -> bool:
+    """Si el prefijo de la carpeta (`get-`/`post-`) corresponde al método."""
+    return any(nombre.startswith(f"{prefijo}-") for prefijo in PREFIJOS.get(metodo, ()))
+
+
+def resolver(metodo: str, path: str) -> Optional[str]:
+    """Devuelve el nombre del handler para método + path, o None si no hay ruta."""
+    segmento = _segmento(path)
+    if not segmento:
+        return None
+    disponibles = handlers_disponibles()
+    alias = ALIASES.get((metodo, segmento))
+    if alias in disponibles:
+        return alias
+    if segmento in disponibles and acepta_metodo(segmento, metodo):
+        return segmento
+    for prefijo in PREFIJOS.get(metodo, ()):
+        candidato = f"{prefijo}-{segmento}"
+        if candidato in disponibles:
+            return candidato
+    return None
+
+
+def cargar_handler(nombre: str) -> Callable[[Dict[str, Any], Any], Dict[str, Any]]:
+    """Importa `<nombre>/<nombre>.py` una sola vez por contenedor y devuelve su lambda_handler.
+
+    El handler se devuelve instrumentado con el nombre de la ruta: cada
+    request emite su resumen de consultas (ver alimentapp.instrumentacion).
+    """
+    handler = _CARGADOS.get(nombre)
+    if handler is None:
+        modulo = "handlers." + nombre.replace("-", "_")
+        spec = importlib.util.spec_from_file_location(
+            modulo, os.path.join(HANDLERS_DIR, nombre, f"{nombre}.py")
+        )
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[modulo] = module
+        try:
+            spec.loader.exec_module(module)
+        except Exception:
+            sys.modules.pop(modulo, None)
+            raise
+        handler = instrumentar(module.lambda_handler, nombre=nombre)
+        _CARGADOS[nombre] = handler
+    return handler
+
+
+def lambda_handler(event, context):
+    metodo = (event.get("httpMethod") or "").upper()
+    path = event.get("path") or ""
+
+    if metodo == "OPTIONS":
+        # El preflight se resuelve con el método real para delegar los headers CORS del handler.
+        headers = {k.lower(): v for k, v in (event.get("headers") or {}).items()}
+        metodo_real = (headers.get("access-control-request-method") or "").upper()
+        nombre = resolver(metodo_real, path) if metodo_real else None
+        if nombre is None:
+            return {"statusCode": 200, "headers": CORS, "body": ""}
+    else:
+        nombre = resolver(metodo, path)
+
+    if nombre is None and _segmento(path) in handlers_disponibles():
+        logger.info("Método no permitido: %s %s", metodo, path)
+        permitidos = [m for m in PREFIJOS if acepta_metodo(_segmento(path), m)]
+        return {
+            "statusCode": 405,
+            "headers": {**CORS, "Allow": ",".join(permitidos + ["OPTIONS"])},
+            "body": json.dumps({"error": f"Método no permitido: {metodo} {path}"}),
+        }
+
+    if nombre is None:
+        logger.info("Sin ruta para %s %s", metodo, path)
+        return {
+            "statusCode": 404,
+            "headers": CORS,
+            "body": json.dumps({"error": f"Ruta no encontrada: {metodo} {path}"}),
+        }
+
+    try:
+        handler = cargar_handler(nombre)
+    except Exception as exc:
+        logger.exception("No se pudo cargar el handler %s", nombre)
+        return {
+            "statusCode": 500,
+            "headers": CORS,
+            "body": json.dumps({"error": "Error interno", "detail": str(exc)}),
+        }
+    return handler(event, context)
@@ -1,14 +1,11 @@
 import json
 import logging
 import os
-import ssl
 from datetime import datetime
 from decimal import Decimal, InvalidOperation
 from io import BytesIO
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Dict, List
 
-import boto3
-import pg8000
 from email.mime.application import MIMEApplication
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
@@ -26,16 +23,12 @@ except ImportError as exc:  # pragma: no cover
         "Súbela como layer a la Lambda antes de ejecutar."
     ) from exc
 
+from alimentapp.aws import get_client
+from alimentapp.db import ENV, fetch_all, get_connection, release_connection
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-ENV = os.getenv("DB_SCHEMA", "dev")
-ssm_client = boto3.client("ssm")
-ses_client = boto3.client("ses")
-
-DB_CONFIG: Optional[Dict[str, Any]] = None
-SSL_CONTEXT = ssl.create_default_context()
-
 COMPANY_NAME = 'core-app'
 COMPANY_ADDRESS = 'av. libertador 1234'
 COMPANY_EMAIL = 'Coreappg4@gmail.com'
@@ -49,58 +42,6 @@ class ValidationError(Exception):
     # Se utiliza para propagar fallos de negocio hacia el handler.
 
 
-def get_db_parameters() -> Dict[str, Any]:
-    """Obtiene credenciales de RDS desde SSM, cacheadas en memoria."""
-    # Recupera parámetros secretos para reutilizarlos.
-    global DB_CONFIG
-    if DB_CONFIG:
-        return DB_CONFIG
-
-    names = [
-        "/alimentapp/db/host",
-        "/alimentapp/db/password",
-        "/alimentapp/db/port",
-        "/alimentapp/db/username",
-    ]
-    resp = ssm_client.get_parameters(Names=names, WithDecryption=True)
-    if len(resp["Parameters"]) != len(names):
-        missing = set(names) - {p["Name"] for p in resp["Parameters"]}
-        raise RuntimeError(f"Faltan parámetros en SSM: {', '.join(sorted(missing))}")
-    data = {p["Name"].split("/")[-1]: p["Value"] for p in resp["Parameters"]}
-    DB_CONFIG = {
-        "host": data["host"],
-        "port": int(data.get("port", "5432")),
-        "user": data["username"],
-        "password": data["password"],
-        "database": os.getenv("DB_NAME", "postgres"),
-    }
-    return DB_CONFIG
-
-
-def get_connection():
-    """Abre una conexión pg8000 con SSL hacia la base de datos."""
-    # Construye la conexión utilizando los parámetros cacheados.
-    cfg = get_db_parameters()
-    return pg8000.connect(
-        host=cfg["host"],
-        port=cfg["port"],
-        database=cfg["database"],
-        user=cfg["user"],
-        password=cfg["password"],
-        ssl_context=SSL_CONTEXT,
-        timeout=10,
-    )
-
-
-def fetch_all(cur, sql: str, params: Iterable[Any] = None) -> List[Dict[str, Any]]:
-    """Ejecuta un SELECT y devuelve las filas como diccionarios."""
-    # Ayuda a mapear las filas de la consulta en estructuras clave-valor.
-    cur.execute(sql, tuple(params or ()))
-    rows = cur.fetchall()
-    columns = [c[0] for c in cur.description]
-    return [dict(zip(columns, row)) for row in rows]
-
-
 def decimal_value(value: Any, contexto: str) -> Decimal:
     """Convierte valores a Decimal y explica los errores de formato."""
     # Garantiza cálculos monetarios consistentes en toda la lambda.
@@ -503,7 +444,7 @@ def enviar_factura_por_email(destinatario: str, orden: Dict[str, Any], pdf_bytes
     adjunto.add_header("Content-Disposition", "attachment", filename=nombre_archivo)
     mensaje.attach(adjunto)
 
-    ses_client.send_raw_email(
+    get_client("ses").send_raw_email(
         Source=SES_SOURCE_EMAIL,
         Destinations=[destinatario],
         RawMessage={"Data": mensaje.as_string()},
@@ -582,4 +523,4 @@ def lambda_handler(event, context):
         }
     finally:
         if conn:
-            conn.close()
+            release_connection(conn)
@@ -7,8 +7,10 @@ import types
 
 BASE_DIR = os.path.dirname(__file__)
 LAYER_PATH = os.path.join(BASE_DIR, "layer", "python")
-if LAYER_PATH not in sys.path:
-    sys.path.insert(0, LAYER_PATH)
+SHARED_LAYER_PATH = os.path.join(BASE_DIR, "..", "..", "layer", "python")
+for path in (LAYER_PATH, SHARED_LAYER_PATH):
+    if path not in sys.path:
+        sys.path.insert(0, path)
 
 # Stubs para evitar dependencias externas durante la demo local.
 class _BotoStub(types.SimpleNamespace):
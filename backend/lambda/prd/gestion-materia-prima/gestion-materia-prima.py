@@ -1,28 +1,30 @@
-﻿"""Gestion de materia prima: verifica stock, asigna lotes y dispara compras si falta insumo."""
+﻿"""Gestion de materia prima: verifica stock, asigna lotes y dispara compras si falta insumo.
+
+Primero pasa a `vencido` los lotes vencidos y pliega las diferencias del libro
+de stock en los totales por materia prima (barrido del libro de stock).
+Con `id_orden_venta` asigna lotes a las OP de esa OV que tienen stock. Después
+corre el MRP (`alimentapp.mrp`) sobre todo el backlog y compra las sugerencias
+que ya hay que pedir, una por materia y ventana de días, contando los pedidos
+ya generados. Sin `id_orden_venta` (p.ej. la regla programada) sólo barre y corre el MRP.
+"""
 import json
 import logging
-import math
 import os
-import ssl
-from decimal import Decimal
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime, timezone
 
 import urllib.request
 import urllib.error
 
-import boto3
-import pg8000
+from alimentapp.aws import get_client
+from alimentapp.cantidades import a_centesimos, desde_centesimos
+from alimentapp.db import ENV, get_connection, release_connection, run_query
+from alimentapp.mrp import Sugerencia, calcular_mrp, cargar_entradas_mrp
+from alimentapp.recetas import cargar_recetas
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-ENV = os.getenv("DB_SCHEMA", "dev")
-ssm_client = boto3.client("ssm")
-lambda_client = boto3.client("lambda")
-
-DB_CONFIG: Optional[Dict[str, Any]] = None
-
 LAMBDA_ASIGNAR_MP = os.getenv(
     "LAMBDA_POST_ASIGNAR_MATERIA_PRIMA",
     "asignacion-lote-materia-prima-orden-produccion",
@@ -31,85 +33,86 @@ API_GENERAR_COMPRA_MP = os.getenv(
     "API_GENERAR_COMPRA_MP",
     "https://eldzogehdj.execute-api.us-east-1.amazonaws.com/prd/gestion-materia-prima/generar-compra-materia-prima",
 )
+# Tope por llamada a la API de compra: el turno de compras queda tomado mientras tanto.
+API_COMPRA_TIMEOUT_SEGUNDOS = float(os.getenv("API_COMPRA_TIMEOUT_SEGUNDOS", "10"))
 
 
-def get_db_parameters() -> Dict[str, Any]:
-    global DB_CONFIG
-    if DB_CONFIG:
-        return DB_CONFIG
-
-    param_names = [
-        "/alimentapp/db/host",
-        "/alimentapp/db/password",
-        "/alimentapp/db/port",
-        "/alimentapp/db/username",
-    ]
-    resp = ssm_client.get_parameters(Names=param_names, WithDecryption=True)
-    if len(resp["Parameters"]) != len(param_names):
-        missing = set(param_names) - {p["Name"] for p in resp["Parameters"]}
-        raise RuntimeError(f"Parámetros faltantes en SSM: {', '.join(sorted(missing))}")
-
-    data = {p["Name"].split("/")[-1]: p["Value"] for p in resp["Parameters"]}
-    DB_CONFIG = {
-        "host": data["host"],
-        "port": int(data.get("port", "5432")),
-        "user": data["username"],
-        "password": data["password"],
-        "database": os.getenv("DB_NAME", "postgres"),
+def generar_compra(sugerencia: Sugerencia) -> Tuple[bool, Dict[str, Any]]:
+    """Pide una sugerencia del MRP a la API de compra: (ok, pedido generado o fallido)."""
+    materia_id = sugerencia.id_materia_prima
+    paquetes = sugerencia.paquetes
+    try:
+        logger.info(
+            "Generando pedido via API: materia_prima=%s paquetes=%s proveedor=%s",
+            materia_id,
+            paquetes,
+            sugerencia.id_proveedor,
+        )
+        request_payload = json.dumps(
+            {
+                "id_materia_prima": materia_id,
+                "id_proveedor": sugerencia.id_proveedor,
+                "cantidad_total": paquetes,
+            }
+        ).encode("utf-8")
+        req = urllib.request.Request(
+            API_GENERAR_COMPRA_MP,
+            data=request_payload,
+            method="POST",
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(req, timeout=API_COMPRA_TIMEOUT_SEGUNDOS) as resp:
+            raw_body = resp.read().decode("utf-8")
+            parsed_body = json.loads(raw_body or "{}")
+            return True, {
+                "id_materia_prima": materia_id,
+                "id_proveedor": sugerencia.id_proveedor,
+                "cantidad_paquetes": paquetes,
+                "fecha_necesaria": sugerencia.fecha_necesaria.isoformat(),
+                "response": {
+                    "status_code": resp.getcode(),
+                    "body": parsed_body,
+                },
+            }
+    except urllib.error.HTTPError as exc:
+        logger.exception("API de compra devolvió HTTPError")
+        detalle = exc.read().decode("utf-8", errors="ignore")
+        motivo = f"HTTPError {exc.code}: {detalle or exc.reason}"
+    except urllib.error.URLError as exc:
+        logger.exception("API de compra no disponible")
+        motivo = f"URLError: {exc.reason}"
+    except Exception as exc:  # pragma: no cover
+        logger.exception("Fallo al invocar la API de compra de materia prima")
+        motivo = str(exc)
+    return False, {
+        "id_materia_prima": materia_id,
+        "cantidad_paquetes": paquetes,
+        "motivo": motivo,
     }
-    return DB_CONFIG
-
-
-def get_connection():
-    cfg = get_db_parameters()
-    return pg8000.connect(
-        host=cfg["host"],
-        port=cfg["port"],
-        database=cfg["database"],
-        user=cfg["user"],
-        password=cfg["password"],
-        ssl_context=ssl.create_default_context(),
-        timeout=10,
-    )
 
 
-def run_query(cur, sql: str, params: Iterable[Any] = None) -> List[Dict[str, Any]]:
-    cur.execute(sql, tuple(params or ()))
-    rows = cur.fetchall()
-    if not rows:
-        return []
-    columns = [desc[0] for desc in cur.description]
-    return [dict(zip(columns, row)) for row in rows]
+def tomar_turno_compras(cur) -> bool:
+    """Advisory lock de sesión: True si esta invocación es la única que compra."""
+    cur.execute("SELECT pg_try_advisory_lock(hashtext(%s))", (f"{ENV}.mrp",))
+    return bool(cur.fetchone()[0])
 
 
-def fetch_one(cur, sql: str, params: Iterable[Any] = None) -> Optional[Dict[str, Any]]:
-    cur.execute(sql, tuple(params or ()))
-    row = cur.fetchone()
-    if not row:
-        return None
-    columns = [desc[0] for desc in cur.description]
-    return dict(zip(columns, row))
+def soltar_turno_compras(cur) -> bool:
+    """Suelta el turno de compras; False si no estaba tomado por esta sesión."""
+    cur.execute("SELECT pg_advisory_unlock(hashtext(%s))", (f"{ENV}.mrp",))
+    return bool(cur.fetchone()[0])
 
 
-def get_cheapest_provider(cur, materia_id: int) -> Optional[Dict[str, Any]]:
-    sql = f"""
-        SELECT id_proveedor, precio
-        FROM {ENV}.proveedor_por_materia_prima
-        WHERE id_materia_prima = %s AND activo = TRUE
-        ORDER BY precio ASC NULLS LAST, id
-        LIMIT 1
-    """
-    rows = run_query(cur, sql, (materia_id,))
-    return rows[0] if rows else None
+def vencer_lotes(cur) -> int:
+    """Pasa a `vencido` los lotes disponibles ya vencidos y devuelve cuántos (el libro de stock registra el vencimiento)."""
+    cur.execute(f"SELECT {ENV}.vencer_lotes_materia_prima()")
+    return cur.fetchone()[0]
 
 
-def get_materia_prima_config(cur, materia_id: int) -> Optional[Dict[str, Any]]:
-    sql = f"""
-        SELECT cantidad_por_unidad_compra, unidad_medida, nombre
-        FROM {ENV}.materia_prima
-        WHERE id = %s
-    """
-    return fetch_one(cur, sql, (materia_id,))
+def plegar_totales(cur) -> int:
+    """Suma a los totales por materia prima las diferencias confirmadas del libro de stock y devuelve cuántas plegó."""
+    cur.execute(f"SELECT {ENV}.plegar_totales_materia_prima()")
+    return cur.fetchone()[0]
 
 
 def check_raw_material_availability(cur, id_orden_venta: int) -> Dict[str, Any]:
@@ -132,82 +135,47 @@ def check_raw_material_availability(cur, id_orden_venta: int) -> Dict[str, Any]:
             "consolidado_faltantes": [],
         }
 
-    product_ids = tuple(op["id_producto"] for op in ordenes_produccion)
-    receta_rows = (
-        run_query(
-            cur,
-            f"""
-            SELECT id_producto, id_materia_prima, cantidad_unitaria
-            FROM {ENV}.materia_prima_por_producto
-            WHERE id_producto IN ({', '.join(['%s'] * len(product_ids))})
-            """,
-            product_ids,
-        )
-        if product_ids
-        else []
-    )
-
-    recetas_por_producto: Dict[int, List[Dict[str, Any]]] = {}
-    for row in receta_rows:
-        recetas_por_producto.setdefault(row["id_producto"], []).append(row)
-
-    materia_ids = tuple({r["id_materia_prima"] for r in receta_rows})
+    recetas = cargar_recetas(cur, sorted({int(op["id_producto"]) for op in ordenes_produccion}))
+    materia_ids = recetas.materias()
     stock_rows = (
         run_query(
             cur,
             f"""
             SELECT id_materia_prima, cantidad_disponible
             FROM {ENV}.cantidad_disponible_materia_prima
-            WHERE id_materia_prima IN ({', '.join(['%s'] * len(materia_ids))})
+            WHERE id_materia_prima = ANY(%s::int[])
             """,
-            materia_ids,
+            (materia_ids,),
         )
         if materia_ids
         else []
     )
-    stock_disponible = {
-        row["id_materia_prima"]: Decimal(str(row["cantidad_disponible"]))
-        for row in stock_rows
-    }
+    # Centésimos enteros, como el resto de los cálculos de requerimientos (alimentapp.recetas).
+    stock_efimero = {row["id_materia_prima"]: a_centesimos(row["cantidad_disponible"]) for row in stock_rows}
 
-    stock_efimero = stock_disponible.copy()
     ordenes_suficientes: List[int] = []
-    ordenes_insuficientes: List[int] = []
-    faltantes_consolidados: Dict[int, Decimal] = {}
+    ordenes_insuficientes: List[Dict[str, Any]] = []
 
     for op in ordenes_produccion:
         # Para cada OP calculamos los requisitos por materia prima y verificamos si alcanza el stock efímero.
-        receta = recetas_por_producto.get(op["id_producto"], [])
-        requisitos: Dict[int, Decimal] = {}
-        se_puede = True
-
-        for ingrediente in receta:
-            materia_id = ingrediente["id_materia_prima"]
-            por_unidad = Decimal(str(ingrediente["cantidad_unitaria"]))
-            requerido = Decimal(str(op["cantidad"])) * por_unidad
-            requisitos[materia_id] = requerido
-            if stock_efimero.get(materia_id, Decimal("0")) < requerido:
-                se_puede = False
-
-        if se_puede:
+        requisitos = recetas.de_orden(op)
+        if all(stock_efimero.get(materia_id, 0) >= requerido for materia_id, requerido in requisitos):
             # Como alcanza, marcamos la OP como suficiente y descontamos del stock efímero.
             ordenes_suficientes.append(op["id"])
-            for materia_id, requerido in requisitos.items():
-                stock_efimero[materia_id] = stock_efimero.get(materia_id, Decimal("0")) - requerido
+            for materia_id, requerido in requisitos:
+                stock_efimero[materia_id] = stock_efimero.get(materia_id, 0) - requerido
         else:
-            # No alcanza: registramos faltantes para luego generar pedidos.
-            ordenes_insuficientes.append(op["id"])
-            for materia_id, requerido in requisitos.items():
-                faltantes_consolidados[materia_id] = faltantes_consolidados.get(materia_id, Decimal("0")) + requerido
+            # No alcanza: sus requisitos completos van a los faltantes.
+            ordenes_insuficientes.append(op)
 
     lista_faltantes = [
-        {"id_materia_prima": materia_id, "cantidad_necesaria": str(total)}
-        for materia_id, total in faltantes_consolidados.items()
+        {"id_materia_prima": materia_id, "cantidad_necesaria": str(desde_centesimos(total))}
+        for materia_id, total in recetas.requerimiento(ordenes_insuficientes).items()
     ]
 
     return {
         "ordenes_con_stock_suficiente": ordenes_suficientes,
-        "ordenes_con_stock_insuficiente": ordenes_insuficientes,
+        "ordenes_con_stock_insuficiente": [op["id"] for op in ordenes_insuficientes],
         "consolidado_faltantes": lista_faltantes,
     }
 
@@ -216,23 +184,37 @@ def lambda_handler(event, context):
     logger.info("Iniciando gestión de materia prima para el evento: %s", json.dumps(event))
 
     id_orden_venta = event.get("id_orden_venta")
-    if not id_orden_venta:
-        logger.error("El evento no contiene 'id_orden_venta'.")
-        return {
-            "statusCode": 400,
-            "body": json.dumps({"error": "Falta 'id_orden_venta' en el evento."}),
-        }
+    # Con "comprar": false sólo devuelve las sugerencias del MRP.
+    comprar = event.get("comprar", True) is not False
 
     conn = None
+    # Si no se pudo soltar el turno de compras, la conexión no vuelve al pool.
+    descartar = False
     try:
         conn = get_connection()
         cur = conn.cursor()
 
-        resultado_verificacion = check_raw_material_availability(cur, id_orden_venta)
+        # Barrido del libro en su propia transacción corta: las lecturas de stock ya descuentan
+        # los vencidos por fecha y suman las diferencias sin plegar; esto sólo los deja registrados.
+        lotes_vencidos = vencer_lotes(cur)
+        diferencias_plegadas = plegar_totales(cur)
+        conn.commit()
+
+        resultado_verificacion = (
+            check_raw_material_availability(cur, id_orden_venta)
+            if id_orden_venta
+            else {
+                "ordenes_con_stock_suficiente": [],
+                "ordenes_con_stock_insuficiente": [],
+                "consolidado_faltantes": [],
+            }
+        )
         logger.info(
             "Resultado de la verificación de stock: %s",
             json.dumps(resultado_verificacion, default=str),
         )
+        # Sin transacción abierta mientras se invoca la asignación.
+        conn.rollback()
 
         ids_suficientes = resultado_verificacion.get("ordenes_con_stock_suficiente", [])
         asignacion_materia: Optional[Dict[str, Any]] = None
@@ -240,7 +222,7 @@ def lambda_handler(event, context):
             try:
                 # Invocamos la lambda de asignación automática para las OP que ya tienen stock.
                 payload = json.dumps({"ordenes_produccion": ids_suficientes}).encode("utf-8")
-                response = lambda_client.invoke(
+                response = get_client("lambda").invoke(
                     FunctionName=LAMBDA_ASIGNAR_MP,
                     InvocationType="RequestResponse",
                     Payload=payload,
@@ -262,108 +244,59 @@ def lambda_handler(event, context):
         pedidos_fallidos: List[Dict[str, Any]] = []
         fecha_actual = datetime.now(timezone.utc)
 
-        for faltante in resultado_verificacion.get("consolidado_faltantes", []):
-            materia_id = int(faltante["id_materia_prima"])
-            cantidad_necesaria = Decimal(str(faltante["cantidad_necesaria"]))
-
-            # Obtenemos configuración del insumo para convertir unidades a paquetes de compra.
-            materia_info = get_materia_prima_config(cur, materia_id)
-            if not materia_info:
-                pedidos_fallidos.append(
-                    {
-                        "id_materia_prima": materia_id,
-                        "motivo": "Materia prima inexistente",
-                    }
-                )
-                continue
-
-            cantidad_por_unidad = Decimal(str(materia_info["cantidad_por_unidad_compra"] or 0))
-            if cantidad_por_unidad <= 0:
-                pedidos_fallidos.append(
-                    {
-                        "id_materia_prima": materia_id,
-                        "motivo": "cantidad_por_unidad_compra no configurada",
-                    }
-                )
-                continue
-
-            paquetes = math.ceil(float(cantidad_necesaria / cantidad_por_unidad))
-            if paquetes <= 0:
-                continue
-
-            proveedor = get_cheapest_provider(cur, materia_id)
-            if not proveedor:
-                pedidos_fallidos.append(
-                    {
-                        "id_materia_prima": materia_id,
-                        "cantidad_paquetes": paquetes,
-                        "motivo": "Sin proveedor activo",
-                    }
-                )
-                continue
-
-            try:
-                logger.info(
-                    "Generando pedido via API: materia_prima=%s paquetes=%s proveedor=%s",
-                    materia_id,
-                    paquetes,
-                    proveedor["id_proveedor"],
-                )
-                request_payload = json.dumps(
+        # Una corrida que compra a la vez, desde el MRP hasta que vuelve la última compra:
+        # la siguiente ve los pedidos que generó esta. Con "comprar": false no hace falta.
+        # Si otra corrida está comprando no se espera: sus pedidos quedan a la vista de la próxima.
+        if comprar and not tomar_turno_compras(cur):
+            conn.rollback()
+            logger.info("Otra corrida está comprando; se omiten MRP y compras.")
+            return {
+                "statusCode": 202,
+                "body": json.dumps(
                     {
-                        "id_materia_prima": materia_id,
-                        "id_proveedor": proveedor["id_proveedor"],
-                        "cantidad_total": paquetes,
-                    }
-                ).encode("utf-8")
-                req = urllib.request.Request(
-                    API_GENERAR_COMPRA_MP,
-                    data=request_payload,
-                    method="POST",
-                    headers={"Content-Type": "application/json"},
-                )
-                with urllib.request.urlopen(req) as resp:
-                    raw_body = resp.read().decode("utf-8")
-                    parsed_body = json.loads(raw_body or "{}")
-                    pedidos_generados.append(
+                        "message": "Compras en curso en otra corrida.",
+                        "ocupado": True,
+                        "timestamp": fecha_actual.isoformat(),
+                        "lotes_vencidos": lotes_vencidos,
+                        "diferencias_plegadas": diferencias_plegadas,
+                        "verificacion_stock": resultado_verificacion,
+                        "asignacion_materia": asignacion_materia,
+                    },
+                    default=str,
+                ),
+            }
+        try:
+            mrp = calcular_mrp(cargar_entradas_mrp(cur))
+            # El lock es de sesión: las llamadas a la API de compra corren sin transacción abierta.
+            conn.commit()
+
+            # Se compra lo que ya hay que pedir; las sugerencias posteriores quedan para próximas corridas.
+            for sugerencia in mrp.sugerencias:
+                if sugerencia.fecha_pedido > mrp.base:
+                    break
+                if sugerencia.motivo:
+                    pedidos_fallidos.append(
                         {
-                            "id_materia_prima": materia_id,
-                            "id_proveedor": proveedor["id_proveedor"],
-                            "cantidad_paquetes": paquetes,
-                            "response": {
-                                "status_code": resp.getcode(),
-                                "body": parsed_body,
-                            },
+                            "id_materia_prima": sugerencia.id_materia_prima,
+                            "cantidad_paquetes": sugerencia.paquetes,
+                            "motivo": sugerencia.motivo,
                         }
                     )
-            except urllib.error.HTTPError as exc:
-                logger.exception("API de compra devolvió HTTPError")
-                detalle = exc.read().decode("utf-8", errors="ignore")
-                pedidos_fallidos.append(
-                    {
-                        "id_materia_prima": materia_id,
-                        "cantidad_paquetes": paquetes,
-                        "motivo": f"HTTPError {exc.code}: {detalle or exc.reason}",
-                    }
-                )
-            except urllib.error.URLError as exc:
-                logger.exception("API de compra no disponible")
-                pedidos_fallidos.append(
-                    {
-                        "id_materia_prima": materia_id,
-                        "cantidad_paquetes": paquetes,
-                        "motivo": f"URLError: {exc.reason}",
-                    }
-                )
-            except Exception as exc:  # pragma: no cover
-                logger.exception("Fallo al invocar la API de compra de materia prima")
-                pedidos_fallidos.append(
-                    {
-                        "id_materia_prima": materia_id,
-                        "cantidad_paquetes": paquetes,
-                        "motivo": str(exc),
-                    }
-                )
+                    continue
+                if not comprar:
+                    continue
+                ok, pedido = generar_compra(sugerencia)
+                (pedidos_generados if ok else pedidos_fallidos).append(pedido)
+        finally:
+            if comprar:
+                try:
+                    conn.rollback()
+                    descartar = not soltar_turno_compras(cur)
+                    conn.commit()
+                except Exception:
+                    descartar = True
+                if descartar:
+                    logger.error("No se pudo soltar el turno de compras; se descarta la conexión.")
 
         return {
             "statusCode": 200,
@@ -371,8 +304,11 @@ def lambda_handler(event, context):
                 {
                     "message": "Verificación de materia prima completada.",
                     "timestamp": fecha_actual.isoformat(),
+                    "lotes_vencidos": lotes_vencidos,
+                    "diferencias_plegadas": diferencias_plegadas,
                     "verificacion_stock": resultado_verificacion,
                     "asignacion_materia": asignacion_materia,
+                    "mrp": mrp.resumen(),
                     "pedidos_generados": pedidos_generados,
                     "pedidos_fallidos": pedidos_fallidos,
                 },
@@ -387,5 +323,5 @@ def lambda_handler(event, context):
         }
     finally:
         if conn:
-            conn.close()
+            release_connection(conn, descartar=descartar)
             logger.info("Conexión a la base de datos cerrada.")
@@ -1,87 +1,46 @@
 import json
 import logging
 import os
-import ssl
 import random
 from datetime import date, timedelta, datetime
 
-from typing import Any, Dict, List
+from typing import List
 
-import boto3
-import pg8000
+from alimentapp.aws import get_client
+from alimentapp.db import get_connection, release_connection
+from alimentapp.sentencias import RegistroSentencias
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-ENV = os.getenv("DB_SCHEMA", "dev")
-ssm_client = boto3.client("ssm")
-lambda_client = boto3.client("lambda")
-
-DB_CONFIG = None  # cache SSM
 LAMBDA_ASIGNAR_MP = os.getenv(
     "LAMBDA_POST_ASIGNAR_MATERIA_PRIMA",
     "asignacion-lote-materia-prima-orden-produccion",
 )
 
-class ValidationError(Exception):
-    """Error de validación para orden de venta."""
-
-
-def get_db_parameters() -> Dict[str, Any]:
-    """Lee parámetros de RDS desde SSM (cacheado)."""
-    global DB_CONFIG
-    if DB_CONFIG:
-        return DB_CONFIG
-
-    param_names = [
-        "/alimentapp/db/host",
-        "/alimentapp/db/password",
-        "/alimentapp/db/port",
-        "/alimentapp/db/username",
-    ]
-    resp = ssm_client.get_parameters(Names=param_names, WithDecryption=True)
-    if len(resp["Parameters"]) != len(param_names):
-        missing = set(param_names) - {p["Name"] for p in resp["Parameters"]}
-        raise RuntimeError(f"Parámetros faltantes en SSM: {', '.join(missing)}")
-
-    data = {p["Name"].split("/")[-1]: p["Value"] for p in resp["Parameters"]}
-    DB_CONFIG = {
-        "host": data["host"],
-        "port": int(data.get("port", "5432")),
-        "user": data["username"],
-        "password": data["password"],
-        "database": os.getenv("DB_NAME", "postgres"),
-    }
-    return DB_CONFIG
-
-
-def get_connection():
-    """Abre conexión pg8000 + SSL con credenciales de SSM."""
-    cfg = get_db_parameters()
-    return pg8000.connect(
-        host=cfg["host"],
-        port=cfg["port"],
-        database=cfg["database"],
-        user=cfg["user"],
-        password=cfg["password"],
-        ssl_context=ssl.create_default_context(),
-        timeout=10,
-    )
-
 
-def run_query(cur, sql: str):
-    """SELECT; devuelve filas como dicts."""
-    cur.execute(sql)
-    rows = cur.fetchall()
-    if not rows:
-        return []
-    columns = [desc[0] for desc in cur.description]
-    return [dict(zip(columns, row)) for row in rows]
+SQL = RegistroSentencias({
+    "lotes_pedido_generado": """
+        SELECT lm.id, lm.id_materia_prima, mp.expirabile
+        FROM {ENV}.lote_materia_prima lm
+        JOIN {ENV}.materia_prima mp ON mp.id = lm.id_materia_prima
+        WHERE lm.estado = 'pedido_generado'
+    """,
+    "existe_codigo_lote": "SELECT 1 FROM {ENV}.lote_materia_prima WHERE codigo_lote = :codigo_lote LIMIT 1",
+    "aceptar_lote": """
+        UPDATE {ENV}.lote_materia_prima
+        SET
+            codigo_lote = :codigo_lote,
+            fecha_ingreso = :fecha_ingreso,
+            fecha_vencimiento = :fecha_vencimiento,
+            estado = :estado
+        WHERE id = :id_lote
+    """,
+})
 
 
-def run_command(cur, sql: str):
-    """INSERT/UPDATE/DELETE; no retorna filas."""
-    cur.execute(sql)
+class ValidationError(Exception):
+    """Error de validación para orden de venta."""
 
 
 def generar_numero_lote() -> str:
@@ -121,16 +80,9 @@ def lambda_handler(event, context):
     conn = None
     try:
         conn = get_connection()
-        cur = conn.cursor()
 
         # 🔹 1. Obtener los lotes en estado 'en_espera' junto con el id_materia_prima
-        sql_select = f"""
-            SELECT lm.id, lm.id_materia_prima, mp.expirabile
-            FROM {ENV}.lote_materia_prima lm
-            JOIN {ENV}.materia_prima mp ON mp.id = lm.id_materia_prima
-            WHERE lm.estado = 'pedido_generado';
-        """
-        lotes = run_query(cur, sql_select)
+        lotes = SQL.fetch_all(conn, "lotes_pedido_generado")
 
         if not lotes:
             logger.info("No hay lotes en espera.")
@@ -152,26 +104,24 @@ def lambda_handler(event, context):
             # --- generar código de lote único ---
             while True:
                 codigo_lote = generar_numero_lote()
-                check_sql = f"SELECT 1 FROM {ENV}.lote_materia_prima WHERE codigo_lote = '{codigo_lote}' LIMIT 1;"
-                existe = run_query(cur, check_sql)
+                existe = SQL.fetch_all(conn, "existe_codigo_lote", codigo_lote=codigo_lote)
                 if not existe:
                     break  # único, continuar generando lote
 
             # --- generar fecha si corresponde ---
-            fecha_vencimiento = f"'{generar_fecha_vencimiento()}'" if es_expirable else "NULL"
+            fecha_vencimiento = generar_fecha_vencimiento() if es_expirable else None
 
             estado_nuevo = "disponible"
 
-            sql_update = f"""
-                UPDATE {ENV}.lote_materia_prima
-                SET
-                    codigo_lote = '{codigo_lote}',
-                    fecha_ingreso = '{fecha_ingreso}',
-                    fecha_vencimiento = {fecha_vencimiento},
-                    estado = '{estado_nuevo}'
-                WHERE id = {id_lote};
-            """
-            run_command(cur, sql_update)
+            SQL.run_command(
+                conn,
+                "aceptar_lote",
+                codigo_lote=codigo_lote,
+                fecha_ingreso=fecha_ingreso,
+                fecha_vencimiento=fecha_vencimiento,
+                estado=estado_nuevo,
+                id_lote=id_lote,
+            )
             lista_ids_materia_prima_aceptadas.append(id_lote)
 
         conn.commit()
@@ -180,7 +130,7 @@ def lambda_handler(event, context):
         asignacion_resultado = None
         try:
             payload_asignacion = json.dumps({"lotes": lista_ids_materia_prima_aceptadas}).encode("utf-8")
-            response = lambda_client.invoke(
+            response = get_client("lambda").invoke(
                 FunctionName=LAMBDA_ASIGNAR_MP,
                 InvocationType="Event",
                 Payload=payload_asignacion,
@@ -217,4 +167,4 @@ def lambda_handler(event, context):
         }
     finally:
         if conn:
-            conn.close()
+            release_connection(conn)
@@ -1,81 +1,18 @@
 import json
 import logging
-import os
-import ssl
 import random
-from typing import Any, Dict, List
+from typing import List
 
-import boto3
-import pg8000
+from alimentapp.db import ENV, get_connection, release_connection, run_query
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-ENV = os.getenv("DB_SCHEMA", "dev")
-ssm_client = boto3.client("ssm")
-
-DB_CONFIG = None  # cache SSM
 
 class ValidationError(Exception):
     """Error de validación."""
 
 
-def get_db_parameters() -> Dict[str, Any]:
-    """Lee parámetros de RDS desde SSM (cacheado)."""
-    global DB_CONFIG
-    if DB_CONFIG:
-        return DB_CONFIG
-
-    param_names = [
-        "/alimentapp/db/host",
-        "/alimentapp/db/password",
-        "/alimentapp/db/port",
-        "/alimentapp/db/username",
-    ]
-    resp = ssm_client.get_parameters(Names=param_names, WithDecryption=True)
-    if len(resp["Parameters"]) != len(param_names):
-        missing = set(param_names) - {p["Name"] for p in resp["Parameters"]}
-        raise RuntimeError(f"Parámetros faltantes en SSM: {', '.join(missing)}")
-
-    data = {p["Name"].split("/")[-1]: p["Value"] for p in resp["Parameters"]}
-    DB_CONFIG = {
-        "host": data["host"],
-        "port": int(data.get("port", "5432")),
-        "user": data["username"],
-        "password": data["password"],
-        "database": os.getenv("DB_NAME", "postgres"),
-    }
-    return DB_CONFIG
-
-
-def get_connection():
-    """Abre conexión pg8000 + SSL."""
-    cfg = get_db_parameters()
-    return pg8000.connect(
-        host=cfg["host"],
-        port=cfg["port"],
-        database=cfg["database"],
-        user=cfg["user"],
-        password=cfg["password"],
-        ssl_context=ssl.create_default_context(),
-        timeout=10,
-    )
-
-
-def run_query(cur, sql: str):
-    """SELECT; devuelve filas como dicts."""
-    cur.execute(sql)
-    rows = cur.fetchall()
-    if not rows:
-        return []
-    columns = [desc[0] for desc in cur.description]
-    return [dict(zip(columns, row)) for row in rows]
-
-
-def run_command(cur, sql: str):
-    """INSERT/UPDATE/DELETE; no retorna filas."""
-    cur.execute(sql)
-
 def lambda_handler(event, context):
     logger.info("Evento recibido: %s", event)
 
@@ -128,4 +65,4 @@ def lambda_handler(event, context):
         }
     finally:
         if conn:
-            conn.close()
\ No newline at end of file
+            release_connection(conn)
\ No newline at end of file
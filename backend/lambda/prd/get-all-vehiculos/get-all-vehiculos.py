@@ -1,25 +1,17 @@
 import json
 import logging
-import os
-import ssl
-from typing import Any, Dict, Optional, List
+from typing import Any, Dict, List
 
-import boto3
-import pg8000
+from alimentapp.db import ENV, get_connection, release_connection, run_query
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-ENV = os.getenv("DB_SCHEMA", "dev")
-ssm_client = boto3.client("ssm")
-
-DB_CONFIG: Optional[Dict[str, Any]] = None
-SSL_CONTEXT = ssl.create_default_context()
-
-
 # --------------------------
 # ERRORES
 # --------------------------
+
+
 class ValidationError(Exception):
     pass
 
@@ -27,59 +19,6 @@ class ValidationError(Exception):
 # --------------------------
 # CONEXIÓN A BD
 # --------------------------
-def get_db_parameters() -> Dict[str, Any]:
-    global DB_CONFIG
-    if DB_CONFIG:
-        return DB_CONFIG
-
-    names = [
-        "/alimentapp/db/host",
-        "/alimentapp/db/password",
-        "/alimentapp/db/port",
-        "/alimentapp/db/username",
-    ]
-
-    resp = ssm_client.get_parameters(Names=names, WithDecryption=True)
-
-    if len(resp["Parameters"]) != len(names):
-        missing = set(names) - {p["Name"] for p in resp["Parameters"]}
-        raise RuntimeError(f"Faltan parámetros en SSM: {', '.join(missing)}")
-
-    data = {p["Name"].split("/")[-1]: p["Value"] for p in resp["Parameters"]}
-
-    DB_CONFIG = {
-        "host": data["host"],
-        "port": int(data["port"]),
-        "user": data["username"],
-        "password": data["password"],
-        "database": os.getenv("DB_NAME", "postgres")
-    }
-
-    return DB_CONFIG
-
-
-def get_connection():
-    cfg = get_db_parameters()
-    return pg8000.connect(
-        host=cfg["host"],
-        port=cfg["port"],
-        database=cfg["database"],
-        user=cfg["user"],
-        password=cfg["password"],
-        ssl_context=SSL_CONTEXT,
-        timeout=10,
-    )
-
-
-def run_query(cur, sql: str, params: tuple = None) -> List[Dict[str, Any]]:
-    cur.execute(sql, params or ())
-    rows = cur.fetchall()
-
-    if not rows:
-        return []
-
-    columns = [c[0] for c in cur.description]
-    return [dict(zip(columns, r)) for r in rows]
 
 
 # --------------------------
@@ -144,4 +83,4 @@ def lambda_handler(event, context):
         }
     finally:
         if conn:
-            conn.close()
+            release_connection(conn)
@@ -6,78 +6,32 @@ Recomendado para <= 200 pedidos. Si recibís más, la función lanzará excepci
 para evitar sobrecarga en Lambda; en ese caso usar chunking o un servicio más potente.
 """
 
-import os
 import json
-import ssl
 import math
 import logging
 from datetime import datetime, timezone
 from typing import List, Dict, Any, Tuple, Optional
-import boto3
-import pg8000
+
+from alimentapp.db import ENV, get_connection, release_connection, run_query
+from alimentapp.instrumentacion import instrumentar
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
-ENV = os.getenv("DB_SCHEMA", "dev")
 # Parámetros: punto base (UNGS)
 BASE_LAT = -34.521679
 BASE_LON = -58.701164
 
 # SSM client y cache
-ssm_client = boto3.client("ssm")
-DB_CONFIG: Optional[Dict[str, Any]] = None
 
 # Límites prácticos
 MAX_ORDERS_LAMBDA = 200
 MAX_PAM_ITERS = 5  # número de iteraciones de mejora en PAM (swap)
 MAX_DISTANCE_MATRIX = 40000  # por seguridad (n^2 ~ 40k dist ~ 200 pedidos)
 
+
 class ValidationError(Exception):
     pass
 
-def get_db_parameters() -> Dict[str, Any]:
-    global DB_CONFIG
-    if DB_CONFIG:
-        return DB_CONFIG
-    param_names = [
-        "/alimentapp/db/host",
-        "/alimentapp/db/password",
-        "/alimentapp/db/port",
-        "/alimentapp/db/username",
-    ]
-    resp = ssm_client.get_parameters(Names=param_names, WithDecryption=True)
-    if len(resp.get("Parameters", [])) != len(param_names):
-        missing = set(param_names) - {p["Name"] for p in resp.get("Parameters", [])}
-        raise RuntimeError(f"Parámetros faltantes en SSM: {', '.join(missing)}")
-    data = {p["Name"].split("/")[-1]: p["Value"] for p in resp["Parameters"]}
-    DB_CONFIG = {
-        "host": data["host"],
-        "port": int(data.get("port", "5432")),
-        "user": data["username"],
-        "password": data["password"],
-        "database": os.getenv("DB_NAME", "postgres"),
-    }
-    return DB_CONFIG
-
-def get_connection():
-    cfg = get_db_parameters()
-    return pg8000.connect(
-        host=cfg["host"],
-        port=cfg["port"],
-        database=cfg["database"],
-        user=cfg["user"],
-        password=cfg["password"],
-        ssl_context=ssl.create_default_context(),
-        timeout=10
-    )
-
-def run_query(cur, sql: str, params: Optional[List[Any]] = None) -> List[Dict[str, Any]]:
-    cur.execute(sql, params or [])
-    if cur.description is None:
-        return []
-    rows = cur.fetchall()
-    cols = [d[0] for d in cur.description]
-    return [dict(zip(cols, r)) for r in rows]
 
 # ---------- geom helpers ----------
 def haversine_km(lat1, lon1, lat2, lon2) -> float:
@@ -483,6 +437,8 @@ def fetch_peso_unitario(cur, product_id) -> float:
     return float(rows[0]["peso_unitario_kg"])
 
 # ---------- LAMBDA HANDLER ----------
+# Órdenes candidatas, vehículos, detalle de pedidos y productos asignados.
+@instrumentar(presupuesto=4)
 def lambda_handler(event, context):
     logger.info("Evento recibido")
     cors = {
@@ -546,4 +502,4 @@ def lambda_handler(event, context):
         except:
             pass
         if conn:
-            conn.close()
+            release_connection(conn)
@@ -3,93 +3,50 @@
 import json
 import logging
 import os
-import ssl
-from datetime import datetime, timezone, timedelta
-from decimal import Decimal, InvalidOperation
-from typing import Any, Dict, Iterable, List, Optional, Tuple
-
-import boto3
-import pg8000
+from datetime import date, datetime, time, timezone, timedelta
+try:
+    from zoneinfo import ZoneInfo  # Python 3.9+
+except ImportError:  # pragma: no cover
+    ZoneInfo = None  # Fallback a offset fijo si no está disponible
+from decimal import Decimal
+from fractions import Fraction
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from alimentapp.agenda import (
+    EntradasPlan,
+    PlanningError,
+    agenda_desde_tandas,
+    calcular_plan_diario,
+    cargar_entradas as cargar_entradas_agenda,
+    decimal_value,
+    fecha_base,
+    guardar_planificacion,
+    subir_version_agenda,
+)
+from alimentapp.aws import get_client
+from alimentapp.db import ENV, fetch_all, get_connection, release_connection
+from alimentapp.cantidades import a_centesimos
+from alimentapp.optimizacion import optimizar_plan
+from alimentapp.planificacion import Plan, Tanda, dias_habiles
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-ENV = os.getenv("DB_SCHEMA", "dev")
-ssm_client = boto3.client("ssm")
-DB_CONFIG: Optional[Dict[str, Any]] = None
-
-ESTADOS_TANDA_FIRMES = ("en_progreso", "completada")
-# Capacidad diaria = capacidad_linea * CAPACIDAD_DIARIA_FACTOR (para previews por días)
-CAPACIDAD_DIARIA_FACTOR = int(os.getenv("CAPACIDAD_DIARIA_FACTOR", "1"))
-
-
-class PlanningError(Exception):
-    """Errores funcionales durante la planificación de tandas."""
-
-
-def get_db_parameters() -> Dict[str, Any]:
-    """Lee credenciales de RDS desde SSM y las cachea en memoria."""
-    # Obtiene y cachea la configuración de la base.
-    global DB_CONFIG
-    if DB_CONFIG:
-        return DB_CONFIG
-
-    names = [
-        "/alimentapp/db/host",
-        "/alimentapp/db/password",
-        "/alimentapp/db/port",
-        "/alimentapp/db/username",
-    ]
-    resp = ssm_client.get_parameters(Names=names, WithDecryption=True)
-    if len(resp["Parameters"]) != len(names):
-        missing = set(names) - {p["Name"] for p in resp["Parameters"]}
-        raise RuntimeError(f"Faltan parametros en SSM: {', '.join(sorted(missing))}")
-    data = {p["Name"].split("/")[-1]: p["Value"] for p in resp["Parameters"]}
-    DB_CONFIG = {
-        "host": data["host"],
-        "port": int(data.get("port", "5432")),
-        "user": data["username"],
-        "password": data["password"],
-        "database": os.getenv("DB_NAME", "postgres"),
-    }
-    return DB_CONFIG
-
-
-def get_connection():
-    """Crea una conexión pg8000 con SSL hacia RDS."""
-    # Abre una conexión reutilizable para la transacción.
-    cfg = get_db_parameters()
-    return pg8000.connect(
-        host=cfg["host"],
-        port=cfg["port"],
-        database=cfg["database"],
-        user=cfg["user"],
-        password=cfg["password"],
-        ssl_context=ssl.create_default_context(),
-        timeout=10,
-    )
-
+# Modo por defecto: 1 = reconciliar contra el plan anterior, 0 = borrar todo y reinsertar.
+PLANIFICACION_INCREMENTAL = os.getenv("PLANIFICACION_INCREMENTAL", "1") != "0"
+MODOS_PLANIFICACION = ("incremental", "completo")
+# Búsqueda local sobre el plan greedy (alimentapp.optimizacion): 1 = siempre, 0 = sólo si el evento la pide.
+PLANIFICACION_OPTIMIZAR = os.getenv("PLANIFICACION_OPTIMIZAR", "0") != "0"
+OPTIMIZACION_SEGUNDOS = float(os.getenv("OPTIMIZACION_SEGUNDOS", "5"))
+# Tiempo que se deja para cargar, persistir y responder antes del timeout de la Lambda.
+OPTIMIZACION_RESERVA_SEGUNDOS = float(os.getenv("OPTIMIZACION_RESERVA_SEGUNDOS", "10"))
+# Jornada sobre la que se reparte la capacidad diaria para fecha_inicio/fin_planificada.
+JORNADA_INICIO_HORA = int(os.getenv("JORNADA_INICIO_HORA", "8"))
+JORNADA_HORAS = Decimal(os.getenv("JORNADA_HORAS", "8"))
+# Disparos que llegan durante una corrida se atienden en una ronda más de esa corrida, hasta este tope.
+PLANIFICADOR_MAX_RONDAS = int(os.getenv("PLANIFICADOR_MAX_RONDAS", "5"))
 
-def fetch_all(cur, sql: str, params: Iterable[Any] = None) -> List[Dict[str, Any]]:
-    """Ejecuta un SELECT y devuelve filas como diccionarios."""
-    # Ejecuta la consulta y transforma el resultado en lista de dicts.
-    cur.execute(sql, tuple(params or ()))
-    rows = cur.fetchall()
-    columns = [c[0] for c in cur.description]
-    return [dict(zip(columns, row)) for row in rows]
-
-
-def decimal_value(value: Any, contexto: Optional[str] = None, default: Optional[str] = None) -> Decimal:
-    """Normaliza cualquier valor numérico a Decimal."""
-    # Convierte valores numéricos a Decimal para cálculos consistentes.
-    if value is None or (isinstance(value, str) and not value.strip()):
-        if default is not None:
-            return Decimal(default)
-        raise PlanningError(f"{contexto or 'Valor numérico'} ausente")
-    try:
-        return Decimal(str(value))
-    except (InvalidOperation, ValueError, TypeError):
-        raise PlanningError(f"{contexto or 'Valor numérico'} inválido: {value}")
+Horario = Tuple[Optional[datetime], Optional[datetime]]
 
 
 def limpiar_tandas_planificadas(cur) -> int:
@@ -101,280 +58,270 @@ def limpiar_tandas_planificadas(cur) -> int:
     return cur.rowcount
 
 
-def obtener_lineas_activas(cur) -> Dict[int, Dict[str, Any]]:
-    """Recupera líneas activas junto a su capacidad máxima en kg."""
-    # Obtiene líneas habilitadas y su capacidad declarada.
+def obtener_tandas_planificadas(cur) -> List[Dict[str, Any]]:
+    """Recupera el plan anterior: tandas `planificada` ordenadas por línea y secuencia."""
     sql = f"""
-        SELECT id, nombre, capacidad_maxima_kg
-        FROM {ENV}.linea_produccion
-        WHERE activa = TRUE
-    """
-    lineas = fetch_all(cur, sql)
-    if not lineas:
-        raise PlanningError("No hay lineas de produccion activas para planificar.")
-    return {
-        int(linea["id"]): {
-            "nombre": linea["nombre"],
-            "capacidad": decimal_value(
-                linea["capacidad_maxima_kg"],
-                contexto=f"capacidad de la linea {linea['nombre']}",
-            ),
-        }
-        for linea in lineas
-    }
-
-
-def obtener_secuencias_existentes(cur) -> Dict[int, int]:
-    """Devuelve la última secuencia usada por línea para mantener continuidad."""
-    # Calcula el máximo de secuencia entre tandas firmes por línea.
-    sql = f"""
-        SELECT linea_produccion_id, COALESCE(MAX(secuencia_en_linea), 0) AS max_sec
+        SELECT id, orden_produccion_id, linea_produccion_id, cantidad_kg, secuencia_en_linea,
+               fecha_inicio_planificada, fecha_fin_planificada
         FROM {ENV}.tanda_produccion
-        WHERE estado = ANY(%s)
-        GROUP BY linea_produccion_id
+        WHERE estado = 'planificada'
+        ORDER BY linea_produccion_id, secuencia_en_linea, id
     """
-    rows = fetch_all(cur, sql, (list(ESTADOS_TANDA_FIRMES),))
-    return {int(row["linea_produccion_id"]): int(row["max_sec"]) for row in rows}
-
-
-def obtener_compatibilidades(cur) -> Dict[int, List[int]]:
-    """Construye un mapa producto -> líneas compatibles."""
-    # Lee relaciones producto-línea para filtrar tandas válidas.
-    sql = f"""
-        SELECT id_producto, id_linea_produccion
-        FROM {ENV}.producto_por_linea_produccion
-    """
-    rows = fetch_all(cur, sql)
-    compat: Dict[int, List[int]] = {}
-    for row in rows:
-        producto_id = int(row["id_producto"])
-        linea_id = int(row["id_linea_produccion"])
-        compat.setdefault(producto_id, []).append(linea_id)
-    return compat
-
-
-def obtener_ordenes_pendientes(cur) -> List[Dict[str, Any]]:
-    """Calcula kilos pendientes por orden `lista_para_produccion`."""
-    # Consolida OP activas restando kilos ya cubiertos por tandas firmes.
-    sql = f"""
-        SELECT
-            op.id,
-            op.id_producto,
-            op.cantidad,
-            op.fecha_creacion,
-            ov.fecha_entrega_solicitada,
-            p.peso_unitario_kg,
-            COALESCE(SUM(tp.cantidad_kg), 0) AS kg_firmes
-        FROM {ENV}.orden_produccion op
-        JOIN {ENV}.producto p ON p.id = op.id_producto
-        LEFT JOIN {ENV}.orden_venta ov ON ov.id = op.id_orden_venta
-        LEFT JOIN {ENV}.tanda_produccion tp
-            ON tp.orden_produccion_id = op.id
-           AND tp.estado = ANY(%s)
-        WHERE op.estado = 'lista_para_produccion'
-        GROUP BY op.id, op.id_producto, op.cantidad, op.fecha_creacion,
-                 ov.fecha_entrega_solicitada, p.peso_unitario_kg
-    """
-    rows = fetch_all(cur, sql, (list(ESTADOS_TANDA_FIRMES),))
-    ordenes: List[Dict[str, Any]] = []
-    for row in rows:
-        cantidad = decimal_value(row["cantidad"], contexto=f"cantidad de la orden {row['id']}")
-        peso_unitario = decimal_value(
-            row["peso_unitario_kg"],
-            contexto=f"peso unitario del producto {row['id_producto']}",
-        )
-        kg_total = cantidad * peso_unitario
-        kg_firmes = decimal_value(
-            row["kg_firmes"],
-            contexto=f"consumo confirmado de la orden {row['id']}",
-            default="0",
-        )
-        kg_pendientes = kg_total - kg_firmes
-        if kg_pendientes <= Decimal("0.0001"):
-            continue
-        ordenes.append(
-            {
-                "id": int(row["id"]),
-                "id_producto": int(row["id_producto"]),
-                "kg_pendientes": kg_pendientes,
-                "fecha_creacion": row["fecha_creacion"],
-                "fecha_entrega_solicitada": row["fecha_entrega_solicitada"],
-            }
-        )
-    return ordenes
-
-
-def ordenar_ordenes(ordenes: List[Dict[str, Any]]) -> None:
-    """Ordena las órdenes por fecha solicitada y antigüedad."""
-    # Prioriza por due date (EDD) y luego por creación/ID.
-    def key_fn(item: Dict[str, Any]) -> Tuple[Any, Any, int]:
-        due = item["fecha_entrega_solicitada"]
-        due_key = due if isinstance(due, datetime) else datetime.max.replace(tzinfo=timezone.utc)
-        return (
-            due_key,
-            item["fecha_creacion"],
-            item["id"],
-        )
+    return fetch_all(cur, sql)
 
-    ordenes.sort(key=key_fn)
 
-
-def seleccionar_linea(lineas_compatibles: List[int], disponibilidad: Dict[int, Dict[str, Any]]) -> Optional[int]:
-    """Elige la línea compatible con capacidad diaria disponible y menor carga."""
-    # Filtra solo líneas que tienen capacidad diaria restante.
-    candidatas = [
-        linea
-        for linea in lineas_compatibles
-        if linea in disponibilidad
-        and disponibilidad[linea]["carga_planificada"] < disponibilidad[linea]["capacidad_diaria"]
-    ]
-    if not candidatas:
-        return None
-
-    # Ordena por la línea más libre (menor secuencia y carga ya planificada).
-    candidatas.sort(
-        key=lambda linea: (
-            disponibilidad[linea]["sec"],
-            disponibilidad[linea]["carga_planificada"],
-            linea,
-        )
-    )
-    return candidatas[0]
-
-
-def insertar_tanda(
-    cur,
-    orden_id: int,
-    linea_id: int,
-    kg: Decimal,
-    secuencia: int,
-) -> None:
-    """Inserta una tanda planificada para una orden y línea dadas."""
-    # Persiste la tanda en estado planificado con su secuencia.
+def insertar_tandas(cur, tandas: Sequence[Tanda], horarios: Sequence[Horario]) -> List[int]:
+    """Inserta las tandas (con su horario planificado) en una sola sentencia y devuelve sus ids en el mismo orden."""
+    # Un único INSERT ... SELECT unnest(...) en vez de un round trip por tanda.
+    if not tandas:
+        return []
     sql = f"""
         INSERT INTO {ENV}.tanda_produccion (
             orden_produccion_id,
             linea_produccion_id,
             cantidad_kg,
             estado,
-            secuencia_en_linea
+            secuencia_en_linea,
+            fecha_inicio_planificada,
+            fecha_fin_planificada
         )
-        VALUES (%s, %s, %s, 'planificada', %s)
+        SELECT orden_id, linea_id, kg, 'planificada', secuencia, inicio, fin
+        FROM unnest(%s::int[], %s::int[], %s::numeric[], %s::int[], %s::timestamptz[], %s::timestamptz[])
+             AS t(orden_id, linea_id, kg, secuencia, inicio, fin)
+        RETURNING id, linea_produccion_id, secuencia_en_linea
     """
-    cur.execute(sql, (orden_id, linea_id, kg, secuencia))
+    cur.execute(
+        sql,
+        (
+            [t.orden_produccion_id for t in tandas],
+            [t.linea_produccion_id for t in tandas],
+            [t.cantidad_kg for t in tandas],
+            [t.secuencia_en_linea for t in tandas],
+            [inicio for inicio, _ in horarios],
+            [fin for _, fin in horarios],
+        ),
+    )
+    # (línea, secuencia) es único entre las tandas nuevas: no depende del orden de RETURNING.
+    ids = {(int(linea), int(sec)): int(tid) for tid, linea, sec in cur.fetchall()}
+    return [ids[(t.linea_produccion_id, t.secuencia_en_linea)] for t in tandas]
 
 
-def planificar(cur) -> Dict[str, Any]:
-    """Orquesta la planificación greedy y retorna métricas/resumen."""
-    # Ejecuta el algoritmo de asignación de tandas end-to-end.
-    limpiar_tandas_planificadas(cur)
+def _clave_tanda(orden_id: Any, linea_id: Any, kg: Any) -> Tuple[int, int, int]:
+    # cantidad_kg se guarda como NUMERIC(10,2): se compara en centésimos.
+    return int(orden_id), int(linea_id), a_centesimos(decimal_value(kg, "kg de tanda"))
 
-    lineas = obtener_lineas_activas(cur)
-    compat = obtener_compatibilidades(cur)
-    secuencias = obtener_secuencias_existentes(cur)
-    ordenes = obtener_ordenes_pendientes(cur)
 
-    if not ordenes:
-        logger.info("No hay ordenes con kilos pendientes para planificar.")
-        return {"nuevas_tandas": 0, "ordenes_planificadas": [], "alertas": []}
+def eliminar_tandas(cur, ids: List[int]) -> None:
+    """Elimina las tandas planificadas indicadas."""
+    if ids:
+        cur.execute(f"DELETE FROM {ENV}.tanda_produccion WHERE id = ANY(%s::int[])", (ids,))
 
-    ordenar_ordenes(ordenes)
 
-    # Se añade el concepto de capacidad diaria total por línea.
-    capacidades_diarias = {
-        lid: data["capacidad"] * Decimal(str(CAPACIDAD_DIARIA_FACTOR))
-        for lid, data in lineas.items()
-    }
+def actualizar_posiciones(cur, cambios: List[Tuple[int, int, Horario]]) -> None:
+    """Mueve tandas existentes (id, secuencia, horario) a su nueva posición en la cola y el calendario, en una sola sentencia."""
+    if not cambios:
+        return
+    sql = f"""
+        UPDATE {ENV}.tanda_produccion t
+        SET secuencia_en_linea = u.secuencia,
+            fecha_inicio_planificada = u.inicio,
+            fecha_fin_planificada = u.fin
+        FROM unnest(%s::int[], %s::int[], %s::timestamptz[], %s::timestamptz[]) AS u(id, secuencia, inicio, fin)
+        WHERE t.id = u.id
+    """
+    cur.execute(
+        sql,
+        (
+            [tid for tid, _, _ in cambios],
+            [sec for _, sec, _ in cambios],
+            [horario[0] for _, _, horario in cambios],
+            [horario[1] for _, _, horario in cambios],
+        ),
+    )
 
-    disponibilidad = {
-        linea_id: {
-            "capacidad": data["capacidad"],  # Capacidad por tanda
-            "capacidad_diaria": capacidades_diarias.get(linea_id, Decimal("0")),
-            "sec": secuencias.get(linea_id, 0) + 1,
-            "carga_planificada": Decimal("0"),
-        }
-        for linea_id, data in lineas.items()
-    }
 
-    total_tandas = 0
-    ordenes_planificadas: List[Dict[str, Any]] = []
-    alertas: List[Dict[str, Any]] = []
-
-    for orden in ordenes:
-        orden_id = orden["id"]
-        kg_pendientes = orden["kg_pendientes"]
-        lineas_compatibles = compat.get(orden["id_producto"], [])
-
-        if not lineas_compatibles:
-            alertas.append(
-                {
-                    "orden_id": orden_id,
-                    "motivo": "sin_linea_compatible",
-                }
-            )
+def reconciliar_tandas(
+    cur, previas: List[Dict[str, Any]], tandas: Sequence[Tanda], horarios: Sequence[Horario]
+) -> Tuple[List[int], Dict[str, int]]:
+    """Aplica el plan nuevo sobre el anterior escribiendo sólo lo que cambió.
+
+    Una tanda nueva con la misma orden, línea y kg que una anterior reutiliza
+    esa fila (y su id); si además conserva secuencia y horario no se toca. Las
+    anteriores sin pareja se eliminan y las nuevas sin pareja se insertan.
+    Como el greedy es determinista, todo lo previo a la primera orden que
+    cambió se reproduce igual y queda intacto: sólo se reescribe el tramo
+    afectado de cada cola. Devuelve los ids del plan (en el orden de
+    `tandas`) y el conteo de cambios.
+    """
+    # Cola de tandas anteriores por clave, en orden de secuencia.
+    libres: Dict[Tuple[int, int, int], List[Dict[str, Any]]] = {}
+    for previa in previas:
+        clave = _clave_tanda(previa["orden_produccion_id"], previa["linea_produccion_id"], previa["cantidad_kg"])
+        libres.setdefault(clave, []).append(previa)
+
+    ids: List[Optional[int]] = []
+    nuevas: List[int] = []
+    reubicadas: List[Tuple[int, int, Horario]] = []
+    for posicion, (tanda, horario) in enumerate(zip(tandas, horarios)):
+        clave = _clave_tanda(tanda.orden_produccion_id, tanda.linea_produccion_id, tanda.cantidad_kg)
+        candidatas = libres.get(clave)
+        if not candidatas:
+            ids.append(None)
+            nuevas.append(posicion)
             continue
+        previa = candidatas.pop(0)
+        ids.append(int(previa["id"]))
+        previo = (previa["fecha_inicio_planificada"], previa["fecha_fin_planificada"])
+        if int(previa["secuencia_en_linea"]) != tanda.secuencia_en_linea or previo != horario:
+            reubicadas.append((int(previa["id"]), tanda.secuencia_en_linea, horario))
+
+    eliminadas = [int(p["id"]) for pendientes in libres.values() for p in pendientes]
+    eliminar_tandas(cur, eliminadas)
+    actualizar_posiciones(cur, reubicadas)
+    insertadas = insertar_tandas(cur, [tandas[i] for i in nuevas], [horarios[i] for i in nuevas])
+    for posicion, tid in zip(nuevas, insertadas):
+        ids[posicion] = tid
+
+    resumen = {
+        "insertadas": len(nuevas),
+        "reubicadas": len(reubicadas),
+        "conservadas": len(tandas) - len(nuevas) - len(reubicadas),
+        "eliminadas": len(eliminadas),
+    }
+    logger.info("Reconciliación del plan: %s", resumen)
+    return ids, resumen
 
-        kg_restantes = kg_pendientes
-        tandas_creadas = 0
-
-        # Este bucle ahora se detendrá si las líneas se llenan.
-        while kg_restantes > Decimal("0"):
-            linea_id = seleccionar_linea(lineas_compatibles, disponibilidad)
-            if linea_id is None:
-                # Si no hay líneas con capacidad diaria disponible, se detiene la planificación para esta orden.
-                if kg_restantes > 0:
-                    alertas.append(
-                        {
-                            "orden_id": orden_id,
-                            "motivo": "sin_linea_disponible_con_capacidad",
-                            "kg_pendientes": float(kg_restantes),
-                        }
-                    )
-                break
-
-            capacidad_tanda = disponibilidad[linea_id]["capacidad"]
-            capacidad_diaria_restante = (
-                disponibilidad[linea_id]["capacidad_diaria"]
-                - disponibilidad[linea_id]["carga_planificada"]
-            )
 
-            if capacidad_diaria_restante <= Decimal("0"):
-                # Doble chequeo, aunque seleccionar_linea ya debería prevenir esto.
-                break
+def cargar_entradas(cur) -> EntradasPlan:
+    """Lee líneas, compatibilidades, secuencias firmes y órdenes pendientes (ya ordenadas por prioridad).
+
+    Son las de `alimentapp.agenda`, las mismas que usan la simulación de OV y el MRP.
+    """
+    entradas = cargar_entradas_agenda(cur)
+    if not entradas.ordenes:
+        logger.info("No hay ordenes con kilos pendientes para planificar.")
+    return entradas
 
-            # El tamaño de la tanda es el mínimo entre lo que falta, la capacidad de la tanda y la capacidad diaria restante.
-            kg_a_planificar = min(capacidad_tanda, capacidad_diaria_restante)
-            kg_tanda = min(kg_restantes, kg_a_planificar)
 
-            if kg_tanda <= Decimal("0"):
-                break
+def decodificador(entradas: EntradasPlan) -> Callable[[Sequence[Mapping[str, Any]]], Plan]:
+    """Función que calcula el plan de una lista de órdenes (en ese orden de prioridad) sobre `entradas`.
 
-            secuencia = disponibilidad[linea_id]["sec"]
+    Es `alimentapp.agenda.calcular_plan_diario`: todo el backlog, con cada
+    tanda ubicada en un día hábil (capacidad diaria por línea = capacidad *
+    CAPACIDAD_DIARIA_FACTOR). Las componentes independientes de líneas se
+    planifican en paralelo.
+    """
 
-            insertar_tanda(cur, orden_id, linea_id, kg_tanda, secuencia)
+    def decodificar(ordenes: Sequence[Mapping[str, Any]]) -> Plan:
+        return calcular_plan_diario(entradas, ordenes)
 
-            disponibilidad[linea_id]["sec"] += 1
-            disponibilidad[linea_id]["carga_planificada"] += kg_tanda
-            kg_restantes -= kg_tanda
-            tandas_creadas += 1
-            total_tandas += 1
+    return decodificar
 
-        if kg_restantes <= Decimal("0"):
-            ordenes_planificadas.append(
-                {
-                    "orden_id": orden_id,
-                    "tandas_creadas": tandas_creadas,
-                    "kg_total": float(kg_pendientes),
-                }
-            )
 
-    return {
-        "nuevas_tandas": total_tandas,
-        "ordenes_planificadas": ordenes_planificadas,
-        "alertas": alertas,
+def calcular_plan_actual(cur) -> Tuple[Plan, Dict[int, Dict[str, Any]]]:
+    """Carga las entradas desde la base y calcula el plan greedy en memoria, sin escribir.
+
+    Devuelve también las órdenes consideradas por id, para enriquecer la salida.
+    """
+    entradas = cargar_entradas(cur)
+    plan = decodificador(entradas)(entradas.ordenes)
+    return plan, {orden["id"]: orden for orden in entradas.ordenes}
+
+
+def _hoy_local() -> date:
+    # Hora de Argentina (America/Argentina/Buenos_Aires). Si no hay zoneinfo, usar UTC-3 fijo.
+    if ZoneInfo is not None:
+        return datetime.now(ZoneInfo("America/Argentina/Buenos_Aires")).date()
+    return datetime.now(timezone(timedelta(hours=-3))).date()
+
+
+def horarios_plan(plan: Plan, desde: date) -> List[Horario]:
+    """fecha_inicio/fin_planificada de cada tanda: su tramo de la jornada en el día hábil asignado."""
+    zona = ZoneInfo("America/Argentina/Buenos_Aires") if ZoneInfo is not None else timezone(timedelta(hours=-3))
+    segundos_jornada = Fraction(JORNADA_HORAS) * 3600
+    fechas = dias_habiles(desde, plan.calendario.dias)
+    horarios: List[Horario] = []
+    for tanda in plan.tandas:
+        tramo = plan.calendario.tramo(tanda)
+        if tramo is None:
+            horarios.append((None, None))
+            continue
+        apertura = datetime.combine(fechas[tanda.dia], time(JORNADA_INICIO_HORA), tzinfo=zona)
+        inicio, fin = (
+            # Segundo más cercano, medio segundo hacia arriba (la fracción es exacta).
+            apertura + timedelta(seconds=int(segundos_jornada * fraccion + Fraction(1, 2))) for fraccion in tramo
+        )
+        horarios.append((inicio, fin))
+    return horarios
+
+
+def planificar(cur, incremental: Optional[bool] = None, optimizar_segundos: Optional[float] = None) -> Dict[str, Any]:
+    """Calcula el plan greedy, lo persiste junto con la agenda por día y retorna métricas/resumen.
+
+    En modo incremental (por defecto, ver PLANIFICACION_INCREMENTAL) el plan
+    se reconcilia contra las tandas planificadas existentes; en modo completo
+    se borran todas y se reinsertan. Con `optimizar_segundos` el plan greedy
+    se mejora con búsqueda local durante ese tiempo antes de persistirlo y el
+    resumen incluye el atraso antes y después (`optimizacion`).
+    """
+    if incremental is None:
+        incremental = PLANIFICACION_INCREMENTAL
+    if incremental:
+        previas = obtener_tandas_planificadas(cur)
+    else:
+        limpiar_tandas_planificadas(cur)
+        previas = []
+
+    entradas = cargar_entradas(cur)
+    decodificar = decodificador(entradas)
+    desde = _hoy_local()
+    optimizacion = None
+    if optimizar_segundos is None:
+        plan = decodificar(entradas.ordenes)
+    else:
+        optimizacion = optimizar_plan(decodificar, entradas.ordenes, entradas.compatibilidades, desde, optimizar_segundos)
+        plan = optimizacion.plan
+    ids, cambios = reconciliar_tandas(cur, previas, plan.tandas, horarios_plan(plan, desde))
+    # La agenda por día sale de las fechas recién guardadas, en la misma transacción.
+    agenda = guardar_planificacion(cur, agenda_desde_tandas(cur, fecha_base()))
+    logger.info("planificacion_diaria actualizada: %s", agenda)
+    # Última escritura del plan: invalida la agenda en cache del planificador diario.
+    subir_version_agenda(cur)
+
+    resultado = {
+        "nuevas_tandas": cambios["insertadas"],
+        "ids_tandas": ids,
+        "cambios": cambios,
+        "agenda": agenda,
+        "ordenes_planificadas": plan.ordenes_planificadas,
+        "alertas": plan.alertas,
     }
+    if optimizacion is not None:
+        resultado["optimizacion"] = optimizacion.resumen()
+    return resultado
 
-# -------- Preview por días (sombra transaccional, sin persistir) --------
+
+def segundos_optimizacion(payload: Mapping[str, Any], context: Any) -> Optional[float]:
+    """Presupuesto de la búsqueda local (None = sólo greedy), recortado para terminar antes del timeout.
+
+    `{"optimizar": true|false}` usa `OPTIMIZACION_SEGUNDOS`; un número pide
+    esos segundos. Sin la clave decide PLANIFICACION_OPTIMIZAR.
+    """
+    pedido = payload.get("optimizar", PLANIFICACION_OPTIMIZAR)
+    if isinstance(pedido, bool):
+        if not pedido:
+            return None
+        segundos = OPTIMIZACION_SEGUNDOS
+    elif isinstance(pedido, (int, float)) and pedido >= 0:
+        segundos = float(pedido)
+    else:
+        raise PlanningError(f"Valor de optimizar invalido: {pedido}")
+    if context is not None and hasattr(context, "get_remaining_time_in_millis"):
+        restante = context.get_remaining_time_in_millis() / 1000 - OPTIMIZACION_RESERVA_SEGUNDOS
+        segundos = min(segundos, restante)
+    return max(0.0, segundos)
+
+# -------- Preview por días (plan en memoria, sin persistir) --------
 
 def _siguiente_habil(d: datetime) -> datetime:
     # explicacion funcionalidad: desplaza a próximo día hábil si cae sábado o domingo.
@@ -403,75 +350,30 @@ def _generar_dias_habiles(desde: Optional[str], dias: int) -> List[str]:
     return fechas
 
 
-def _capturar_tandas_sombra(cur) -> List[Dict[str, Any]]:
-    # explicacion funcionalidad: ejecuta planificar dentro de la tx y lee tandas 'planificada' generadas.
-    resumen = planificar(cur)
-    logger.info("[preview] Resumen planificar sombra: %s", resumen)
-    filas = fetch_all(
-        cur,
-        f"""
-            SELECT t.id, t.orden_produccion_id, t.linea_produccion_id, t.cantidad_kg,
-                   op.id_orden_venta, op.id_producto, p.nombre AS producto,
-                   t.secuencia_en_linea
-            FROM {ENV}.tanda_produccion t
-            JOIN {ENV}.orden_produccion op ON op.id = t.orden_produccion_id
-            JOIN {ENV}.producto p ON p.id = op.id_producto
-            WHERE t.estado = 'planificada'
-            ORDER BY t.linea_produccion_id, t.secuencia_en_linea, t.id
-        """,
-    )
-    logger.info("[preview] Tandas capturadas: %s", len(filas))
-    return filas
-
-
-def _capacidades_diarias(cur) -> Dict[int, Decimal]:
-    # explicacion funcionalidad: capacidad/día por línea (capacidad_linea * factor env).
-    lineas = obtener_lineas_activas(cur)
-    caps: Dict[int, Decimal] = {}
-    for lid, meta in lineas.items():
-        caps[lid] = meta["capacidad"] * Decimal(str(CAPACIDAD_DIARIA_FACTOR))
-    return caps
-
-
-def _bucket_por_dias(tandas: List[Dict[str, Any]], dias: List[str], caps_dia: Dict[int, Decimal]) -> List[Dict[str, List[Dict[str, Any]]]]:
-    # explicacion funcionalidad: asigna tandas a fechas hábiles respetando capacidad diaria por línea.
-    restante: List[Dict[int, Decimal]] = []
-    for _ in dias:
-        restante.append({lid: Decimal(v) for lid, v in caps_dia.items()})
-
-    agenda: List[Dict[str, List[Dict[str, Any]]]] = [{d: []} for d in dias]
-
-    for t in tandas:
-        lid = int(t["linea_produccion_id"])
-        kg = decimal_value(t["cantidad_kg"], f"kg tanda {t['id']}")
-        colocado = False
-        for i, d in enumerate(dias):
-            disp = restante[i].get(lid, Decimal("0"))
-            if disp >= kg:
-                agenda[i][d].append(
-                    {
-                        "op_id": int(t["orden_produccion_id"]),
-                        "ov_id": int(t["id_orden_venta"]) if t.get("id_orden_venta") is not None else None,
-                        "linea_id": lid,
-                        "producto": t.get("producto"),
-                        "kg": float(kg),
-                    }
-                )
-                restante[i][lid] = disp - kg
-                colocado = True
-                break
-        if not colocado:
-            logger.warning("[preview] Sin capacidad en %s días para tanda %s (línea %s, kg=%s)", len(dias), t["id"], lid, kg)
-
-    return agenda
-
-
 def preview_por_dias(cur, dias: int, desde: Optional[str]) -> List[Dict[str, List[Dict[str, Any]]]]:
-    # explicacion funcionalidad: corre sombra y devuelve agenda por fecha (sin persistir cambios).
-    tandas = _capturar_tandas_sombra(cur)
-    caps = _capacidades_diarias(cur)
+    # explicacion funcionalidad: calcula el plan en memoria (cada tanda ya trae su día) y devuelve agenda por fecha (sin persistir cambios).
+    plan, ordenes = calcular_plan_actual(cur)
+    logger.info("[preview] Plan en memoria: %s tandas, %s alertas", len(plan.tandas), len(plan.alertas))
     fechas = _generar_dias_habiles(desde, dias)
-    agenda = _bucket_por_dias(tandas, fechas, caps)
+    agenda: List[Dict[str, List[Dict[str, Any]]]] = [{d: []} for d in fechas]
+    for tanda in plan.por_linea():
+        kg = tanda.cantidad_kg
+        if tanda.dia is None or tanda.dia >= len(fechas):
+            logger.warning(
+                "[preview] Sin capacidad en %s días para tanda de la OP %s (línea %s, secuencia %s, kg=%s)",
+                len(fechas), tanda.orden_produccion_id, tanda.linea_produccion_id, tanda.secuencia_en_linea, kg,
+            )
+            continue
+        orden = ordenes[tanda.orden_produccion_id]
+        agenda[tanda.dia][fechas[tanda.dia]].append(
+            {
+                "op_id": tanda.orden_produccion_id,
+                "ov_id": int(orden["id_orden_venta"]) if orden["id_orden_venta"] is not None else None,
+                "linea_id": tanda.linea_produccion_id,
+                "producto": orden["producto"],
+                "kg": float(kg),
+            }
+        )
     return agenda
 
 
@@ -509,8 +411,8 @@ def obtener_siguiente_tanda(cur) -> Optional[Dict[str, Any]]:
 
 
 def lambda_handler_preview(event, context):
-    """Entry point alternativo para preview por días (modo sombra)."""
-    # explicacion funcionalidad: devuelve [{fecha:[items]}] sin escribir, usando rollback al final.
+    """Entry point alternativo para preview por días (plan en memoria)."""
+    # explicacion funcionalidad: devuelve [{fecha:[items]}] sin escribir; sólo lee las entradas del plan.
     logger.info("Preview por días - evento: %s", event)
     try:
         payload = parse_event(event)
@@ -536,7 +438,7 @@ def lambda_handler_preview(event, context):
         return {"statusCode": 500, "headers": {"Content-Type": "application/json"}, "body": json.dumps({"error": "Error interno", "detail": str(exc)})}
     finally:
         if conn:
-            conn.close()
+            release_connection(conn)
 
 
 def parse_event(event: Any) -> Dict[str, Any]:
@@ -558,11 +460,118 @@ def parse_event(event: Any) -> Dict[str, Any]:
     raise PlanningError("Evento no soportado")
 
 
+# -------- Coalescencia de disparos (una corrida a la vez) --------
+
+def registrar_solicitud(cur) -> int:
+    """Cuenta un disparo del planificador en planificador_estado y devuelve su número."""
+    cur.execute(
+        f"""
+            INSERT INTO {ENV}.planificador_estado (id, solicitudes, solicitado_en)
+            VALUES (1, 1, NOW())
+            ON CONFLICT (id) DO UPDATE
+            SET solicitudes = planificador_estado.solicitudes + 1, solicitado_en = NOW()
+            RETURNING solicitudes
+        """
+    )
+    return int(cur.fetchone()[0])
+
+
+def solicitudes_pendientes(cur) -> Tuple[int, int]:
+    """(último disparo registrado, último disparo cubierto por un plan)."""
+    filas = fetch_all(cur, f"SELECT solicitudes, atendidas FROM {ENV}.planificador_estado WHERE id = 1")
+    if not filas:
+        return 0, 0
+    return int(filas[0]["solicitudes"]), int(filas[0]["atendidas"])
+
+
+def marcar_atendidas(cur, hasta: int) -> None:
+    """Registra que el plan en curso cubre los disparos hasta `hasta` (se confirma junto con el plan)."""
+    cur.execute(
+        f"UPDATE {ENV}.planificador_estado SET atendidas = GREATEST(atendidas, %s), atendido_en = NOW() WHERE id = 1",
+        (hasta,),
+    )
+
+
+def tomar_turno(cur) -> bool:
+    """Advisory lock de sesión: True si esta invocación es la única que planifica."""
+    cur.execute("SELECT pg_try_advisory_lock(hashtext(%s))", (f"{ENV}.planificador_ordenes_produccion",))
+    return bool(cur.fetchone()[0])
+
+
+def soltar_turno(cur) -> None:
+    cur.execute("SELECT pg_advisory_unlock(hashtext(%s))", (f"{ENV}.planificador_ordenes_produccion",))
+
+
+def reinvocar(context: Any) -> None:
+    """Se pide una corrida más (asíncrona) cuando quedan disparos sin atender al agotar las rondas."""
+    if context is None or not getattr(context, "invoked_function_arn", None):
+        logger.warning("Quedan disparos sin atender y no se puede reinvocar el planificador")
+        return
+    try:
+        get_client("lambda").invoke(
+            FunctionName=context.invoked_function_arn,
+            InvocationType="Event",
+            Payload=json.dumps({}).encode("utf-8"),
+        )
+    except Exception as exc:  # pragma: no cover
+        logger.exception("No se pudo reinvocar el planificador: %s", exc)
+
+
+def correr_coalescido(conn, payload: Mapping[str, Any], context: Any) -> Tuple[int, Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """Registra el disparo y planifica sólo si no hay otra corrida en curso.
+
+    El disparo queda contado en planificador_estado antes de pedir el turno:
+    si otra invocación tiene el turno, lo va a ver al terminar su ronda y
+    hace una más que lo cubre; si lo suelta justo antes, lo vemos nosotros
+    al volver a mirar después de soltarlo. Así una ráfaga de disparos se
+    resuelve en una corrida más, no en una por disparo. Devuelve (rondas,
+    resumen del último plan, siguiente tanda); 0 rondas = coalescido.
+    """
+    modo = payload.get("modo")
+    cur = conn.cursor()
+    registrar_solicitud(cur)
+    conn.commit()
+
+    rondas, resultado_plan, siguiente_tanda = 0, None, None
+    while rondas < PLANIFICADOR_MAX_RONDAS and tomar_turno(cur):
+        try:
+            while rondas < PLANIFICADOR_MAX_RONDAS:
+                solicitudes, atendidas = solicitudes_pendientes(cur)
+                if solicitudes <= atendidas:
+                    break
+                resultado_plan = planificar(
+                    cur,
+                    incremental=None if modo is None else modo == "incremental",
+                    optimizar_segundos=segundos_optimizacion(payload, context),
+                )
+                marcar_atendidas(cur, solicitudes)
+                siguiente_tanda = obtener_siguiente_tanda(cur)
+                conn.commit()
+                rondas += 1
+                logger.info("Ronda %s del planificador (disparos hasta %s). Resumen: %s", rondas, solicitudes, resultado_plan)
+        finally:
+            conn.rollback()
+            soltar_turno(cur)
+            conn.commit()
+        solicitudes, atendidas = solicitudes_pendientes(cur)
+        conn.rollback()
+        if solicitudes <= atendidas:
+            break
+    else:
+        if rondas >= PLANIFICADOR_MAX_RONDAS:
+            reinvocar(context)
+    return rondas, resultado_plan, siguiente_tanda
+
+
 def lambda_handler(event, context):
     """Entry point de AWS Lambda para recalcular la agenda y devolver la siguiente tanda."""
     logger.info("Iniciando planificacion de tandas. Evento: %s", event)
     try:
-        _ = parse_event(event)  # Reservado para filtros futuros
+        payload = parse_event(event)
+        modo = payload.get("modo")
+        if modo is not None and modo not in MODOS_PLANIFICACION:
+            raise PlanningError(f"Modo de planificacion invalido: {modo}")
+        segundos_optimizacion(payload, context)
     except PlanningError as exc:
         return {
             "statusCode": 400,
@@ -573,18 +582,22 @@ def lambda_handler(event, context):
     conn = None
     try:
         conn = get_connection()
-        cur = conn.cursor()
-        resultado_plan = planificar(cur)
-        logger.info("Planificacion completada. Resumen: %s", resultado_plan)
-
-        siguiente_tanda = obtener_siguiente_tanda(cur)
-        conn.commit()
-
+        rondas, resultado_plan, siguiente_tanda = correr_coalescido(conn, payload, context)
+        if not rondas:
+            logger.info("Disparo coalescido: lo atiende la corrida en curso")
+            return {
+                "statusCode": 202,
+                "headers": {"Content-Type": "application/json"},
+                "body": json.dumps({"coalescido": True}),
+            }
         logger.info("Siguiente tanda a ejecutar: %s", siguiente_tanda)
+        respuesta = dict(siguiente_tanda or {})
+        if "optimizacion" in resultado_plan:
+            respuesta["optimizacion"] = resultado_plan["optimizacion"]
         return {
             "statusCode": 200,
             "headers": {"Content-Type": "application/json"},
-            "body": json.dumps(siguiente_tanda or {}),
+            "body": json.dumps(respuesta),
         }
     except PlanningError as exc:
         if conn:
@@ -606,4 +619,4 @@ def lambda_handler(event, context):
         }
     finally:
         if conn:
-            conn.close()
+            release_connection(conn)
@@ -1,87 +1,39 @@
 """Lambda simulación OV: evalúa impacto de una orden_venta existente sin persistir.
 
 Flujo:
-- Invoca la Lambda diaria para obtener el baseline de estados (agenda y atrasados).
-- Cambia temporalmente OP de la OV dada a 'lista_para_produccion' (si no lo están) y commit.
-- Invoca nuevamente la Lambda diaria y compara OP atrasadas nuevas (excluye OP de la OV).
-- Revierte estados originales y vuelve a invocar la Lambda diaria para restaurar planificacion_diaria.
+- Lee una sola vez las entradas del planificador diario, incluyendo las OP de la OV aunque no estén 'lista_para_produccion'.
+- Calcula en memoria la agenda actual (sin las OP de la OV que no están listas) y la agenda con toda la OV como 'lista_para_produccion'.
+- Compara ambas: OP atrasadas nuevas (excluye OP de la OV) y OP cuya fecha planificada cambia.
+- No escribe nada: ni estados de OP ni planificacion_diaria.
+
+Con 'ids_orden_venta' evalúa en lote varias OV candidatas (por defecto las que esperan
+supervisión) sobre una sola lectura de entradas, repartiendo los planes entre procesos,
+y devuelve una tabla ordenada por impacto en los atrasos.
 """
 
 import json
 import logging
 import os
-import ssl
-from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from datetime import date
+from functools import partial
+from typing import Any, Dict, Iterable, List, NamedTuple, Sequence, Set, Tuple
 
-import boto3
-import pg8000
+from alimentapp.agenda import EntradasPlan, armar_agenda, calcular_plan_diario, cargar_entradas, fecha_base
+from alimentapp.db import ENV, fetch_all, get_connection, release_connection
+from alimentapp.procesos import mapear
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-ENV = os.getenv("DB_SCHEMA", "dev")
-# ARN de la Lambda diaria (hardcodeado por requerimiento)
-PLANNER_DAILY_FN = "arn:aws:lambda:us-east-1:554074173959:function:planificador_ordenes_produccion_daily"
-
-ssm_client = boto3.client("ssm")
-lambda_client = boto3.client("lambda")
-
-DB_CONFIG: Optional[Dict[str, Any]] = None
+ESTADOS_OV_EN_SUPERVISION = ("pendiente_supervision", "en_supervision_por_urgencia")
+# Tope de OV por evaluación en lote (cada una es un plan completo).
+SIMULACION_MAX_CANDIDATAS = int(os.getenv("SIMULACION_MAX_CANDIDATAS", "200"))
 
 
 class SimulationError(Exception):
     """Errores funcionales durante la simulación de impacto."""
 
 
-def get_db_parameters() -> Dict[str, Any]:
-    """Lee credenciales de RDS desde SSM y las cachea en memoria."""
-    global DB_CONFIG
-    if DB_CONFIG:
-        return DB_CONFIG
-    names = [
-        "/alimentapp/db/host",
-        "/alimentapp/db/password",
-        "/alimentapp/db/port",
-        "/alimentapp/db/username",
-    ]
-    resp = ssm_client.get_parameters(Names=names, WithDecryption=True)
-    if len(resp["Parameters"]) != len(names):
-        missing = set(names) - {p["Name"] for p in resp["Parameters"]}
-        raise SimulationError(f"Faltan parámetros en SSM: {', '.join(sorted(missing))}")
-    data = {p["Name"].split("/")[-1]: p["Value"] for p in resp["Parameters"]}
-    DB_CONFIG = {
-        "host": data["host"],
-        "port": int(data.get("port", "5432")),
-        "user": data["username"],
-        "password": data["password"],
-        "database": os.getenv("DB_NAME", "postgres"),
-    }
-    logger.info("Parámetros DB cargados (schema=%s)", ENV)
-    return DB_CONFIG
-
-
-def get_connection():
-    """Abre una conexión pg8000 con SSL y timeout."""
-    cfg = get_db_parameters()
-    return pg8000.connect(
-        host=cfg["host"],
-        port=cfg["port"],
-        database=cfg["database"],
-        user=cfg["user"],
-        password=cfg["password"],
-        ssl_context=ssl.create_default_context(),
-        timeout=10,
-    )
-
-
-def fetch_all(cur, sql: str, params: Iterable[Any] = None) -> List[Dict[str, Any]]:
-    """Ejecuta SELECT y devuelve lista de dicts (columns → values)."""
-    cur.execute(sql, tuple(params or ()))
-    rows = cur.fetchall()
-    columns = [c[0] for c in cur.description]
-    return [dict(zip(columns, row)) for row in rows]
-
-
 def parse_event(event: Any) -> Dict[str, Any]:
     """Normaliza el evento de entrada (GET query o body JSON)."""
     if not event:
@@ -108,26 +60,6 @@ def parse_event(event: Any) -> Dict[str, Any]:
     raise SimulationError("Evento no soportado")
 
 
-def invoke_daily_agenda() -> List[Dict[str, List[Dict[str, Any]]]]:
-    """Invoca la Lambda diaria y devuelve la agenda parseada (lista de objetos por fecha)."""
-    if not PLANNER_DAILY_FN:
-        raise SimulationError("Falta env var PLANNER_DAILY_FN")
-    resp = lambda_client.invoke(FunctionName=PLANNER_DAILY_FN, InvocationType="RequestResponse", Payload=json.dumps({}).encode("utf-8"))
-    payload = resp.get("Payload")
-    raw = payload.read() if payload else b"{}"
-    try:
-        outer = json.loads(raw.decode("utf-8"))
-    except Exception as exc:
-        logger.exception("No se pudo decodificar respuesta de Lambda diaria")
-        raise SimulationError("Respuesta inválida de planificador diario") from exc
-    body = outer.get("body")
-    if isinstance(body, str):
-        return json.loads(body)
-    if isinstance(body, list):
-        return body
-    raise SimulationError("Estructura de respuesta inesperada del planificador")
-
-
 def extract_atrasados(agenda: List[Dict[str, List[Dict[str, Any]]]]) -> Set[int]:
     """Construye el set de OP que aparecen con estado_pedido = 'atrasado' en cualquier día."""
     out: Set[int] = set()
@@ -145,44 +77,27 @@ def extract_atrasados(agenda: List[Dict[str, List[Dict[str, Any]]]]) -> Set[int]
     return out
 
 
-def op_ids_por_ov(cur, ov_id: int) -> List[int]:
-    """Obtiene los IDs de OP asociadas a la orden_venta dada."""
-    rows = fetch_all(cur, f"SELECT id FROM {ENV}.orden_produccion WHERE id_orden_venta = %s", (ov_id,))
-    return [int(r["id"]) for r in rows]
+def op_ids_por_ov(cur, ov_ids: Sequence[int]) -> Dict[int, List[int]]:
+    """Obtiene los IDs de OP asociadas a cada orden_venta dada."""
+    rows = fetch_all(
+        cur,
+        f"SELECT id_orden_venta, id FROM {ENV}.orden_produccion WHERE id_orden_venta = ANY(%s::int[]) ORDER BY id",
+        ([int(i) for i in ov_ids],),
+    )
+    out: Dict[int, List[int]] = {}
+    for r in rows:
+        out.setdefault(int(r["id_orden_venta"]), []).append(int(r["id"]))
+    return out
 
 
-def estados_por_op(cur, op_ids: List[int]) -> Dict[int, str]:
-    """Devuelve estado actual por OP para las OP indicadas."""
-    if not op_ids:
-        return {}
-    sql = f"SELECT id, estado FROM {ENV}.orden_produccion WHERE id = ANY(%s)"
-    rows = fetch_all(cur, sql, (op_ids,))
-    return {int(r["id"]): str(r["estado"]) for r in rows}
-
-
-def setear_lista_para_produccion(cur, op_ids: List[int]) -> int:
-    """Actualiza a 'lista_para_produccion' las OP indicadas y retorna filas afectadas."""
-    if not op_ids:
-        return 0
-    sql = f"UPDATE {ENV}.orden_produccion SET estado = 'lista_para_produccion' WHERE id = ANY(%s)"
-    cur.execute(sql, (op_ids,))
-    return cur.rowcount
-
-
-def revertir_estados(cur, originales: Dict[int, str]) -> int:
-    """Restaura estados originales de OP (puede ejecutar en lotes)."""
-    if not originales:
-        return 0
-    total = 0
-    # Ejecutamos por estado para minimizar roundtrips
-    por_estado: Dict[str, List[int]] = {}
-    for op_id, est in originales.items():
-        por_estado.setdefault(est, []).append(op_id)
-    for est, ids in por_estado.items():
-        sql = f"UPDATE {ENV}.orden_produccion SET estado = %s WHERE id = ANY(%s)"
-        cur.execute(sql, (est, ids))
-        total += cur.rowcount
-    return total
+def ovs_en_supervision(cur) -> List[int]:
+    """OV pendientes de aceptar (candidatas por defecto de la evaluación en lote)."""
+    rows = fetch_all(
+        cur,
+        f"SELECT id FROM {ENV}.orden_venta WHERE estado = ANY(%s) ORDER BY fecha_entrega_solicitada, id",
+        (list(ESTADOS_OV_EN_SUPERVISION),),
+    )
+    return [int(r["id"]) for r in rows]
 
 
 def build_date_map(agenda: List[Dict[str, List[Dict[str, Any]]]]) -> Dict[int, str]:
@@ -202,83 +117,160 @@ def build_date_map(agenda: List[Dict[str, List[Dict[str, Any]]]]) -> Dict[int, s
     return date_map
 
 
+class Escenario(NamedTuple):
+    """Entradas leídas una vez y agenda actual, compartidas por todas las OV simuladas."""
+
+    entradas: EntradasPlan
+    ordenes: Dict[int, Dict[str, Any]]
+    base: date
+    atrasados: Set[int]
+    fechas: Dict[int, str]
+
+
+def preparar_escenario(cur, ov_ids: Sequence[int]) -> Escenario:
+    """Lee las entradas (con las OP de las OV candidatas) y calcula la agenda actual en memoria."""
+    entradas = cargar_entradas(cur, ids_orden_venta=ov_ids)
+    ordenes = {o["id"]: o for o in entradas.ordenes}
+    base = fecha_base()
+    # Baseline: lo que hoy planifica la Lambda diaria (las OV sólo aportan las OP ya listas)
+    actuales = [o for o in entradas.ordenes if o["estado"] == "lista_para_produccion"]
+    agenda = armar_agenda(calcular_plan_diario(entradas, actuales), ordenes, base)
+    atrasados = extract_atrasados(agenda)
+    logger.info("Baseline atrasados: %s OP", len(atrasados))
+    return Escenario(entradas, ordenes, base, atrasados, build_date_map(agenda))
+
+
+def agenda_con_ov(escenario: Escenario, ov_id: int) -> List[Dict[str, List[Dict[str, Any]]]]:
+    """Agenda con todas las OP de la OV como 'lista_para_produccion' (en memoria)."""
+    ordenes = [
+        o for o in escenario.entradas.ordenes
+        if o["estado"] == "lista_para_produccion" or o["id_orden_venta"] == ov_id
+    ]
+    return armar_agenda(calcular_plan_diario(escenario.entradas, ordenes), escenario.ordenes, escenario.base)
+
+
+def simular_ov(cur, ov_id: int, op_ids: Iterable[int]) -> Dict[str, Any]:
+    """Agenda actual vs agenda con la OV, calculadas en memoria a partir de una sola lectura de entradas."""
+    escenario = preparar_escenario(cur, [ov_id])
+    original_dates = escenario.fechas  # Fecha original de cada OP
+    agenda_new = agenda_con_ov(escenario, ov_id)
+    atrasados_new = extract_atrasados(agenda_new)
+    new_dates = build_date_map(agenda_new)  # Nueva fecha de cada OP
+
+    # Afectadas (nuevas atrasadas) y desplazadas (cambia la fecha), excluyendo OP de la OV
+    propias = set(op_ids)
+    afectadas_ids = sorted((atrasados_new - escenario.atrasados) - propias)
+    desplazadas_ids = sorted(op_id for op_id, fecha in original_dates.items() if op_id not in propias and new_dates.get(op_id) != fecha)
+
+    def detalle(op_id: int) -> Dict[str, Any]:
+        return {
+            "id_orden_produccion": op_id,
+            "fecha_planificada_original": original_dates.get(op_id, "N/A"),
+            "fecha_planificada_nueva": new_dates.get(op_id, "N/A"),
+        }
+
+    return {
+        "ordenes_afectadas": [detalle(op_id) for op_id in afectadas_ids],
+        "ordenes_desplazadas": [detalle(op_id) for op_id in desplazadas_ids],
+    }
+
+
+def impacto_ov(escenario: Escenario, candidato: Tuple[int, List[int]]) -> Dict[str, Any]:
+    """Resumen del impacto de aceptar una OV: fila de la tabla de la evaluación en lote."""
+    ov_id, op_ids = candidato
+    agenda = agenda_con_ov(escenario, ov_id)
+    atrasados = extract_atrasados(agenda)
+    fechas = build_date_map(agenda)
+    propias = set(op_ids)
+    afectadas = sorted((atrasados - escenario.atrasados) - propias)
+    desplazadas = 0
+    dias_atraso = 0
+    for op_id, fecha in escenario.fechas.items():
+        nueva = fechas.get(op_id)
+        if op_id in propias or nueva == fecha:
+            continue
+        desplazadas += 1
+        if nueva:
+            dias_atraso += max(0, (date.fromisoformat(nueva) - date.fromisoformat(fecha)).days)
+    fechas_propias = [fechas[op_id] for op_id in propias if op_id in fechas]
+    return {
+        "id_orden_venta": ov_id,
+        "aceptable": not afectadas,
+        "ordenes_afectadas": len(afectadas),
+        "dias_atraso_otras": dias_atraso,
+        "ordenes_desplazadas": desplazadas,
+        "op_propias_atrasadas": len(propias & atrasados),
+        "fecha_fin_ov": max(fechas_propias) if fechas_propias else None,
+        "ids_afectadas": afectadas,
+    }
+
+
+def evaluar_candidatas(cur, ov_ids: Sequence[int]) -> Dict[str, Any]:
+    """Impacto de cada OV por separado sobre la agenda actual, ordenado de menor a mayor impacto."""
+    ops = op_ids_por_ov(cur, ov_ids)
+    candidatos = [(ov_id, ops[ov_id]) for ov_id in ov_ids if ov_id in ops]
+    escenario = preparar_escenario(cur, [ov_id for ov_id, _ in candidatos])
+    # Cada candidata es un plan completo en memoria: se reparten entre procesos que heredan el escenario.
+    impactos = mapear(partial(impacto_ov, escenario), candidatos)
+    impactos.sort(key=lambda r: (
+        r["ordenes_afectadas"], r["dias_atraso_otras"], r["ordenes_desplazadas"], r["op_propias_atrasadas"], r["id_orden_venta"]
+    ))
+    for puesto, fila in enumerate(impactos, start=1):
+        fila["puesto"] = puesto
+    return {"candidatas": impactos, "sin_op": [ov_id for ov_id in ov_ids if ov_id not in ops]}
+
+
+def _ids_candidatas(valor: Any) -> List[int]:
+    # Lista JSON o "1,2,3" en query string; sin repetidos y en el orden recibido.
+    if isinstance(valor, str):
+        valor = [v for v in valor.split(",") if v.strip()]
+    try:
+        return list(dict.fromkeys(int(v) for v in valor))
+    except (TypeError, ValueError):
+        raise SimulationError("'ids_orden_venta' debe ser una lista de enteros")
+
+
 def lambda_handler(event, context):
-    """Entry de simulación: compara atrasados antes y después de sumar OP de una OV (GET id_orden_venta)."""
+    """Entry de simulación: compara atrasados antes y después de sumar OP de una OV (GET id_orden_venta) o de cada una de varias (ids_orden_venta)."""
     logger.info("Simulación OV - evento: %s", event)
     try:
-        payload = parse_event(event)
-        ov_id_raw = (payload or {}).get("id_orden_venta")
-        if ov_id_raw is None:
-            return {"statusCode": 400, "headers": {"Content-Type": "application/json"}, "body": json.dumps({"error": "Falta 'id_orden_venta'"})}
-        ov_id = int(ov_id_raw)
+        payload = parse_event(event) or {}
+        lote = "ids_orden_venta" in payload
+        if lote:
+            ov_ids = _ids_candidatas(payload["ids_orden_venta"])
+        else:
+            ov_id_raw = payload.get("id_orden_venta")
+            if ov_id_raw is None:
+                return {"statusCode": 400, "headers": {"Content-Type": "application/json"}, "body": json.dumps({"error": "Falta 'id_orden_venta'"})}
+            ov_id = int(ov_id_raw)
     except (SimulationError, ValueError) as exc:
         return {"statusCode": 400, "headers": {"Content-Type": "application/json"}, "body": json.dumps({"error": str(exc)})}
 
-    # 1) Baseline de atrasados
-    try:
-        agenda_base = invoke_daily_agenda()
-        atrasados_base = extract_atrasados(agenda_base)
-        original_dates = build_date_map(agenda_base) # Fecha original de cada OP
-        logger.info("Baseline atrasados: %s OP", len(atrasados_base))
-    except SimulationError as exc:
-        return {"statusCode": 502, "headers": {"Content-Type": "application/json"}, "body": json.dumps({"error": f"Planificador diario: {str(exc)}"})}
-
     conn = None
     try:
         conn = get_connection()
         cur = conn.cursor()
 
+        if lote:
+            # Evaluación en lote: sin ids, las OV que esperan supervisión
+            ov_ids = ov_ids or ovs_en_supervision(cur)
+            if len(ov_ids) > SIMULACION_MAX_CANDIDATAS:
+                return {"statusCode": 400, "headers": {"Content-Type": "application/json"}, "body": json.dumps({"error": f"Máximo {SIMULACION_MAX_CANDIDATAS} OV por evaluación"})}
+            resultado = evaluar_candidatas(cur, ov_ids)
+            conn.rollback()
+            return {"statusCode": 200, "headers": {"Content-Type": "application/json"}, "body": json.dumps(resultado)}
+
         # OP de la OV
-        op_ids = op_ids_por_ov(cur, ov_id)
+        op_ids = op_ids_por_ov(cur, [ov_id]).get(ov_id)
         if not op_ids:
             return {"statusCode": 404, "headers": {"Content-Type": "application/json"}, "body": json.dumps({"error": "OV sin OP asociadas"})}
 
-        # Estados originales y subset a promover a 'lista_para_produccion'
-        originales = estados_por_op(cur, op_ids)
-        promover = [oid for oid, est in originales.items() if est != 'lista_para_produccion']
-
-        # 2) Promover temporalmente y commit para que el planificador las lea
-        if promover:
-            n = setear_lista_para_produccion(cur, promover)
-            conn.commit()
-            logger.info("Promovidas a lista_para_produccion: %s (afectadas=%s)", len(promover), n)
-        else:
-            logger.info("Todas las OP de la OV ya estaban en 'lista_para_produccion'")
-
-        # 3) Replanificar con OV incluida
-        agenda_new = invoke_daily_agenda()
-        atrasados_new = extract_atrasados(agenda_new)
-        new_dates = build_date_map(agenda_new) # Nueva fecha de cada OP
-
-        # 4) Calcular afectadas (nuevas atrasadas), excluyendo OP de la OV
-        afectadas_ids = sorted(list((atrasados_new - atrasados_base) - set(op_ids)))
-
-        # 5) Enriquecer la respuesta con las fechas
-        afectadas_con_detalle = []
-        for op_id in afectadas_ids:
-            afectadas_con_detalle.append({
-                "id_orden_produccion": op_id,
-                "fecha_planificada_original": original_dates.get(op_id, "N/A"),
-                "fecha_planificada_nueva": new_dates.get(op_id, "N/A")
-            })
-
-        # 6) Revertir estados y restaurar planificacion_diaria
-        if promover:
-            r = revertir_estados(cur, {oid: originales[oid] for oid in promover})
-            conn.commit()
-            logger.info("Revertidos estados originales: %s", r)
-
-        # Restaurar planificacion_diaria acorde al estado real
-        try:
-            _ = invoke_daily_agenda()
-        except Exception:
-            logger.warning("No se pudo regenerar planificacion_diaria al final de la simulación")
-
-        return {"statusCode": 200, "headers": {"Content-Type": "application/json"}, "body": json.dumps({"ordenes_afectadas": afectadas_con_detalle})}
+        resultado = simular_ov(cur, ov_id, op_ids)
+        conn.rollback()
+        return {"statusCode": 200, "headers": {"Content-Type": "application/json"}, "body": json.dumps(resultado)}
 
     except Exception as exc:
         logger.exception("Error en simulación OV")
-        # En caso de error, intentar revertir cambios locales
         try:
             if conn:
                 conn.rollback()
@@ -287,4 +279,4 @@ def lambda_handler(event, context):
         return {"statusCode": 500, "headers": {"Content-Type": "application/json"}, "body": json.dumps({"error": "Error interno", "detail": str(exc)})}
     finally:
         if conn:
-            conn.close()
+            release_connection(conn)
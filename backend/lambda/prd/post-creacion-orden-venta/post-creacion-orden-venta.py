@@ -1,24 +1,17 @@
 import json
 import logging
-import os
-import ssl
 from datetime import date, datetime, time, timedelta
 from typing import Any, Dict, List
 
-import boto3
-import pg8000
 import urllib.request
 import urllib.error
 
+from alimentapp.aws import get_client
+from alimentapp.db import ENV, get_connection, release_connection, run_command, run_query
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-ENV = os.getenv("DB_SCHEMA", "dev")
-ssm_client = boto3.client("ssm")
-lambda_client = boto3.client("lambda")
-
-DB_CONFIG = None  # cache SSM
-
 # Umbrales para requerir supervisión
 THRESHOLD = {
     1: 10,
@@ -30,60 +23,12 @@ THRESHOLD = {
     7: 20
 }
 
+
 class ValidationError(Exception):
     """Error de validación para orden de venta."""
 
 
 # --- CONEXIÓN ---
-def get_db_parameters() -> Dict[str, Any]:
-    global DB_CONFIG
-    if DB_CONFIG:
-        return DB_CONFIG
-    param_names = [
-        "/alimentapp/db/host",
-        "/alimentapp/db/password",
-        "/alimentapp/db/port",
-        "/alimentapp/db/username",
-    ]
-    resp = ssm_client.get_parameters(Names=param_names, WithDecryption=True)
-    if len(resp["Parameters"]) != len(param_names):
-        missing = set(param_names) - {p["Name"] for p in resp["Parameters"]}
-        raise RuntimeError(f"Parámetros faltantes en SSM: {', '.join(missing)}")
-    data = {p["Name"].split("/")[-1]: p["Value"] for p in resp["Parameters"]}
-    DB_CONFIG = {
-        "host": data["host"],
-        "port": int(data.get("port", "5432")),
-        "user": data["username"],
-        "password": data["password"],
-        "database": os.getenv("DB_NAME", "postgres"),
-    }
-    return DB_CONFIG
-
-
-def get_connection():
-    cfg = get_db_parameters()
-    return pg8000.connect(
-        host=cfg["host"],
-        port=cfg["port"],
-        database=cfg["database"],
-        user=cfg["user"],
-        password=cfg["password"],
-        ssl_context=ssl.create_default_context(),
-        timeout=10,
-    )
-
-
-def run_query(cur, sql: str, params: tuple = None):
-    cur.execute(sql, params or ())
-    rows = cur.fetchall()
-    if not rows:
-        return []
-    columns = [desc[0] for desc in cur.description]
-    return [dict(zip(columns, row)) for row in rows]
-
-
-def run_command(cur, sql: str, params: tuple = None):
-    cur.execute(sql, params or ())
 
 
 # --- FUNCIONES AUXILIARES ---
@@ -261,7 +206,7 @@ def lambda_handler(event, context):
             logger.error(f"Error al actualizar estado de la orden: {e}")
 
         # Generar factura
-        lambda_client.invoke(
+        get_client("lambda").invoke(
             FunctionName="arn:aws:lambda:us-east-1:554074173959:function:envio-factura-cliente",
             InvocationType="Event",
             Payload=json.dumps({"orden_venta_id": orden_creada["id"]}).encode("utf-8"),
@@ -286,4 +231,4 @@ def lambda_handler(event, context):
 
     finally:
         if conn:
-            conn.close()
+            release_connection(conn)
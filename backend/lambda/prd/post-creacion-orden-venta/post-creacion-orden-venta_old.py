@@ -1,25 +1,17 @@
 import json
 import logging
-import os
-import ssl
 from datetime import date
 from typing import Any, Dict, List
 
-import boto3
-import pg8000
 
 import urllib.request
 import urllib.error
 
+from alimentapp.db import ENV, get_connection, release_connection, run_command, run_query
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-ENV = os.getenv("DB_SCHEMA", "dev")
-ssm_client = boto3.client("ssm")
-lambda_client = boto3.client("lambda")
-
-DB_CONFIG = None  # cache SSM
-
 # Cantidad de productos que se pueden pedir sin pedir al supervisor la confirmación.
 THRESHOLD = {
     1: 10,
@@ -31,67 +23,11 @@ THRESHOLD = {
     7: 20
 }
 
+
 class ValidationError(Exception):
     """Error de validación para orden de venta."""
 
 
-def get_db_parameters() -> Dict[str, Any]:
-    """Lee parámetros de RDS desde SSM (cacheado)."""
-    global DB_CONFIG
-    if DB_CONFIG:
-        return DB_CONFIG
-
-    param_names = [
-        "/alimentapp/db/host",
-        "/alimentapp/db/password",
-        "/alimentapp/db/port",
-        "/alimentapp/db/username",
-    ]
-    resp = ssm_client.get_parameters(Names=param_names, WithDecryption=True)
-    if len(resp["Parameters"]) != len(param_names):
-        missing = set(param_names) - {p["Name"] for p in resp["Parameters"]}
-        raise RuntimeError(f"Parámetros faltantes en SSM: {', '.join(missing)}")
-
-    data = {p["Name"].split("/")[-1]: p["Value"] for p in resp["Parameters"]}
-    DB_CONFIG = {
-        "host": data["host"],
-        "port": int(data.get("port", "5432")),
-        "user": data["username"],
-        "password": data["password"],
-        "database": os.getenv("DB_NAME", "postgres"),
-    }
-    return DB_CONFIG
-
-
-def get_connection():
-    """Abre conexión pg8000 + SSL con credenciales de SSM."""
-    cfg = get_db_parameters()
-    return pg8000.connect(
-        host=cfg["host"],
-        port=cfg["port"],
-        database=cfg["database"],
-        user=cfg["user"],
-        password=cfg["password"],
-        ssl_context=ssl.create_default_context(),
-        timeout=10,
-    )
-
-
-def run_query(cur, sql: str):
-    """SELECT; devuelve filas como dicts."""
-    cur.execute(sql)
-    rows = cur.fetchall()
-    if not rows:
-        return []
-    columns = [desc[0] for desc in cur.description]
-    return [dict(zip(columns, row)) for row in rows]
-
-
-def run_command(cur, sql: str):
-    """INSERT/UPDATE/DELETE; no retorna filas."""
-    cur.execute(sql)
-
-
 def create_production_orders(cur, order_id: int, items: List[Dict[str, int]]) -> str:
     """Crea ordenes_produccion para cada producto con el estado correcto."""
 
@@ -300,7 +236,7 @@ def lambda_handler(event, context):
         #        }
         #
         #        # Invoca la Lambda de forma asíncrona
-        #        lambda_client.invoke(
+        #        get_client("lambda").invoke(
         #            FunctionName='gestion-materia-prima',
         #            InvocationType='Event',  # 'Event' es para "fire-and-forget"
         #            Payload=json.dumps(payload_gestion_mp)
@@ -334,4 +270,4 @@ def lambda_handler(event, context):
         }
     finally:
         if conn:
-            conn.close()
+            release_connection(conn)
@@ -8,79 +8,18 @@
 
 import json
 import logging
-import os
-import ssl
-from typing import Any, Dict, Iterable, Optional, Tuple
+from typing import Any, Dict, Tuple
 
-import boto3
-import pg8000
+from alimentapp.db import ENV, fetch_all, get_connection, release_connection, run_command
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-ENV = os.getenv("DB_SCHEMA", "dev")
-ssm_client = boto3.client("ssm")
-DB_CONFIG: Optional[Dict[str, Any]] = None
-SSL_CONTEXT = ssl.create_default_context()
-
 
 class SeedError(Exception):
     """Errores funcionales durante la generación de datos de prueba."""
 
 
-def get_db_parameters() -> Dict[str, Any]:
-    """Obtiene credenciales de RDS desde SSM y las cachea en memoria."""
-    global DB_CONFIG
-    if DB_CONFIG:
-        return DB_CONFIG
-    names = [
-        "/alimentapp/db/host",
-        "/alimentapp/db/password",
-        "/alimentapp/db/port",
-        "/alimentapp/db/username",
-    ]
-    resp = ssm_client.get_parameters(Names=names, WithDecryption=True)
-    if len(resp["Parameters"]) != len(names):
-        missing = set(names) - {p["Name"] for p in resp["Parameters"]}
-        raise SeedError(f"Faltan parámetros en SSM: {', '.join(sorted(missing))}")
-    data = {p["Name"].split("/")[-1]: p["Value"] for p in resp["Parameters"]}
-    DB_CONFIG = {
-        "host": data["host"],
-        "port": int(data.get("port", "5432")),
-        "user": data["username"],
-        "password": data["password"],
-        "database": os.getenv("DB_NAME", "postgres"),
-    }
-    return DB_CONFIG
-
-
-def get_connection():
-    """Construye una conexión pg8000 con SSL."""
-    cfg = get_db_parameters()
-    return pg8000.connect(
-        host=cfg["host"],
-        port=cfg["port"],
-        database=cfg["database"],
-        user=cfg["user"],
-        password=cfg["password"],
-        ssl_context=SSL_CONTEXT,
-        timeout=10,
-    )
-
-
-def fetch_all(cur, sql: str, params: Iterable[Any] = None):
-    """SELECT → lista de dicts (columns → values)."""
-    cur.execute(sql, tuple(params or ()))
-    rows = cur.fetchall()
-    columns = [c[0] for c in cur.description]
-    return [dict(zip(columns, row)) for row in rows]
-
-
-def run_command(cur, sql: str) -> None:
-    """Ejecuta DML (INSERT/UPDATE/DELETE) sin parámetros."""
-    cur.execute(sql)
-
-
 def obtener_cliente_id(cur) -> int:
     """Devuelve un id_cliente válido (toma el primero disponible)."""
     row = fetch_all(cur, f"SELECT id FROM {ENV}.cliente LIMIT 1")
@@ -205,4 +144,4 @@ def lambda_handler(event, context):
         }
     finally:
         if conn:
-            conn.close()
+            release_connection(conn)
@@ -1,76 +1,19 @@
 import json
 import logging
-import os
-import ssl
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List
 
-import boto3
-import pg8000
+from alimentapp.db import ENV, get_connection, release_connection, run_query
 
 # --- Configuración base ---
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-ENV = os.getenv("DB_SCHEMA", "dev")
-ssm_client = boto3.client("ssm")
-
-DB_CONFIG: Optional[Dict[str, Any]] = None
-ssl_context = ssl.create_default_context()
-
 # --- Funciones auxiliares ---
-def get_db_parameters() -> Dict[str, Any]:
-    """Obtiene las credenciales de conexión a la base de datos desde SSM."""
-    global DB_CONFIG
-    if DB_CONFIG:
-        return DB_CONFIG
-
-    param_names = [
-        "/alimentapp/db/host",
-        "/alimentapp/db/password",
-        "/alimentapp/db/port",
-        "/alimentapp/db/username",
-    ]
-
-    resp = ssm_client.get_parameters(Names=param_names, WithDecryption=True)
-    data = {p["Name"].split("/")[-1]: p["Value"] for p in resp["Parameters"]}
-
-    DB_CONFIG = {
-        "host": data["host"],
-        "port": int(data["port"]),
-        "user": data["username"],
-        "password": data["password"],
-        "database": os.getenv("DB_NAME", "postgres"),
-    }
-    return DB_CONFIG
-
-
-def get_connection():
-    """Abre conexión a la base de datos."""
-    cfg = get_db_parameters()
-    return pg8000.connect(
-        host=cfg["host"],
-        port=cfg["port"],
-        database=cfg["database"],
-        user=cfg["user"],
-        password=cfg["password"],
-        ssl_context=ssl_context,
-        timeout=10,
-    )
-
-
-def run_query(cur, sql: str) -> List[Dict[str, Any]]:
-    """Ejecuta un SELECT y devuelve resultados como lista de diccionarios."""
-    cur.execute(sql)
-    rows = cur.fetchall()
-    if not rows:
-        return []
-    columns = [desc[0] for desc in cur.description]
-    return [dict(zip(columns, row)) for row in rows]
-
 
 # --- Lógica principal ---
 VALID_STATES = {'pendiente', 'despachado', 'en_viaje', 'entregado', 'cancelado'}
 
+
 def get_envios_por_estado_por_vehiculo(cur, estado: str) -> List[Dict[str, Any]]:
     """Obtiene todos los envíos en un estado específico."""
     estado = estado.lower()
@@ -194,4 +137,4 @@ def lambda_handler(event, context):
 
     finally:
         if conn:
-            conn.close()
+            release_connection(conn)
@@ -1,82 +1,22 @@
 import json
 import logging
-import os
-import ssl
 from typing import List, Dict, Any, Tuple
-import boto3
-import pg8000
+
+from alimentapp.db import ENV, get_connection, release_connection
 
 # --- Configuración estándar ---
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-ENV = os.getenv("DB_SCHEMA", "dev")
-ssm_client = boto3.client("ssm")
-DB_CONFIG = None  # cache de SSM
-
 
 class ValidationError(Exception):
     """Error de validaciones de negocio."""
 
 
 # --- Funciones de conexión ---
-def get_db_parameters() -> Dict[str, Any]:
-    """Lee los parámetros de conexión desde AWS SSM."""
-    global DB_CONFIG
-    if DB_CONFIG:
-        return DB_CONFIG
-
-    param_names = [
-        "/alimentapp/db/host",
-        "/alimentapp/db/password",
-        "/alimentapp/db/port",
-        "/alimentapp/db/username",
-    ]
-    resp = ssm_client.get_parameters(Names=param_names, WithDecryption=True)
-
-    if len(resp["Parameters"]) != len(param_names):
-        missing = set(param_names) - {p["Name"] for p in resp["Parameters"]}
-        raise RuntimeError(f"Parámetros faltantes en SSM: {', '.join(missing)}")
-
-    data = {p["Name"].split("/")[-1]: p["Value"] for p in resp["Parameters"]}
-    DB_CONFIG = {
-        "host": data["host"],
-        "port": int(data.get("port", "5432")),
-        "user": data["username"],
-        "password": data["password"],
-        "database": os.getenv("DB_NAME", "postgres"),
-    }
-    return DB_CONFIG
-
-
-def get_connection():
-    """Devuelve una conexión a PostgreSQL con SSL."""
-    cfg = get_db_parameters()
-    return pg8000.connect(
-        host=cfg["host"],
-        port=cfg["port"],
-        database=cfg["database"],
-        user=cfg["user"],
-        password=cfg["password"],
-        ssl_context=ssl.create_default_context(),
-        timeout=10,
-    )
 
 
 # --- Funciones auxiliares ---
-def run_query(cur, sql: str, params: tuple = None) -> list[dict[str, Any]]:
-    """Ejecuta SELECT y devuelve lista de diccionarios."""
-    cur.execute(sql, params or ())
-    rows = cur.fetchall()
-    if not rows:
-        return []
-    columns = [desc[0] for desc in cur.description]
-    return [dict(zip(columns, row)) for row in rows]
-
-
-def run_command(cur, sql: str, params: tuple = None):
-    """Ejecuta INSERT/UPDATE/DELETE sin devolver filas."""
-    cur.execute(sql, params or ())
 
 
 # --- Validación del cuerpo recibido ---
@@ -219,4 +159,4 @@ def lambda_handler(event, context):
 
     finally:
         if conn:
-            conn.close()
+            release_connection(conn)
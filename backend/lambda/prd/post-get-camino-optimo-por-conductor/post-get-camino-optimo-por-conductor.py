@@ -1,22 +1,13 @@
 import json
 import logging
-import os
-import ssl
 import math
-from typing import Any, Dict, List, Optional
+from typing import List
 
-import boto3
-import pg8000
+from alimentapp.db import ENV, get_connection, release_connection
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-ENV = os.getenv("DB_SCHEMA", "dev")
-ssm_client = boto3.client("ssm")
-
-DB_CONFIG: Optional[Dict[str, Any]] = None
-ssl_context = ssl.create_default_context()
-
 # Ubicación inicial del transportista (UNGS)
 START_LAT = -34.521675
 START_LON = -58.701190
@@ -25,48 +16,6 @@ START_LON = -58.701190
 CLUSTER_DISTANCE_KM = 5
 
 
-def get_db_parameters() -> Dict[str, Any]:
-    global DB_CONFIG
-    if DB_CONFIG:
-        return DB_CONFIG
-
-    names = [
-        "/alimentapp/db/host",
-        "/alimentapp/db/password",
-        "/alimentapp/db/port",
-        "/alimentapp/db/username",
-    ]
-
-    resp = ssm_client.get_parameters(Names=names, WithDecryption=True)
-    if len(resp["Parameters"]) != len(names):
-        missing = set(names) - {p["Name"] for p in resp["Parameters"]}
-        raise RuntimeError(f"Faltan parámetros SSM: {', '.join(missing)}")
-
-    data = {p["Name"].split("/")[-1]: p["Value"] for p in resp["Parameters"]}
-
-    DB_CONFIG = {
-        "host": data["host"],
-        "port": int(data["port"]),
-        "user": data["username"],
-        "password": data["password"],
-        "database": os.getenv("DB_NAME", "postgres"),
-    }
-    return DB_CONFIG
-
-
-def get_connection():
-    cfg = get_db_parameters()
-    return pg8000.connect(
-        host=cfg["host"],
-        port=cfg["port"],
-        database=cfg["database"],
-        user=cfg["user"],
-        password=cfg["password"],
-        ssl_context=ssl_context,
-        timeout=10,
-    )
-
-
 def haversine(lat1, lon1, lat2, lon2):
     """Distancia en km entre dos coordenadas."""
     R = 6371
@@ -257,4 +206,4 @@ def lambda_handler(event, context):
 
     finally:
         if conn:
-            conn.close()
\ No newline at end of file
+            release_connection(conn)
\ No newline at end of file
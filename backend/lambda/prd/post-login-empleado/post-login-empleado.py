@@ -1,81 +1,28 @@
 import json
 import logging
-import os
-import ssl
 from datetime import date
 from typing import Any, Dict, List
 
-import boto3
-import pg8000
+from alimentapp.db import get_connection, release_connection
+from alimentapp.sentencias import RegistroSentencias
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-ENV = os.getenv("DB_SCHEMA", "dev")
-ssm_client = boto3.client("ssm")
 
-DB_CONFIG = None  # cache SSM
+SQL = RegistroSentencias({
+    "rol_por_nombre": "SELECT id, nombre FROM {ENV}.rol WHERE nombre = :rol",
+    "empleado_por_email_y_rol": "SELECT id FROM {ENV}.empleado WHERE email = :email AND id_rol = :id_rol",
+    "existe_email": "SELECT 1 FROM {ENV}.empleado WHERE email = :email",
+    "sesion_valida": "SELECT 1 FROM {ENV}.sesion WHERE id_empleado = :id_empleado AND password = :password",
+})
+
 
 class ValidationError(Exception):
     """Error de validaciones"""
 
 
-def get_db_parameters() -> Dict[str, Any]:
-    """Lee parámetros de RDS desde SSM (cacheado)."""
-    global DB_CONFIG
-    if DB_CONFIG:
-        return DB_CONFIG
-
-    param_names = [
-        "/alimentapp/db/host",
-        "/alimentapp/db/password",
-        "/alimentapp/db/port",
-        "/alimentapp/db/username",
-    ]
-    resp = ssm_client.get_parameters(Names=param_names, WithDecryption=True)
-    if len(resp["Parameters"]) != len(param_names):
-        missing = set(param_names) - {p["Name"] for p in resp["Parameters"]}
-        raise RuntimeError(f"Parámetros faltantes en SSM: {', '.join(missing)}")
-
-    data = {p["Name"].split("/")[-1]: p["Value"] for p in resp["Parameters"]}
-    DB_CONFIG = {
-        "host": data["host"],
-        "port": int(data.get("port", "5432")),
-        "user": data["username"],
-        "password": data["password"],
-        "database": os.getenv("DB_NAME", "postgres"),
-    }
-    return DB_CONFIG
-
-
-def get_connection():
-    """Abre conexión pg8000 + SSL con credenciales de SSM."""
-    cfg = get_db_parameters()
-    return pg8000.connect(
-        host=cfg["host"],
-        port=cfg["port"],
-        database=cfg["database"],
-        user=cfg["user"],
-        password=cfg["password"],
-        ssl_context=ssl.create_default_context(),
-        timeout=10,
-    )
-
-
-def run_query(cur, sql: str):
-    """SELECT; devuelve filas como dicts."""
-    cur.execute(sql)
-    rows = cur.fetchall()
-    if not rows:
-        return []
-    columns = [desc[0] for desc in cur.description]
-    return [dict(zip(columns, row)) for row in rows]
-
-def run_command(cur, sql: str):
-    """INSERT/UPDATE/DELETE; no retorna filas."""
-    cur.execute(sql)
-
-def validate_login_empleado(cur, payload: Dict[str, Any]) -> None:
+def validate_login_empleado(conn, payload: Dict[str, Any]) -> None:
     required = [
         "email",
         "password",
@@ -89,24 +36,20 @@ def validate_login_empleado(cur, payload: Dict[str, Any]) -> None:
     password = payload.get("password")
     rol = payload.get("rol")
     
-    query_rol = f"SELECT id, nombre FROM {ENV}.rol where nombre = '{rol}'"
-    rol_result = run_query(cur, query_rol)
+    rol_result = SQL.fetch_all(conn, "rol_por_nombre", rol=rol)
     if not rol_result:
         raise ValidationError(f"Rol '{rol}' no encontrado") 
     id_rol = rol_result[0]["id"]
        
-    query_empleado = f"SELECT id FROM {ENV}.empleado WHERE email = '{email}' AND id_rol = {id_rol}"
-    empleado_result = run_query(cur, query_empleado)
+    empleado_result = SQL.fetch_all(conn, "empleado_por_email_y_rol", email=email, id_rol=id_rol)
     if not empleado_result:
-        query_email = f"SELECT 1 FROM {ENV}.empleado WHERE email = '{email}'"
-        if not run_query(cur, query_email):
+        if not SQL.fetch_all(conn, "existe_email", email=email):
             raise ValidationError("Email no encontrado")
         else:
             raise ValidationError("El email no corresponde con el rol indicado")
     id_empleado = empleado_result[0]["id"]
     
-    query_password = f"SELECT 1 FROM {ENV}.sesion WHERE id_empleado = {id_empleado} AND password = '{password}'"
-    if not run_query(cur, query_password):
+    if not SQL.fetch_all(conn, "sesion_valida", id_empleado=id_empleado, password=password):
         raise ValidationError("Password incorrecto")
 
 def lambda_handler(event, context):
@@ -131,9 +74,8 @@ def lambda_handler(event, context):
     conn = None
     try:
         conn = get_connection()
-        cur = conn.cursor()
 
-        resultado = validate_login_empleado(cur, payload)
+        resultado = validate_login_empleado(conn, payload)
         conn.commit()
         return {
             "statusCode": 200,
@@ -159,4 +101,4 @@ def lambda_handler(event, context):
         }
     finally:
         if conn:
-            conn.close()
+            release_connection(conn)
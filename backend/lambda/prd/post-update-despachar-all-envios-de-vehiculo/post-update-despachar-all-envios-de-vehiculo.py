@@ -1,81 +1,43 @@
 import json
 import logging
-import os
-import ssl
-from typing import Any, Dict, List
-import boto3
-import pg8000
+
+from alimentapp.db import get_connection, release_connection
+from alimentapp.sentencias import RegistroSentencias
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-ENV = os.getenv("DB_SCHEMA", "dev")
-ssm_client = boto3.client("ssm")
 
-DB_CONFIG = None  # cache SSM
+SQL = RegistroSentencias({
+    # Pedidos con envío pendiente en el vehículo -> 'despachado' (una sola sentencia, no una por pedido)
+    "despachar_pedidos_de_vehiculo": """
+        UPDATE {ENV}.orden_venta
+        SET estado = 'despachado'
+        WHERE id IN (
+            SELECT id_orden_venta
+            FROM {ENV}.envio
+            WHERE id_vehiculo = :id_vehiculo
+              AND estado = 'pendiente'
+        )
+    """,
+    "despachar_envios_de_vehiculo": """
+        UPDATE {ENV}.envio
+        SET estado = 'despachado'
+        WHERE id_vehiculo = :id_vehiculo
+          AND estado = 'pendiente'
+    """,
+    "marcar_vehiculo_no_disponible": """
+        UPDATE {ENV}.vehiculo
+        SET disponible = FALSE
+        WHERE id = :id_vehiculo
+    """,
+})
 
 
 class ValidationError(Exception):
     """Error de validación."""
 
 
-def get_db_parameters() -> Dict[str, Any]:
-    """Lee parámetros de RDS desde SSM (cacheado)."""
-    global DB_CONFIG
-    if DB_CONFIG:
-        return DB_CONFIG
-
-    param_names = [
-        "/alimentapp/db/host",
-        "/alimentapp/db/password",
-        "/alimentapp/db/port",
-        "/alimentapp/db/username",
-    ]
-    resp = ssm_client.get_parameters(Names=param_names, WithDecryption=True)
-    if len(resp["Parameters"]) != len(param_names):
-        missing = set(param_names) - {p["Name"] for p in resp["Parameters"]}
-        raise RuntimeError(f"Parámetros faltantes en SSM: {', '.join(missing)}")
-
-    data = {p["Name"].split("/")[-1]: p["Value"] for p in resp["Parameters"]}
-    DB_CONFIG = {
-        "host": data["host"],
-        "port": int(data.get("port", "5432")),
-        "user": data["username"],
-        "password": data["password"],
-        "database": os.getenv("DB_NAME", "postgres"),
-    }
-    return DB_CONFIG
-
-
-def get_connection():
-    """Abre conexión pg8000 + SSL."""
-    cfg = get_db_parameters()
-    return pg8000.connect(
-        host=cfg["host"],
-        port=cfg["port"],
-        database=cfg["database"],
-        user=cfg["user"],
-        password=cfg["password"],
-        ssl_context=ssl.create_default_context(),
-        timeout=10,
-    )
-
-
-def run_query(cur, sql: str) -> List[Dict[str, Any]]:
-    """Ejecuta un SELECT y retorna filas como dicts."""
-    cur.execute(sql)
-    rows = cur.fetchall()
-    if not rows:
-        return []
-    columns = [desc[0] for desc in cur.description]
-    return [dict(zip(columns, row)) for row in rows]
-
-
-def run_command(cur, sql: str):
-    """Ejecuta INSERT/UPDATE/DELETE sin retorno."""
-    cur.execute(sql)
-
-
 def lambda_handler(event, context):
     logger.info("Evento recibido: %s", event)
     cors_headers = {
@@ -109,43 +71,11 @@ def lambda_handler(event, context):
     conn = None
     try:
         conn = get_connection()
-        cur = conn.cursor()
-
-        # Buscar IDs de pedidos pendientes del vehículo
-        query_consultar_ids_pedidos = f"""
-            SELECT id_orden_venta 
-            FROM {ENV}.envio 
-            WHERE id_vehiculo = {id_vehiculo}
-              AND estado = 'pendiente'
-        """
-        columna_ids_pedidos = run_query(cur, query_consultar_ids_pedidos)
-        ids_pedidos = [row["id_orden_venta"] for row in columna_ids_pedidos]
-
-        # Actualizar pedidos a 'despachado'
-        for id_pedido in ids_pedidos:
-            query_update_estado_pedido = f"""
-                UPDATE {ENV}.orden_venta 
-                SET estado = 'despachado' 
-                WHERE id = {id_pedido}
-            """
-            run_command(cur, query_update_estado_pedido)
-
-        # Actualizar los envíos del vehículo
-        query_update_estado_envio = f"""
-            UPDATE {ENV}.envio 
-            SET estado = 'despachado' 
-            WHERE id_vehiculo = {id_vehiculo} 
-              AND estado = 'pendiente'
-        """
-        run_command(cur, query_update_estado_envio)
 
-        # Marcar el vehículo como no disponible
-        query_update_estado_vehiculo = f"""
-            UPDATE {ENV}.vehiculo
-            SET disponible = FALSE
-            WHERE id = {id_vehiculo}
-        """
-        run_command(cur, query_update_estado_vehiculo)
+        # Los pedidos se actualizan antes que los envíos: se identifican por envío 'pendiente'
+        SQL.run_command(conn, "despachar_pedidos_de_vehiculo", id_vehiculo=id_vehiculo)
+        SQL.run_command(conn, "despachar_envios_de_vehiculo", id_vehiculo=id_vehiculo)
+        SQL.run_command(conn, "marcar_vehiculo_no_disponible", id_vehiculo=id_vehiculo)
 
         conn.commit()
 
@@ -178,4 +108,4 @@ def lambda_handler(event, context):
 
     finally:
         if conn:
-            conn.close()
+            release_connection(conn)
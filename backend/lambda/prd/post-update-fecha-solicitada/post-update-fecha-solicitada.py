@@ -1,82 +1,23 @@
 import json
 import logging
-import os
-import ssl
 from datetime import date, datetime, time, timedelta
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict
 import urllib.request
 
-import boto3
-import pg8000
+from alimentapp.aws import get_client
+from alimentapp.db import ENV, get_connection, release_connection, run_command, run_query
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-ENV = os.getenv("DB_SCHEMA", "dev")
-ssm_client = boto3.client("ssm")
-lambda_client = boto3.client("lambda")
-
-DB_CONFIG: Optional[Dict[str, Any]] = None
-SSL_CONTEXT = ssl.create_default_context()
-
 # ARN del planificador para invocarlo tras un cambio de fecha
 PLANIFICADOR_ARN = "arn:aws:lambda:us-east-1:554074173959:function:planificador_ordenes_produccion"
 API_PLANIFICADOR_DAILY = "https://eldzogehdj.execute-api.us-east-1.amazonaws.com/prd/orden-produccion/planificador_op_daily"
 
+
 class ValidationError(Exception):
     """Error de validación para el payload."""
 
-def get_db_parameters() -> Dict[str, Any]:
-    """Obtiene credenciales de RDS desde SSM y las cachea en memoria."""
-    global DB_CONFIG
-    if DB_CONFIG:
-        return DB_CONFIG
-
-    names = [
-        "/alimentapp/db/host",
-        "/alimentapp/db/password",
-        "/alimentapp/db/port",
-        "/alimentapp/db/username",
-    ]
-    resp = ssm_client.get_parameters(Names=names, WithDecryption=True)
-    if len(resp["Parameters"]) != len(names):
-        missing = set(names) - {p["Name"] for p in resp["Parameters"]}
-        raise RuntimeError(f"Faltan parámetros en SSM: {', '.join(sorted(missing))}")
-    data = {p["Name"].split("/")[-1]: p["Value"] for p in resp["Parameters"]}
-    DB_CONFIG = {
-        "host": data["host"],
-        "port": int(data.get("port", "5432")),
-        "user": data["username"],
-        "password": data["password"],
-        "database": os.getenv("DB_NAME", "postgres"),
-    }
-    return DB_CONFIG
-
-def get_connection():
-    """Crea una conexión pg8000 con SSL."""
-    cfg = get_db_parameters()
-    return pg8000.connect(
-        host=cfg["host"],
-        port=cfg["port"],
-        database=cfg["database"],
-        user=cfg["user"],
-        password=cfg["password"],
-        ssl_context=SSL_CONTEXT,
-        timeout=10,
-    )
-
-def run_query(cur, sql: str, params: tuple = None) -> List[Dict[str, Any]]:
-    """Ejecuta un SELECT y devuelve filas como diccionarios."""
-    cur.execute(sql, params or ())
-    rows = cur.fetchall()
-    if not rows:
-        return []
-    columns = [desc[0] for desc in cur.description]
-    return [dict(zip(columns, row)) for row in rows]
-
-def run_command(cur, sql: str, params: tuple = None) -> None:
-    """Ejecuta un comando DML (INSERT/UPDATE/DELETE)."""
-    cur.execute(sql, params)
 
 def validate_and_update(cur, payload: Dict[str, Any]) -> Dict[str, Any]:
     """Valida el payload y ejecuta la actualización en la base de datos."""
@@ -129,7 +70,7 @@ def invocar_planificador(orden_id: int) -> None:
     
     # Llamo a la lambda planificadora
     try:
-        lambda_client.invoke(
+        get_client("lambda").invoke(
             FunctionName=PLANIFICADOR_ARN,
             InvocationType="Event",  # Asíncrono
             Payload=json.dumps(payload).encode("utf-8"),
@@ -140,7 +81,7 @@ def invocar_planificador(orden_id: int) -> None:
 
     # Llamo a la lambda planificadora diaria
     try:
-        data = json.dumps({}).encode("utf-8")
+        data = json.dumps({"recalcular": True}).encode("utf-8")
         
         req = urllib.request.Request(
             API_PLANIFICADOR_DAILY, 
@@ -217,4 +158,4 @@ def lambda_handler(event, context):
         }
     finally:
         if conn:
-            conn.close()
+            release_connection(conn)
@@ -1,70 +1,18 @@
 import json
 import logging
-import os
-import ssl
-from typing import Any, Dict
-import boto3
-import pg8000
+
+from alimentapp.aws import get_client
+from alimentapp.db import ENV, get_connection, release_connection, run_command, run_query
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-ENV = os.getenv("DB_SCHEMA", "dev")
-ssm_client = boto3.client("ssm")
-lambda_client = boto3.client("lambda")
-
-DB_CONFIG = None  # cache SSM
 PLANIFICADOR_ARN = "arn:aws:lambda:us-east-1:554074173959:function:planificador_ordenes_produccion"
 
+
 class ValidationError(Exception):
     """Error de validación."""
 
-def get_db_parameters() -> Dict[str, Any]:
-    global DB_CONFIG
-    if DB_CONFIG:
-        return DB_CONFIG
-
-    param_names = [
-        "/alimentapp/db/host",
-        "/alimentapp/db/password",
-        "/alimentapp/db/port",
-        "/alimentapp/db/username",
-    ]
-    resp = ssm_client.get_parameters(Names=param_names, WithDecryption=True)
-    data = {p["Name"].split("/")[-1]: p["Value"] for p in resp["Parameters"]}
-    DB_CONFIG = {
-        "host": data["host"],
-        "port": int(data.get("port", "5432")),
-        "user": data["username"],
-        "password": data["password"],
-        "database": os.getenv("DB_NAME", "postgres"),
-    }
-    return DB_CONFIG
-
-
-def get_connection():
-    cfg = get_db_parameters()
-    return pg8000.connect(
-        host=cfg["host"],
-        port=cfg["port"],
-        database=cfg["database"],
-        user=cfg["user"],
-        password=cfg["password"],
-        ssl_context=ssl.create_default_context(),
-        timeout=10,
-    )
-
-
-def run_query(cur, sql: str, params: tuple = None):
-    cur.execute(sql, params)
-    rows = cur.fetchall()
-    columns = [desc[0] for desc in cur.description]
-    return [dict(zip(columns, row)) for row in rows]
-
-
-def run_command(cur, sql: str, params: tuple = None):
-    cur.execute(sql, params)
-
 
 def validate_payload(payload):
     required = ["id", "nuevo_estado"]
@@ -113,7 +61,7 @@ def lambda_handler(event, context):
         conn.commit()
 
         # Una vez que tenemos una nueva linea_produccion activa, podemos volver a llamar al algoritmo de priorizacion de OP.
-        lambda_client.invoke(
+        get_client("lambda").invoke(
             FunctionName=PLANIFICADOR_ARN, 
             InvocationType="Event", 
             Payload=json.dumps({"source": f"linea_produccion:{id_linea}"}).encode("utf-8")
@@ -148,4 +96,4 @@ def lambda_handler(event, context):
 
     finally:
         if conn:
-            conn.close()
\ No newline at end of file
+            release_connection(conn)
\ No newline at end of file
@@ -1,24 +1,15 @@
 import json
 import logging
-import os
-import ssl
 from collections import defaultdict
 from decimal import Decimal, InvalidOperation
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from typing import Any, Dict, List, Tuple
 
-import boto3
-import pg8000
+from alimentapp.aws import get_client
+from alimentapp.db import ENV, fetch_all, get_connection, release_connection, run_command
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-ENV = os.getenv("DB_SCHEMA", "dev")
-ssm_client = boto3.client("ssm")
-lambda_client = boto3.client("lambda")
-
-DB_CONFIG: Optional[Dict[str, Any]] = None
-SSL_CONTEXT = ssl.create_default_context()
-
 PLANIFICADOR_ARN = "arn:aws:lambda:us-east-1:554074173959:function:planificador_ordenes_produccion"
 
 ESTADOS_VALIDOS = {"en_progreso", "completada", "cancelada"}
@@ -35,64 +26,6 @@ class ValidationError(Exception):
     # Representa fallos de reglas de negocio en el request.
 
 
-def get_db_parameters() -> Dict[str, Any]:
-    """Obtiene credenciales de RDS desde SSM (cacheadas)."""
-    # Recupera y cachea los parámetros de conexión.
-    global DB_CONFIG
-    if DB_CONFIG:
-        return DB_CONFIG
-
-    names = [
-        "/alimentapp/db/host",
-        "/alimentapp/db/password",
-        "/alimentapp/db/port",
-        "/alimentapp/db/username",
-    ]
-    resp = ssm_client.get_parameters(Names=names, WithDecryption=True)
-    if len(resp["Parameters"]) != len(names):
-        missing = set(names) - {p["Name"] for p in resp["Parameters"]}
-        raise RuntimeError(f"Faltan parámetros en SSM: {', '.join(sorted(missing))}")
-    data = {p["Name"].split("/")[-1]: p["Value"] for p in resp["Parameters"]}
-    DB_CONFIG = {
-        "host": data["host"],
-        "port": int(data.get("port", "5432")),
-        "user": data["username"],
-        "password": data["password"],
-        "database": os.getenv("DB_NAME", "postgres"),
-    }
-    return DB_CONFIG
-
-
-def get_connection():
-    """Construye una conexión pg8000 con SSL."""
-    # Abre una conexión nueva hacia la base de datos.
-    cfg = get_db_parameters()
-    return pg8000.connect(
-        host=cfg["host"],
-        port=cfg["port"],
-        database=cfg["database"],
-        user=cfg["user"],
-        password=cfg["password"],
-        ssl_context=SSL_CONTEXT,
-        timeout=10,
-    )
-
-
-def fetch_all(cur, sql: str, params: Iterable[Any] = None) -> List[Dict[str, Any]]:
-    """Ejecuta un SELECT y devuelve filas como diccionarios."""
-    # Ejecuta la consulta y transforma el resultado en lista de dicts.
-    cur.execute(sql, tuple(params or ()))
-    rows = cur.fetchall()
-    columns = [c[0] for c in cur.description]
-    return [dict(zip(columns, row)) for row in rows]
-
-
-def run_command(cur, sql: str, params: Iterable[Any] = None) -> None:
-    """Ejecuta un comando DML (INSERT/UPDATE/DELETE)."""
-    # Lanza la consulta con parámetros posicionados.
-    cur.execute(sql, tuple(params or ()))
-
-
 def decimal_value(value: Any, contexto: str) -> Decimal:
     """Normaliza valores numéricos a Decimal con mensajes claros."""
     # Convierte valores a Decimal y controla errores de formato.
@@ -354,7 +287,7 @@ def invocar_planificador(origen: str, tandas: List[int]) -> None:
         "tanda_ids": tandas,
     }
     try:
-        lambda_client.invoke(
+        get_client("lambda").invoke(
             FunctionName=PLANIFICADOR_ARN,
             InvocationType="Event",
             Payload=json.dumps(payload).encode("utf-8"),
@@ -427,4 +360,4 @@ def lambda_handler(event, context):
         }
     finally:
         if conn:
-            conn.close()
\ No newline at end of file
+            release_connection(conn)
\ No newline at end of file